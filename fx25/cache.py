@@ -0,0 +1,128 @@
+# fx25/cache.py
+"""
+LRUCache: caché en memoria acotada, thread-safe
+- max_entries: LRU evicta el menos usado al superar el límite
+- max_bytes: tope aproximado de memoria (tamaño estimado por entrada, ver approx_size)
+- ttl: entradas vencidas cuentan como miss y se borran al tocarlas; set() barre
+  además las vencidas del extremo LRU (limpieza perezosa, sin thread)
+- Contadores hits / misses / evictions / expirations para exponer junto a métricas
+"""
+
+from __future__ import annotations
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+def approx_size(value: Any, _depth: int = 0) -> int:
+    """Bytes aproximados de un valor JSON-like (recorre dict/list hasta 4 niveles)."""
+    size = sys.getsizeof(value)
+    if _depth >= 4:
+        return size
+    if isinstance(value, dict):
+        size += sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(approx_size(v, _depth + 1) for v in value)
+    return size
+
+
+class LRUCache:
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = None,
+        *,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = approx_size,
+    ) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = None if ttl is None else float(ttl)
+        self.max_bytes = None if max_bytes is None else max(1, int(max_bytes))
+        self._sizeof = sizeof
+        # key → (value, stored_at, bytes)
+        self._data: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _drop_unlocked(self, key: Hashable) -> None:
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.bytes -= item[2]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            value, stored_at, _ = item
+            if self.ttl is not None and now - stored_at >= self.ttl:
+                self._drop_unlocked(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        now = time.monotonic()
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            self._drop_unlocked(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                # Nunca cabría: no desalojar todo el caché por un valor gigante
+                return
+            self._data[key] = (value, now, size)
+            self.bytes += size
+            if self.ttl is not None:
+                self._sweep_expired_unlocked(now)
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self.bytes > self.max_bytes
+            ):
+                _, (_, _, freed) = self._data.popitem(last=False)
+                self.bytes -= freed
+                self.evictions += 1
+
+    def _sweep_expired_unlocked(self, now: float, limit: int = 8) -> None:
+        """Borra hasta `limit` entradas vencidas del extremo LRU (costo acotado por set)."""
+        for _ in range(limit):
+            key = next(iter(self._data), _MISSING)
+            if key is _MISSING or now - self._data[key][1] < self.ttl:
+                return
+            self._drop_unlocked(key)
+            self.expirations += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._drop_unlocked(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
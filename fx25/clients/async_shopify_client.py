@@ -0,0 +1,366 @@
+# fx25/clients/async_shopify_client.py
+"""
+AsyncShopifyClient — contraparte asyncio de ShopifyClient (DRY por defecto)
+- Mismo contrato: create_product, update_price, get_inventory, api_call_count
+- AsyncTokenBucket: FIFO vía asyncio.Lock; sólo la cabeza duerme (asyncio.sleep)
+- Circuit breakers: el mismo BreakerRegistry que ShopifyClient (uno por familia de
+  endpoint, ventana de tasa de fallas, HALF_OPEN con una sola sonda)
+- Guardrails de precio y parsing de rate-limit compartidos con ShopifyClient
+- DRY mode: sin red, pero pasa por el MISMO limiter y breaker (load test offline);
+  las llamadas simuladas van al DryCallLog (sin print/json por llamada con verbosity=0)
+
+Red real: el wait del limiter es 100% asyncio (cientos de corutinas esperando
+sin threads). El I/O HTTP va por el HTTPConnectionPool keep-alive en un
+executor acotado a pool_size threads — Shopify no admite más concurrencia útil.
+"""
+
+from __future__ import annotations
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+from urllib import parse
+
+from fx25.clients.circuit_breaker import BreakerRegistry, CircuitBreaker
+from fx25.clients.dry_log import DryCallLog
+from fx25.clients.http_pool import HTTPConnectionPool
+from fx25.clients.shopify_client import (
+    DEF_API_VERSION,
+    DEF_DRY,
+    DEF_DRY_VERBOSITY,
+    DEF_POOL_SIZE,
+    DEF_STORE,
+    DEF_TOKEN,
+    check_price_guardrail,
+    parse_rate_limit,
+)
+
+
+class AsyncTokenBucket:
+    """Token bucket asyncio. asyncio.Lock despierta waiters en orden FIFO."""
+
+    def __init__(self, capacity: float = 2.0, refill_rate: float = 2.0) -> None:
+        self.capacity = float(capacity)
+        self.refill_rate = float(refill_rate)
+        self.remaining = self.capacity
+        self.last_refill = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        if elapsed <= 0:
+            return
+        self.remaining = min(self.capacity, self.remaining + elapsed * self.refill_rate)
+        self.last_refill = now
+
+    async def acquire(self) -> None:
+        """Consume 1 token. La cabeza de la cola retiene el lock mientras espera."""
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.remaining >= 1.0:
+                    self.remaining -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self.remaining) / self.refill_rate)
+
+    def sync_to_server(self, capacity: float, refill: float, available: float, headroom: float) -> None:
+        """Ajusta capacidad/refill/tokens al bucket reportado por Shopify."""
+        self._refill()
+        self.capacity = max(1.0, capacity - headroom)
+        self.refill_rate = max(refill, 0.1)
+        # Sólo puede bajar los tokens locales (headers atrasados vs requests en vuelo)
+        self.remaining = max(0.0, min(self.capacity, self.remaining, available - headroom))
+
+
+class AsyncShopifyClient:
+    def __init__(
+        self,
+        store: str | None = None,
+        token: str | None = None,
+        *,
+        api_version: str = DEF_API_VERSION,
+        dry: Optional[bool] = None,
+        bucket_capacity: float = 2.0,
+        refill_rate: float = 2.0,
+        breaker_fail_threshold: int = 3,
+        breaker_open_seconds: float = 60.0,
+        breaker_window_seconds: float = 60.0,
+        breaker_failure_rate: float = 0.5,
+        adaptive: bool = False,
+        adaptive_headroom: float = 1.0,
+        pool_size: int = DEF_POOL_SIZE,
+        scheme: str = "https",
+        timeout: float = 30.0,
+        dry_verbosity: int = DEF_DRY_VERBOSITY,
+        dry_log_size: int = 10_000,
+        dry_sink_path: Optional[str] = None,
+    ) -> None:
+        self.store = store or DEF_STORE
+        self.token = (token or DEF_TOKEN).strip()
+        self.api_version = api_version
+        self.dry = DEF_DRY if dry is None else dry
+        self.scheme = scheme
+        self.timeout = float(timeout)
+
+        self.bucket = AsyncTokenBucket(bucket_capacity, refill_rate)
+        # Mismo state machine que el cliente sync; sus locks sólo cubren secciones
+        # cortas sin await, así que no bloquean el event loop
+        self.breakers = BreakerRegistry(
+            fail_threshold=int(breaker_fail_threshold),
+            open_seconds=float(breaker_open_seconds),
+            window_seconds=float(breaker_window_seconds),
+            failure_rate=float(breaker_failure_rate),
+        )
+        self.dry_log = DryCallLog(
+            maxlen=dry_log_size, verbosity=dry_verbosity, sink_path=dry_sink_path
+        )
+        self.adaptive = bool(adaptive)
+        self.adaptive_headroom = max(0.0, float(adaptive_headroom))
+
+        self.pool_size = max(1, int(pool_size))
+        self._pool: Optional[HTTPConnectionPool] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self._api_call_count = 0
+        self._force_fail_for_n_calls = 0
+
+    # ------------- Estado (mismos nombres que ShopifyClient) -------------
+    @property
+    def circuit_state(self) -> str:
+        """Peor estado entre todos los breakers (compat. dashboards)."""
+        return self.breakers.worst_state()
+
+    def breaker_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return self.breakers.snapshot()
+
+    @property
+    def bucket_remaining(self) -> float:
+        return self.bucket.remaining
+
+    @property
+    def api_call_count(self) -> int:
+        return self._api_call_count
+
+    # --------- Transporte HTTP ----------
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes],
+        headers: Dict[str, str],
+    ) -> Tuple[int, Any, bytes]:
+        if self._pool is None:
+            self._pool = HTTPConnectionPool(
+                self.store, scheme=self.scheme, size=self.pool_size, timeout=self.timeout
+            )
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.pool_size, thread_name_prefix="shopify-async"
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            lambda: self._pool.request(method, path, body=body, headers=headers),
+        )
+
+    async def aclose(self) -> None:
+        self.dry_log.flush()
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def __aenter__(self) -> "AsyncShopifyClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+    # --------- Requests (DRY / REAL) ----------
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        dry: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """HTTP request genérico con rate limiting, circuit breaker y retry."""
+        if dry is None:
+            dry = self.dry
+
+        breaker = await self._admit(path)
+
+        if dry:
+            payload = {
+                "method": method,
+                "path": path,
+                "data": data or {},
+                "params": params or {}
+            }
+            if self._force_fail_for_n_calls > 0:
+                self._force_fail_for_n_calls -= 1
+                breaker.record_failure()
+                self.dry_log.record("FAIL", method, path, payload)
+                raise RuntimeError("Simulated request failure (DRY)")
+
+            self._api_call_count += 1
+            self.dry_log.record("OK", method, path, payload)
+            breaker.record_success()
+            return {"ok": True, "dry": True, "payload": payload}
+
+        if not self.token:
+            breaker.record_failure()
+            raise RuntimeError("SHOPIFY_ADMIN_TOKEN vacío.")
+
+        url = f"/admin/api/{self.api_version}{path}"
+        if params:
+            url += "?" + parse.urlencode(params)
+        headers = {
+            "Content-Type": "application/json",
+            "X-Shopify-Access-Token": self.token,
+        }
+        body = json.dumps(data).encode("utf-8") if data is not None else None
+
+        max_retries = 5
+        backoff = 0.8
+        for attempt in range(max_retries + 1):
+            try:
+                status, resp_headers, raw = await self._send(method.upper(), url, body, headers)
+            except Exception:
+                breaker.record_failure()
+                raise
+
+            txt = raw.decode("utf-8") if raw else "{}"
+            self._api_call_count += 1
+
+            if 200 <= status < 300:
+                parsed = json.loads(txt or "{}")
+                self._observe_rate_limit(resp_headers, parsed)
+                breaker.record_success()
+                print(f"[SHOPIFY][ASYNC] action={method} status=OK url={path}")
+                return {"ok": True, "dry": False, "status": status, "json": parsed}
+
+            self._observe_rate_limit(resp_headers)
+            breaker.record_failure()
+
+            if status == 429 or 500 <= status < 600:
+                retry_after = resp_headers.get("Retry-After") if resp_headers is not None else None
+                if retry_after:
+                    sleep_s = float(retry_after)
+                else:
+                    sleep_s = backoff * (2 ** attempt) + random.uniform(0, 0.2)
+                print(f"[SHOPIFY][ASYNC] status={status} backoff={sleep_s:.2f}s attempt={attempt}")
+                await asyncio.sleep(min(sleep_s, 10.0))
+                continue
+
+            raise RuntimeError(f"HTTP {status}: {txt[:200]}")
+
+        raise RuntimeError("Max retries alcanzado (429/5xx sostenido).")
+
+    async def _admit(self, path: str) -> CircuitBreaker:
+        """Limiter + breaker de la familia de `path`; devuelve el breaker para reportar."""
+        await self.bucket.acquire()
+        breaker = self.breakers.get(path)
+        breaker.check()
+        return breaker
+
+    def _observe_rate_limit(self, headers: Any, body: Optional[Dict[str, Any]] = None) -> None:
+        if not self.adaptive:
+            return
+        parsed = parse_rate_limit(headers, body)
+        if parsed is not None:
+            self.bucket.sync_to_server(*parsed, headroom=self.adaptive_headroom)
+
+    # ------------- Métodos públicos (contrato) -------------
+    async def create_product(
+        self,
+        spec: Dict[str, Any],
+        *,
+        dry: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """Crea un producto. spec: {"product": {...}}"""
+        return await self._request("POST", "/products.json", data=spec, dry=dry)
+
+    async def get_inventory(
+        self,
+        sku: str,
+        *,
+        dry: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """Obtiene inventario por SKU (stub, igual que ShopifyClient)."""
+        if (self.dry if dry is None else dry):
+            breaker = await self._admit("/inventory_levels.json")
+            self.dry_log.record("INVENTORY", "GET", "/inventory_levels.json", {"sku": sku, "qty": 42})
+            breaker.record_success()
+            self._api_call_count += 1
+            return {"ok": True, "dry": True, "sku": sku, "qty": 42}
+
+        return await self._request(
+            "GET",
+            "/inventory_levels.json",
+            params={"sku": sku},
+            dry=dry
+        )
+
+    async def _get_current_price(
+        self,
+        product_id: str,
+        *,
+        dry: Optional[bool]
+    ) -> float:
+        if (self.dry if dry is None else dry):
+            return 100.0
+
+        resp = await self._request("GET", f"/products/{product_id}.json", dry=dry)
+        try:
+            return float(resp["json"]["product"]["variants"][0]["price"])
+        except Exception:
+            raise RuntimeError("No se pudo leer precio actual del producto.")
+
+    async def update_price(
+        self,
+        product_id: str,
+        new_price: float,
+        *,
+        old_price: Optional[float] = None,
+        dry: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """Actualiza precio con guardrails ±20% respecto al precio actual."""
+        d = self.dry if dry is None else dry
+
+        if old_price is None:
+            old_price = await self._get_current_price(product_id, dry=d)
+
+        check_price_guardrail(old_price, new_price)
+
+        if d:
+            path = f"/products/{product_id}.json"
+            breaker = await self._admit(path)
+            payload = {
+                "product_id": product_id,
+                "old_price": old_price,
+                "new_price": new_price
+            }
+            self.dry_log.record("UPDATE_PRICE", "PUT", path, payload)
+            breaker.record_success()
+            self._api_call_count += 1
+            return {"ok": True, "dry": True, "payload": payload}
+
+        data = {
+            "product": {
+                "id": product_id,
+                "variants": [{"price": new_price}]
+            }
+        }
+        return await self._request("PUT", f"/products/{product_id}.json", data=data, dry=d)
+
+    # -------- Helpers de test ----------
+    def force_fail_next(self, n_calls: int) -> None:
+        """Forzar fallas simuladas en DRY para probar circuit breaker."""
+        self._force_fail_for_n_calls = max(0, int(n_calls))
@@ -0,0 +1,224 @@
+# fx25/clients/call_metrics.py
+"""
+CallMetrics: telemetría por llamada de ShopifyClient (sin lock en el hot path)
+- Un registro por intento: method, path template, status, attempt,
+  espera (limiter o backoff), tiempo en red, estado del breaker
+- Histogramas log2 (0.5ms … ~33s) por (method, template); shard por thread:
+  cada thread escribe sólo en sus propios arrays, snapshot() los suma; el shard de
+  un thread terminado se pliega en una base común (no se acumulan shards muertos)
+- Hooks: callables que reciben cada CallRecord (p.ej. exportar a otro sistema)
+- flush_to_metrics(): una fila por endpoint en fx25/modules/metrics.py (CSV)
+"""
+
+from __future__ import annotations
+import re
+import threading
+import weakref
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+# Límites superiores de bucket (segundos): 0.5ms · 2^k; el último es overflow
+BUCKET_BOUNDS: Tuple[float, ...] = tuple(0.0005 * 2 ** k for k in range(17))
+
+_ID_RE = re.compile(r"/\d+(?=/|\.json|$)")
+
+
+def path_template(path: str) -> str:
+    """/products/123.json → /products/{id}.json (agrupa por endpoint, no por recurso)."""
+    return _ID_RE.sub("/{id}", path.split("?", 1)[0])
+
+
+def _bucket(seconds: float) -> int:
+    for i, bound in enumerate(BUCKET_BOUNDS):
+        if seconds <= bound:
+            return i
+    return len(BUCKET_BOUNDS)
+
+
+class CallRecord(NamedTuple):
+    method: str
+    template: str
+    status: str          # "200", "429", "DRY", "ERR" (excepción), "OPEN" (breaker)
+    attempt: int
+    wait_s: float        # limiter (attempt 0) o backoff previo (attempt > 0)
+    network_s: float
+    breaker_state: str
+
+
+class _Series:
+    """Acumuladores de un endpoint dentro de un shard (sólo su thread escribe)."""
+
+    __slots__ = ("count", "retries", "status", "breaker", "wait", "net", "wait_sum", "net_sum", "wait_max", "net_max")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.retries = 0
+        self.status: Dict[str, int] = {}
+        self.breaker: Dict[str, int] = {}
+        self.wait = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.net = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.wait_sum = 0.0
+        self.net_sum = 0.0
+        self.wait_max = 0.0
+        self.net_max = 0.0
+
+
+def _summary(hist: List[int], total: float, peak: float) -> Dict[str, float]:
+    n = sum(hist)
+
+    def pct(p: float) -> float:
+        if n == 0:
+            return 0.0
+        target, acc = p / 100.0 * n, 0
+        for i, c in enumerate(hist):
+            acc += c
+            if acc >= target:
+                return min(peak, BUCKET_BOUNDS[i]) if i < len(BUCKET_BOUNDS) else peak
+        return peak
+
+    return {
+        "p50_ms": pct(50) * 1000,
+        "p95_ms": pct(95) * 1000,
+        "p99_ms": pct(99) * 1000,
+        "max_ms": peak * 1000,
+        "mean_ms": (total / n * 1000) if n else 0.0,
+        "sum_s": total,
+    }
+
+
+def _merge(into: Dict[Tuple[str, str], _Series], shard: Dict[Tuple[str, str], _Series]) -> None:
+    for key, s in list(shard.items()):
+        m = into.get(key)
+        if m is None:
+            m = into[key] = _Series()
+        m.count += s.count
+        m.retries += s.retries
+        for k, v in list(s.status.items()):
+            m.status[k] = m.status.get(k, 0) + v
+        for k, v in list(s.breaker.items()):
+            m.breaker[k] = m.breaker.get(k, 0) + v
+        m.wait = [a + b for a, b in zip(m.wait, s.wait)]
+        m.net = [a + b for a, b in zip(m.net, s.net)]
+        m.wait_sum += s.wait_sum
+        m.net_sum += s.net_sum
+        m.wait_max = max(m.wait_max, s.wait_max)
+        m.net_max = max(m.net_max, s.net_max)
+
+
+class CallMetrics:
+    def __init__(self) -> None:
+        self._local = threading.local()
+        # (thread dueño, shard); los de threads terminados se pliegan en _retired
+        self._shards: List[Tuple[weakref.ref, Dict[Tuple[str, str], _Series]]] = []
+        self._retired: Dict[Tuple[str, str], _Series] = {}
+        self._shards_lock = threading.Lock()   # sólo al registrar un thread nuevo / snapshot
+        self._hooks: List[Callable[[CallRecord], Any]] = []
+
+    def _shard(self) -> Dict[Tuple[str, str], _Series]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._prune()
+                self._shards.append((weakref.ref(threading.current_thread()), shard))
+        return shard
+
+    def _prune(self) -> None:
+        """Pliega en _retired los shards de threads que ya terminaron. Llamar con _shards_lock."""
+        live = []
+        for ref, shard in self._shards:
+            th = ref()
+            if th is not None and th.is_alive():
+                live.append((ref, shard))
+            else:
+                # Su thread ya no escribe: sumarlo es seguro
+                _merge(self._retired, shard)
+        self._shards = live
+
+    def add_hook(self, hook: Callable[[CallRecord], Any]) -> None:
+        self._hooks.append(hook)
+
+    def record(
+        self,
+        method: str,
+        path: str,
+        status: Any,
+        *,
+        attempt: int = 0,
+        wait_s: float = 0.0,
+        network_s: float = 0.0,
+        breaker_state: str = "CLOSED",
+    ) -> None:
+        rec = CallRecord(method.upper(), path_template(path), str(status), attempt, wait_s, network_s, breaker_state)
+        shard = self._shard()
+        series = shard.get((rec.method, rec.template))
+        if series is None:
+            series = shard[(rec.method, rec.template)] = _Series()
+        series.count += 1
+        if attempt > 0:
+            series.retries += 1
+        series.status[rec.status] = series.status.get(rec.status, 0) + 1
+        series.breaker[breaker_state] = series.breaker.get(breaker_state, 0) + 1
+        series.wait[_bucket(wait_s)] += 1
+        series.net[_bucket(network_s)] += 1
+        series.wait_sum += wait_s
+        series.net_sum += network_s
+        series.wait_max = max(series.wait_max, wait_s)
+        series.net_max = max(series.net_max, network_s)
+
+        for hook in self._hooks:
+            try:
+                hook(rec)
+            except Exception:
+                # Un hook roto no debe tumbar la llamada a Shopify
+                pass
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """{"GET /products/{id}.json": {count, retries, status, breaker, limiter_wait, network}}."""
+        merged: Dict[Tuple[str, str], _Series] = {}
+        with self._shards_lock:
+            self._prune()
+            _merge(merged, self._retired)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            _merge(merged, shard)
+
+        return {
+            f"{method} {template}": {
+                "count": m.count,
+                "retries": m.retries,
+                "status": dict(m.status),
+                "breaker": dict(m.breaker),
+                "limiter_wait": _summary(m.wait, m.wait_sum, m.wait_max),
+                "network": _summary(m.net, m.net_sum, m.net_max),
+            }
+            for (method, template), m in sorted(merged.items())
+        }
+
+    def reset(self) -> None:
+        with self._shards_lock:
+            self._retired.clear()
+            for _, shard in self._shards:
+                shard.clear()
+
+    def flush_to_metrics(self, *, reset: bool = True) -> int:
+        """Escribe una fila por endpoint en outputs/metrics.csv. Devuelve filas escritas."""
+        from fx25.modules.metrics import record_metric
+
+        snap = self.snapshot()
+        for endpoint, s in snap.items():
+            errors = sum(v for k, v in s["status"].items() if not (k.startswith("2") or k == "DRY"))
+            record_metric({
+                "task_type": "shopify_call",
+                "model_used": endpoint,
+                "ok": errors == 0,
+                "latency_ms": round(s["network"]["mean_ms"], 3),
+                "note": (
+                    f"n={s['count']} retries={s['retries']} "
+                    f"net_p50={s['network']['p50_ms']:.1f} net_p99={s['network']['p99_ms']:.1f} "
+                    f"wait_p50={s['limiter_wait']['p50_ms']:.1f} wait_p99={s['limiter_wait']['p99_ms']:.1f} "
+                    f"status={s['status']}"
+                ),
+            })
+        if reset:
+            self.reset()
+        return len(snap)
@@ -0,0 +1,164 @@
+# fx25/clients/circuit_breaker.py
+"""
+Circuit breakers por familia de endpoint
+- CircuitBreaker: CLOSED → OPEN → HALF_OPEN → CLOSED, thread-safe (lock propio)
+  * Tasa de fallas en ventana móvil (no un contador crudo)
+  * HALF_OPEN deja pasar UNA sola sonda; el resto falla rápido
+- BreakerRegistry: un breaker por familia ("products", "inventory_levels",
+  "graphql", ...) → una caída parcial de Shopify sólo degrada su tráfico
+"""
+
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+# Severidad para agregar estados (peor estado gana)
+_SEVERITY = {"CLOSED": 0, "HALF_OPEN": 1, "OPEN": 2}
+
+
+def endpoint_family(path: Optional[str]) -> str:
+    """'/products/123.json?x=1' → 'products'; '/inventory_levels.json' → 'inventory_levels'."""
+    if not path:
+        return "default"
+    first = path.split("?", 1)[0].strip("/").split("/", 1)[0]
+    return first[:-5] if first.endswith(".json") else (first or "default")
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str = "default",
+        *,
+        fail_threshold: int = 3,
+        open_seconds: float = 60.0,
+        window_seconds: float = 60.0,
+        failure_rate: float = 0.5,
+    ) -> None:
+        self.name = name
+        self.fail_threshold = int(fail_threshold)
+        self.open_seconds = float(open_seconds)
+        self.window_seconds = float(window_seconds)
+        self.failure_rate = float(failure_rate)
+
+        self.state = "CLOSED"   # CLOSED | HALF_OPEN | OPEN
+        self.opened_at = 0.0
+        self.last_failure_ts = 0.0
+        self.trips = 0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._window: Deque[Tuple[float, bool]] = deque()
+        self._lock = threading.Lock()
+
+    def _trim_unlocked(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self._window and self._window[0][0] < cutoff:
+            self._window.popleft()
+
+    def _counts_unlocked(self) -> Tuple[int, int]:
+        failures = sum(1 for _, ok in self._window if not ok)
+        return len(self._window), failures
+
+    def check(self) -> None:
+        """Lanza RuntimeError si el breaker no admite el request."""
+        with self._lock:
+            if self.state == "CLOSED":
+                return
+            if self.state == "OPEN":
+                remaining = self.open_seconds - (time.time() - self.opened_at)
+                if remaining > 0:
+                    raise RuntimeError(
+                        f"Circuit breaker OPEN [{self.name}]. Retry in ~{int(remaining)}s"
+                    )
+                # Ventana cumplida → HALF_OPEN, este caller es la sonda
+                self.state = "HALF_OPEN"
+                self._probe_in_flight = True
+                self._probe_started = time.time()
+                return
+            # HALF_OPEN: una sola sonda a la vez (una sonda que nunca reportó
+            # resultado se da por perdida tras open_seconds)
+            if self._probe_in_flight and time.time() - self._probe_started < self.open_seconds:
+                raise RuntimeError(f"Circuit breaker HALF_OPEN [{self.name}]: probe in flight")
+            self._probe_in_flight = True
+            self._probe_started = time.time()
+
+    def record_success(self) -> None:
+        now = time.time()
+        with self._lock:
+            if self.state != "CLOSED":
+                self.state = "CLOSED"
+                self._window.clear()
+            self._probe_in_flight = False
+            self._window.append((now, True))
+            self._trim_unlocked(now)
+
+    def record_failure(self) -> None:
+        now = time.time()
+        with self._lock:
+            self.last_failure_ts = now
+            self._probe_in_flight = False
+            if self.state == "HALF_OPEN":
+                # Sonda fallida → reabrir
+                self.state = "OPEN"
+                self.opened_at = now
+                self.trips += 1
+                return
+            self._window.append((now, False))
+            self._trim_unlocked(now)
+            calls, failures = self._counts_unlocked()
+            if (
+                self.state == "CLOSED"
+                and failures >= self.fail_threshold
+                and failures / calls >= self.failure_rate
+            ):
+                self.state = "OPEN"
+                self.opened_at = now
+                self.trips += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        now = time.time()
+        with self._lock:
+            self._trim_unlocked(now)
+            calls, failures = self._counts_unlocked()
+            return {
+                "state": self.state,
+                "calls": calls,
+                "failures": failures,
+                "failure_rate": round(failures / calls, 4) if calls else 0.0,
+                "trips": self.trips,
+                "probe_in_flight": self._probe_in_flight,
+                "open_remaining_s": (
+                    max(0.0, round(self.open_seconds - (now - self.opened_at), 1))
+                    if self.state == "OPEN" else 0.0
+                ),
+            }
+
+
+class BreakerRegistry:
+    """Breakers creados perezosamente por familia de endpoint, mismos parámetros."""
+
+    def __init__(self, **breaker_kwargs: float) -> None:
+        self._kwargs = breaker_kwargs
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: Optional[str]) -> CircuitBreaker:
+        family = endpoint_family(path)
+        with self._lock:
+            breaker = self._breakers.get(family)
+            if breaker is None:
+                breaker = CircuitBreaker(family, **self._kwargs)
+                self._breakers[family] = breaker
+            return breaker
+
+    def worst_state(self) -> str:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        states = [b.state for b in breakers] or ["CLOSED"]
+        return max(states, key=_SEVERITY.__getitem__)
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: b.snapshot() for name, b in sorted(breakers.items())}
@@ -0,0 +1,87 @@
+# fx25/clients/dry_log.py
+"""
+DryCallLog: registro de llamadas simuladas (DRY) sin I/O en el hot path
+- Ring buffer en memoria (deque con maxlen): guarda dicts tal cual, sin json.dumps
+- Sink JSONL opcional: serializa y escribe en lotes de batch_size (un write por lote)
+- verbosity: 0 = silencio, 1 = una línea corta por llamada, 2 = línea + payload (legacy)
+"""
+
+from __future__ import annotations
+import json
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+DryEntry = Tuple[float, str, str, str, Any]  # (ts, event, method, path, payload)
+
+
+class DryCallLog:
+    def __init__(
+        self,
+        *,
+        maxlen: int = 10_000,
+        verbosity: int = 2,
+        sink_path: Optional[str | Path] = None,
+        batch_size: int = 1000,
+    ) -> None:
+        self.verbosity = int(verbosity)
+        self.entries: Deque[DryEntry] = deque(maxlen=max(1, int(maxlen)))
+        self.sink_path = Path(sink_path) if sink_path else None
+        self.batch_size = max(1, int(batch_size))
+        self._pending: List[DryEntry] = []
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        if self.sink_path is not None:
+            self.sink_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def record(self, event: str, method: str, path: str, payload: Any = None) -> None:
+        entry = (time.time(), event, method, path, payload)
+        batch: Optional[List[DryEntry]] = None
+        with self._lock:
+            self.entries.append(entry)
+            self._counts[event] += 1
+            if self.sink_path is not None:
+                self._pending.append(entry)
+                if len(self._pending) >= self.batch_size:
+                    batch, self._pending = self._pending, []
+        if batch:
+            self._write(batch)
+
+        if self.verbosity >= 2:
+            print(
+                f"[SHOPIFY][SIM] {event} method={method} path={path} dry=1 "
+                f"payload={json.dumps(payload, ensure_ascii=False)}"
+            )
+        elif self.verbosity == 1:
+            print(f"[SHOPIFY][SIM] {event} method={method} path={path}")
+
+    def _write(self, batch: List[DryEntry]) -> None:
+        lines = "".join(
+            json.dumps(
+                {"ts": ts, "event": ev, "method": m, "path": p, "payload": pl},
+                ensure_ascii=False, default=str,
+            ) + "\n"
+            for ts, ev, m, p, pl in batch
+        )
+        with self._write_lock, open(self.sink_path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    def flush(self) -> None:
+        """Escribe al sink lo pendiente (no-op sin sink)."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch and self.sink_path is not None:
+            self._write(batch)
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+            self._counts.clear()
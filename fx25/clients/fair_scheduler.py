@@ -0,0 +1,92 @@
+# fx25/clients/fair_scheduler.py
+"""
+FairScheduler: tope global de requests en vuelo repartido entre tiendas
+- slot(store): bloquea hasta obtener uno de los max_concurrency slots
+- Weighted fair queuing: al liberarse un slot se entrega a la tienda con
+  menor tiempo virtual (servicios / peso); una tienda que vuelve de estar
+  ociosa arranca en el reloj virtual actual (no acumula crédito)
+- Hand-off directo al waiter elegido (sin barging); FIFO dentro de cada tienda
+"""
+
+from __future__ import annotations
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator
+
+
+class _Waiter:
+    __slots__ = ("cond", "granted")
+
+    def __init__(self, lock: threading.Lock) -> None:
+        self.cond = threading.Condition(lock)
+        self.granted = False
+
+
+class FairScheduler:
+    def __init__(self, max_concurrency: int = 8) -> None:
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiting = 0
+        self._queues: Dict[str, Deque[_Waiter]] = {}
+        self._weights: Dict[str, float] = {}
+        self._vtime: Dict[str, float] = {}
+        self._vclock = 0.0
+        self._served: Counter = Counter()
+
+    def set_weight(self, key: str, weight: float) -> None:
+        if weight <= 0:
+            raise ValueError("weight debe ser > 0")
+        with self._lock:
+            self._weights[key] = float(weight)
+
+    def _charge_unlocked(self, key: str) -> None:
+        start = max(self._vtime.get(key, 0.0), self._vclock)
+        self._vclock = start
+        self._vtime[key] = start + 1.0 / self._weights.get(key, 1.0)
+        self._in_flight += 1
+        self._served[key] += 1
+
+    def acquire(self, key: str) -> None:
+        with self._lock:
+            if self._waiting == 0 and self._in_flight < self.max_concurrency:
+                self._charge_unlocked(key)
+                return
+            me = _Waiter(self._lock)
+            self._queues.setdefault(key, deque()).append(me)
+            self._waiting += 1
+            while not me.granted:
+                me.cond.wait()
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            while self._waiting and self._in_flight < self.max_concurrency:
+                key = min(
+                    (k for k, q in self._queues.items() if q),
+                    key=lambda k: self._vtime.get(k, 0.0),
+                )
+                waiter = self._queues[key].popleft()
+                self._waiting -= 1
+                self._charge_unlocked(key)
+                waiter.granted = True
+                waiter.cond.notify()
+
+    @contextmanager
+    def slot(self, key: str) -> Iterator[None]:
+        self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "waiting": {k: len(q) for k, q in self._queues.items() if q},
+                "served": dict(self._served),
+            }
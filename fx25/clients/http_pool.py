@@ -0,0 +1,199 @@
+# fx25/clients/http_pool.py
+"""
+Pool de conexiones HTTP/1.1 keep-alive (stdlib, sin dependencias)
+- Una instancia por host (tienda); N conexiones persistentes reutilizables
+- Checkout thread-safe: BoundedSemaphore limita conexiones vivas, LIFO de idle
+- Reconexión transparente si el servidor cerró una conexión reutilizada
+- stream(): respuesta sin leer (file-like) para decodificar bodies grandes en streaming
+- HTTPPoolManager: pools por host compartidos entre clientes (multi-tienda)
+"""
+
+from __future__ import annotations
+import http.client
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Errores típicos de una conexión keep-alive que el servidor ya cerró
+_STALE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class HTTPConnectionPool:
+    def __init__(
+        self,
+        host: str,
+        *,
+        scheme: str = "https",
+        size: int = 4,
+        timeout: float = 30.0,
+    ) -> None:
+        if scheme not in ("http", "https"):
+            raise ValueError(f"scheme inválido: {scheme}")
+        self.host = host
+        self.scheme = scheme
+        self.size = max(1, int(size))
+        self.timeout = float(timeout)
+
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._stats_lock = threading.Lock()
+        self._created = 0
+        self._reused = 0
+        self._closed = False
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        with self._stats_lock:
+            self._created += 1
+        return cls(self.host, timeout=self.timeout)
+
+    @contextmanager
+    def connection(self) -> Iterator[http.client.HTTPConnection]:
+        """Checkout de una conexión. Bloquea si las `size` están en uso."""
+        if self._closed:
+            raise RuntimeError("HTTPConnectionPool cerrado.")
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._new_connection()
+            try:
+                yield conn
+            except BaseException:
+                # Estado del socket desconocido → no reutilizar
+                conn.close()
+                raise
+            finally:
+                if self._closed:
+                    conn.close()
+                else:
+                    self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, Any, bytes]:
+        """
+        Ejecuta un request y devuelve (status, headers, body).
+        Si una conexión reutilizada resulta estar muerta, reintenta UNA vez
+        con conexión nueva (el request nunca llegó al servidor).
+        """
+        for attempt in range(2):
+            with self.connection() as conn:
+                reused = conn.sock is not None
+                try:
+                    conn.request(method, path, body=body, headers=headers or {})
+                    resp = conn.getresponse()
+                    data = resp.read()
+                except _STALE_ERRORS:
+                    conn.close()
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                if reused:
+                    with self._stats_lock:
+                        self._reused += 1
+                if resp.will_close:
+                    conn.close()
+                return resp.status, resp.headers, data
+        raise RuntimeError("unreachable")
+
+    @contextmanager
+    def stream(
+        self,
+        method: str,
+        path: str,
+        *,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Iterator[Tuple[int, Any, http.client.HTTPResponse]]:
+        """
+        Como request() pero entrega (status, headers, resp) SIN leer el body.
+        La conexión queda prestada hasta salir del bloque; si el body no se
+        consumió completo, la conexión se descarta (no es reutilizable).
+        """
+        for attempt in range(2):
+            with self.connection() as conn:
+                reused = conn.sock is not None
+                try:
+                    conn.request(method, path, body=body, headers=headers or {})
+                    resp = conn.getresponse()
+                except _STALE_ERRORS:
+                    conn.close()
+                    if reused and attempt == 0:
+                        continue
+                    raise
+                if reused:
+                    with self._stats_lock:
+                        self._reused += 1
+                try:
+                    yield resp.status, resp.headers, resp
+                finally:
+                    if resp.will_close or not resp.isclosed():
+                        conn.close()
+                return
+
+    def close(self) -> None:
+        """Cierra todas las conexiones idle; las prestadas se cierran al devolverse."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "reused": self._reused,
+                "idle": self._idle.qsize(),
+            }
+
+
+class HTTPPoolManager:
+    """Pools keep-alive compartidos entre clientes: uno por host, creados perezosamente."""
+
+    def __init__(self, *, size_per_host: int = 4, scheme: str = "https", timeout: float = 30.0) -> None:
+        self.size_per_host = max(1, int(size_per_host))
+        self.scheme = scheme
+        self.timeout = float(timeout)
+        self._pools: Dict[str, HTTPConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    def pool_for(self, host: str) -> HTTPConnectionPool:
+        with self._lock:
+            pool = self._pools.get(host)
+            if pool is None:
+                pool = self._pools[host] = HTTPConnectionPool(
+                    host, scheme=self.scheme, size=self.size_per_host, timeout=self.timeout
+                )
+            return pool
+
+    def close(self) -> None:
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            pools = dict(self._pools)
+        return {host: pool.stats for host, pool in pools.items()}
@@ -0,0 +1,104 @@
+# fx25/clients/json_stream.py
+"""
+Decoder JSON incremental para respuestas grandes (stdlib, sin dependencias)
+- iter_json_array(fp, "products"): emite cada elemento de obj["products"] a medida
+  que llegan los bytes; memoria ~ chunk_size + un elemento, no el body completo
+- Otros campos top-level se decodifican y descartan; al cerrar el array se deja de leer
+- UTF-8 partido entre chunks se resuelve con decoder incremental
+"""
+
+from __future__ import annotations
+import codecs
+import json
+from typing import Any, BinaryIO, Iterator
+
+_DECODER = json.JSONDecoder()
+_WS = " \t\n\r"
+
+
+class _Buffer:
+    """Ventana deslizante sobre fp: sólo retiene lo aún no consumido."""
+
+    def __init__(self, fp: BinaryIO, chunk_size: int) -> None:
+        self.fp = fp
+        self.chunk_size = max(1, int(chunk_size))
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Lee un chunk más. False si ya no hay datos."""
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            tail = self.utf8.decode(b"", final=True)
+        else:
+            tail = self.utf8.decode(chunk)
+        self.buf = self.buf[self.pos:] + tail
+        self.pos = 0
+        return bool(chunk) or bool(tail)
+
+    def peek(self) -> str:
+        """Siguiente carácter no-blanco ('' en EOF)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WS:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, ch: str) -> None:
+        got = self.peek()
+        if got != ch:
+            raise ValueError(f"JSON inválido: se esperaba {ch!r}, llegó {got!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decodifica un valor completo, pidiendo más chunks si quedó truncado."""
+        self.peek()
+        while True:
+            try:
+                obj, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # Un número/literal al final del buffer puede seguir en el próximo chunk
+            if end == len(self.buf) and self.buf[self.pos] not in '{["' and self.fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_json_array(fp: BinaryIO, key: str, *, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """
+    Recorre un objeto JSON top-level leído de `fp` (bytes) y emite uno a uno
+    los elementos de obj[key]. Si `key` no existe no emite nada.
+    Lanza ValueError si el documento es inválido.
+    """
+    b = _Buffer(fp, chunk_size)
+    if b.peek() == "":
+        return
+    b.expect("{")
+    if b.peek() == "}":
+        return
+    while True:
+        name = b.value()
+        b.expect(":")
+        if name == key and b.peek() == "[":
+            b.expect("[")
+            if b.peek() == "]":
+                return
+            while True:
+                yield b.value()
+                if b.peek() == "]":
+                    return
+                b.expect(",")
+        b.value()
+        if b.peek() == "}":
+            return
+        b.expect(",")
@@ -0,0 +1,242 @@
+# fx25/clients/shopify_bulk.py
+"""
+Shopify GraphQL Bulk Operations (export/import de catálogo completo)
+- run_query / run_mutation: envían bulkOperationRunQuery / bulkOperationRunMutation
+- wait: polling del estado hasta COMPLETED (o error/timeout)
+- iter_results: descarga el JSONL resultante y lo emite línea a línea (memoria plana)
+- iter_query: todo junto → generador de dicts
+
+Todas las llamadas a la Admin API pasan por ShopifyClient (rate limiter,
+breaker, DRY). La descarga del JSONL va directo a la URL firmada (no es
+la Admin API y no consume el bucket).
+"""
+
+from __future__ import annotations
+import json
+import os
+import tempfile
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, Optional
+from urllib import request
+
+if TYPE_CHECKING:
+    from fx25.clients.shopify_client import ShopifyClient
+
+# Estados terminales de BulkOperation.status
+BULK_TERMINAL = {"COMPLETED", "FAILED", "CANCELED", "EXPIRED"}
+
+CATALOG_EXPORT_QUERY = """
+{
+  products {
+    edges {
+      node {
+        id
+        title
+        updatedAt
+        variants {
+          edges {
+            node { id sku price inventoryItem { id } }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+_RUN_QUERY = """
+mutation($q: String!) {
+  bulkOperationRunQuery(query: $q) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}
+"""
+
+_RUN_MUTATION = """
+mutation($m: String!, $path: String!) {
+  bulkOperationRunMutation(mutation: $m, stagedUploadPath: $path) {
+    bulkOperation { id status }
+    userErrors { field message }
+  }
+}
+"""
+
+_STAGED_UPLOAD = """
+mutation {
+  stagedUploadsCreate(input: [{
+    resource: BULK_MUTATION_VARIABLES,
+    filename: "bulk_vars.jsonl",
+    mimeType: "text/jsonl",
+    httpMethod: POST
+  }]) {
+    stagedTargets { url resourceUrl parameters { name value } }
+    userErrors { field message }
+  }
+}
+"""
+
+_POLL = """
+query($id: ID!) {
+  node(id: $id) {
+    ... on BulkOperation { id status errorCode objectCount url partialDataUrl }
+  }
+}
+"""
+
+
+class ShopifyBulkOperations:
+    def __init__(self, client: "ShopifyClient") -> None:
+        self.client = client
+
+    @staticmethod
+    def _raise_user_errors(node: Dict[str, Any], what: str) -> None:
+        errors = node.get("userErrors") or []
+        if errors:
+            msgs = "; ".join(str(e.get("message")) for e in errors)
+            raise RuntimeError(f"{what}: {msgs}")
+
+    # ------------- Envío -------------
+    def run_query(self, query: str, *, dry: Optional[bool] = None) -> str:
+        """Lanza un bulk query. Devuelve el id de la BulkOperation."""
+        data = self.client.graphql(_RUN_QUERY, {"q": query}, dry=dry)
+        if self.client._is_dry(dry):
+            return "gid://shopify/BulkOperation/dry"
+        node = data.get("bulkOperationRunQuery") or {}
+        self._raise_user_errors(node, "bulkOperationRunQuery")
+        return node["bulkOperation"]["id"]
+
+    def run_mutation(
+        self,
+        mutation: str,
+        variables: Iterable[Dict[str, Any]],
+        *,
+        dry: Optional[bool] = None,
+    ) -> str:
+        """
+        Lanza un bulk mutation. variables: iterable de dicts (una línea JSONL
+        por item). Se escriben a disco y se suben en streaming al staged upload.
+        """
+        d = self.client._is_dry(dry)
+        with tempfile.TemporaryFile("w+b") as fh:
+            count = 0
+            for v in variables:
+                fh.write(json.dumps(v, ensure_ascii=False).encode("utf-8") + b"\n")
+                count += 1
+
+            staged = self.client.graphql(_STAGED_UPLOAD, dry=d)
+            if d:
+                self.client.graphql(_RUN_MUTATION, {"m": mutation, "path": f"dry/{count}"}, dry=True)
+                return "gid://shopify/BulkOperation/dry"
+
+            node = staged.get("stagedUploadsCreate") or {}
+            self._raise_user_errors(node, "stagedUploadsCreate")
+            target = node["stagedTargets"][0]
+            params = {p["name"]: p["value"] for p in target["parameters"]}
+            fh.seek(0)
+            _upload_multipart(target["url"], params, fh)
+
+        data = self.client.graphql(_RUN_MUTATION, {"m": mutation, "path": params["key"]}, dry=False)
+        node = data.get("bulkOperationRunMutation") or {}
+        self._raise_user_errors(node, "bulkOperationRunMutation")
+        return node["bulkOperation"]["id"]
+
+    # ------------- Polling -------------
+    def status(self, op_id: str, *, dry: Optional[bool] = None) -> Dict[str, Any]:
+        data = self.client.graphql(_POLL, {"id": op_id}, dry=dry)
+        if self.client._is_dry(dry):
+            return {"id": op_id, "status": "COMPLETED", "objectCount": "0", "url": None}
+        return data.get("node") or {}
+
+    def wait(
+        self,
+        op_id: str,
+        *,
+        poll_interval: float = 2.0,
+        max_interval: float = 15.0,
+        timeout: float = 3600.0,
+        dry: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """Polling con backoff suave hasta estado terminal. Lanza si no termina en COMPLETED."""
+        deadline = time.monotonic() + timeout
+        interval = poll_interval
+        while True:
+            op = self.status(op_id, dry=dry)
+            state = op.get("status")
+            if state in BULK_TERMINAL:
+                if state != "COMPLETED":
+                    raise RuntimeError(f"Bulk operation {state}: {op.get('errorCode')}")
+                return op
+            if time.monotonic() + interval > deadline:
+                raise TimeoutError(f"Bulk operation {op_id} sin terminar tras {timeout:.0f}s")
+            time.sleep(interval)
+            interval = min(max_interval, interval * 1.5)
+
+    # ------------- Resultados -------------
+    @staticmethod
+    def iter_results(url: Optional[str], *, timeout: float = 60.0) -> Iterator[Dict[str, Any]]:
+        """Stream del JSONL (una línea = un objeto). url=None → operación sin resultados."""
+        if not url:
+            return
+        with request.urlopen(url, timeout=timeout) as resp:
+            for raw in resp:
+                raw = raw.strip()
+                if raw:
+                    yield json.loads(raw)
+
+    def iter_query(
+        self,
+        query: str = CATALOG_EXPORT_QUERY,
+        *,
+        poll_interval: float = 2.0,
+        timeout: float = 3600.0,
+        dry: Optional[bool] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Export completo: run_query → wait → iter_results.
+        Las filas hijas (variantes) traen __parentId apuntando al producto.
+        """
+        op_id = self.run_query(query, dry=dry)
+        op = self.wait(op_id, poll_interval=poll_interval, timeout=timeout, dry=dry)
+        yield from self.iter_results(op.get("url"))
+
+
+def _upload_multipart(url: str, params: Dict[str, str], fh: Any, chunk_size: int = 1 << 16) -> None:
+    """POST multipart/form-data al staged target sin cargar el archivo en memoria."""
+    boundary = uuid.uuid4().hex
+    head = b"".join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode("utf-8")
+        for k, v in params.items()
+    )
+    head += (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="bulk_vars.jsonl"\r\n'
+        f"Content-Type: text/jsonl\r\n\r\n"
+    ).encode("utf-8")
+    tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+    fh.seek(0, os.SEEK_END)
+    size = fh.tell()
+    fh.seek(0)
+
+    def body() -> Iterator[bytes]:
+        yield head
+        while True:
+            chunk = fh.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        yield tail
+
+    req = request.Request(
+        url,
+        data=body(),
+        method="POST",
+        headers={
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+            "Content-Length": str(len(head) + size + len(tail)),
+        },
+    )
+    with request.urlopen(req, timeout=300) as resp:
+        if not 200 <= resp.status < 300:
+            raise RuntimeError(f"staged upload HTTP {resp.status}")
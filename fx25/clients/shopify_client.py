@@ -1,11 +1,33 @@
 # fx25/clients/shopify_client.py
 """
-ShopifyClient v3.1 — production-ready (DRY por defecto)
-- Token bucket 2 req/s (thread-safe con loop, NO recursión)
-- Circuit breaker con el mismo lock, estados OPEN→HALF_OPEN→CLOSED
+ShopifyClient v3.2 — production-ready (DRY por defecto)
+- Token bucket 2 req/s (FIFO con Condition por waiter, NO recursión, NO polling)
+- Circuit breakers por familia de endpoint, OPEN→HALF_OPEN (una sonda)→CLOSED,
+  disparo por tasa de fallas en ventana móvil (ver circuit_breaker.py)
 - Guardrails de precio (±20%); si old_price=None, lee precio actual
+  (read-through sobre price_cache LRU+TTL, actualizado por cada PUT exitoso)
+- bulk: GraphQL Bulk Operations (export/import JSONL en streaming)
+- iter_products: listado perezoso con cursores, projection de campos y prefetch;
+  stream=True decodifica cada página en streaming (memoria plana, ver json_stream)
+- get_product(fields=...): projection server-side; el precio actual pide sólo id,variants
+- get_inventory(_many): SKU→inventory_item vía índice local, levels en lotes de 50
+- update_prices_bulk: lecturas por lote, guardrail vectorizado, writes GraphQL agrupados
 - Cost tracking thread-safe
 - DRY mode: sin red, simula respuestas y ejerce el rate limiter CORRECTAMENTE
+  (registro en ring buffer / sink JSONL por lotes; dry_verbosity=0 → sin prints)
+- Pool keep-alive por tienda (pool_size, HTTP/1.1): sin handshake TCP+TLS por request
+- Multi-tienda: ShopifyClientRegistry inyecta pool compartido + FairScheduler
+  (tope global de requests en vuelo, reparto ponderado entre tiendas)
+- adaptive=True: el bucket local sigue X-Shopify-Shop-Api-Call-Limit y el
+  throttleStatus de GraphQL (capacidad y refill reales de la tienda)
+- metrics: por intento status, espera en limiter/backoff, tiempo en red y estado
+  del breaker; histogramas + snapshot() + flush a metrics.csv (ver call_metrics)
+
+CHANGELOG v3.1→v3.2:
+- FIX: _wait_if_needed era dos implementaciones pegadas (sleep con lock
+  liberado a mano + loop muerto con sleep(0.5) fijo)
+  Ahora: cola FIFO de waiters; sólo la cabeza duerme con timeout exacto
+  Impacto: sin thundering herd ni starvation con 50+ threads
 
 CHANGELOG v3→v3.1:
 - FIX: _wait_if_needed usa sleep(0.5) fijo en lugar de calcular sleep_time
@@ -19,9 +41,28 @@ import json
 import time
 import threading
 import random
-from typing import Any, Dict, Optional
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Deque, Dict, Generator, Iterable, Iterator, List, Optional, Sequence, Tuple
 from urllib import request, parse, error
 
+import numpy as np
+
+from fx25.cache import LRUCache
+from fx25.clients.call_metrics import CallMetrics
+from fx25.clients.circuit_breaker import BreakerRegistry
+from fx25.clients.dry_log import DryCallLog
+from fx25.clients.fair_scheduler import FairScheduler
+from fx25.clients.http_pool import HTTPConnectionPool
+from fx25.clients.json_stream import iter_json_array
+
+if TYPE_CHECKING:
+    from fx25.clients.shopify_bulk import ShopifyBulkOperations
+    from fx25.clients.shopify_sku_index import ShopifySkuIndex
+
 # -------------------------
 # Configuración por entorno
 # -------------------------
@@ -30,10 +71,108 @@ DEF_STORE = os.getenv("SHOPIFY_STORE", "example.myshopify.com")
 DEF_TOKEN = os.getenv("SHOPIFY_ADMIN_TOKEN", "")
 DEF_DRY = os.getenv("DRY_RUN", "1") == "1"
 
+DEF_POOL_SIZE = int(os.getenv("SHOPIFY_POOL_SIZE", "4"))
+DEF_DRY_VERBOSITY = int(os.getenv("SHOPIFY_DRY_VERBOSITY", "2"))
+
+# Reintentos ante 429/5xx (backoff exponencial con jitter si no hay Retry-After)
+_MAX_RETRIES = 5
+_BACKOFF_BASE = 0.8
+
 # Guardrail de precio (20%)
 PRICE_DELTA_LIMIT = float(os.getenv("PRICE_DELTA_LIMIT", "0.20"))
 
 
+def parse_rate_limit(
+    headers: Any,
+    body: Optional[Dict[str, Any]] = None,
+) -> Optional[Tuple[float, float, float]]:
+    """
+    Lee el leaky bucket que reporta Shopify → (capacity, refill_rate, available).
+
+    REST: X-Shopify-Shop-Api-Call-Limit = "usadas/tamaño". El leak rate de
+    Shopify es tamaño/20 por segundo (40→2 req/s, 80→4, 400→20).
+    GraphQL: extensions.cost.throttleStatus (puntos). Se convierte a
+    "requests" dividiendo por el costo de la última query.
+    None si la respuesta no trae información de throttling.
+    """
+    capacity = refill = available = None
+
+    call_limit = headers.get("X-Shopify-Shop-Api-Call-Limit") if headers is not None else None
+    if call_limit:
+        try:
+            used_s, size_s = str(call_limit).split("/", 1)
+            used, size = float(used_s), float(size_s)
+        except ValueError:
+            used = size = 0.0
+        if size > 0:
+            capacity = size
+            refill = size / 20.0
+            available = size - used
+
+    cost = (body or {}).get("extensions", {}).get("cost") if isinstance(body, dict) else None
+    if isinstance(cost, dict) and isinstance(cost.get("throttleStatus"), dict):
+        ts = cost["throttleStatus"]
+        per_call = float(cost.get("actualQueryCost") or cost.get("requestedQueryCost") or 1.0)
+        per_call = max(per_call, 1.0)
+        try:
+            capacity = float(ts["maximumAvailable"]) / per_call
+            refill = float(ts["restoreRate"]) / per_call
+            available = float(ts["currentlyAvailable"]) / per_call
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    if capacity is None or refill is None or available is None:
+        return None
+    return capacity, refill, available
+
+
+def check_price_guardrail(old_price: float, new_price: float) -> float:
+    """Valida ±PRICE_DELTA_LIMIT. Devuelve el delta relativo o lanza ValueError."""
+    if old_price <= 0:
+        raise ValueError("old_price inválido.")
+    delta = abs(new_price - old_price) / old_price
+    if delta > PRICE_DELTA_LIMIT:
+        raise ValueError(
+            f"price_guardrail: delta {delta:.2%} excede límite {PRICE_DELTA_LIMIT:.0%}"
+        )
+    return delta
+
+
+_LINK_NEXT_RE = re.compile(r'<([^>]+)>\s*;\s*rel="?next"?')
+
+
+def _next_page_params(headers: Any) -> Optional[Dict[str, str]]:
+    """Params de la siguiente página desde el header Link, o None si no hay."""
+    link = headers.get("Link") if headers is not None else None
+    if not link:
+        return None
+    m = _LINK_NEXT_RE.search(link)
+    if not m:
+        return None
+    return dict(parse.parse_qsl(parse.urlparse(m.group(1)).query))
+
+
+# Projection mínima para leer precios (variants[0].id / .price)
+_PRICE_FIELDS = "id,variants"
+
+
+def _fields_param(fields: Sequence[str] | str) -> str:
+    return fields if isinstance(fields, str) else ",".join(fields)
+
+
+def _normalize_price_item(item: Any) -> Dict[str, Any]:
+    """(product_id, new_price[, old_price]) o dict → dict normalizado."""
+    if isinstance(item, dict):
+        pid, new, old = item["product_id"], item["new_price"], item.get("old_price")
+    else:
+        pid, new, old = (tuple(item) + (None,))[:3]
+    return {
+        "product_id": str(pid),
+        "new_price": float(new),
+        "old_price": None if old is None else float(old),
+    }
+
+
 class ShopifyClient:
     def __init__(
         self,
@@ -48,11 +187,39 @@ class ShopifyClient:
         # Circuit breaker
         breaker_fail_threshold: int = 3,
         breaker_open_seconds: float = 60.0,
+        breaker_window_seconds: float = 60.0,
+        breaker_failure_rate: float = 0.5,
+        # Rate limit adaptativo (lee headers de Shopify)
+        adaptive: bool = False,
+        adaptive_headroom: float = 1.0,
+        # Pool keep-alive por tienda (0 = urllib sin pool, una conexión por request)
+        pool_size: int = DEF_POOL_SIZE,
+        scheme: str = "https",
+        timeout: float = 30.0,
+        # Caché de precios actuales (0 = desactivado)
+        price_cache_size: int = 10_000,
+        price_cache_ttl: float = 300.0,
+        # DRY: ring buffer + sink JSONL opcional; verbosity 0/1/2 (2 = print legacy)
+        dry_verbosity: int = DEF_DRY_VERBOSITY,
+        dry_log_size: int = 10_000,
+        dry_sink_path: Optional[str] = None,
+        # Multi-tienda (ver shopify_registry): pool compartido y scheduler global
+        pool: Optional[HTTPConnectionPool] = None,
+        scheduler: Optional[FairScheduler] = None,
     ) -> None:
         self.store = store or DEF_STORE
         self.token = (token or DEF_TOKEN).strip()
         self.api_version = api_version
         self.dry = DEF_DRY if dry is None else dry
+        self.scheme = scheme
+        self.timeout = float(timeout)
+
+        # Conexiones persistentes (se crean perezosamente en el primer request real)
+        self.pool_size = pool.size if pool is not None else max(0, int(pool_size))
+        self._pool: Optional[HTTPConnectionPool] = pool
+        self._owns_pool = pool is None
+        self._pool_lock = threading.Lock()
+        self.scheduler = scheduler
 
         # Token bucket
         self.bucket_capacity = float(bucket_capacity)
@@ -60,18 +227,44 @@ class ShopifyClient:
         self.bucket_remaining = self.bucket_capacity
         self.bucket_last_refill = time.monotonic()
         self.bucket_lock = threading.Lock()
+        self._bucket_waiters: Deque[threading.Condition] = deque()
 
-        # Circuit breaker
+        # Modo adaptativo: capacidad/refill se sincronizan con el bucket del servidor
+        self.adaptive = bool(adaptive)
+        self.adaptive_headroom = max(0.0, float(adaptive_headroom))
+        self.server_bucket: Dict[str, float] = {}
+
+        # Circuit breakers por familia de endpoint (products, inventory_levels, graphql...)
         self.breaker_fail_threshold = int(breaker_fail_threshold)
         self.breaker_open_seconds = float(breaker_open_seconds)
-        self.circuit_state = "CLOSED"   # CLOSED | HALF_OPEN | OPEN
-        self.circuit_fail_count = 0
-        self.circuit_last_failure_ts = 0.0
+        self.breakers = BreakerRegistry(
+            fail_threshold=self.breaker_fail_threshold,
+            open_seconds=self.breaker_open_seconds,
+            window_seconds=float(breaker_window_seconds),
+            failure_rate=float(breaker_failure_rate),
+        )
+
+        # Read-through de precios: product_id → (variant_id, price)
+        self.price_cache: Optional[LRUCache] = (
+            LRUCache(price_cache_size, ttl=price_cache_ttl) if price_cache_size > 0 else None
+        )
 
         # Cost tracking
         self._api_call_count = 0
         self._cost_lock = threading.Lock()
 
+        # Registro de llamadas simuladas (sin I/O por llamada con verbosity=0)
+        self.dry_log = DryCallLog(
+            maxlen=dry_log_size, verbosity=dry_verbosity, sink_path=dry_sink_path
+        )
+
+        # Telemetría por llamada (limiter vs red, status, breaker)
+        self.metrics = CallMetrics()
+
+        # Subsistemas perezosos
+        self._bulk: Optional["ShopifyBulkOperations"] = None
+        self._sku_index: Optional["ShopifySkuIndex"] = None
+
         # Flags de prueba (para tests)
         self._force_fail_for_n_calls = 0
 
@@ -88,82 +281,193 @@ class ShopifyClient:
         )
         self.bucket_last_refill = now
 
-    def _wait_if_needed(self) -> None:
+    def _wait_if_needed(self) -> float:
         """
-        Token bucket thread-safe SIN recursión (loop).
+        Token bucket FIFO thread-safe (sin polling).
         Consume 1 token cuando esté disponible.
-        
-        FIX v3.2: Usa threading.Condition para sincronización eficiente.
-        Solo despierta threads cuando hay tokens disponibles.
+
+        Cada thread que no obtiene token inmediato se encola con su propia
+        Condition (sobre bucket_lock). Sólo la cabeza de la cola duerme con
+        timeout = tiempo hasta el siguiente token; el resto duerme sin timeout
+        hasta que la cabeza consume y despierta exactamente al siguiente.
+        Orden de llegada garantizado, sin thundering herd.
+        Devuelve los segundos esperados (para métricas).
         """
         with self.bucket_lock:
-            # Esperar hasta que haya token disponible
-            while self.bucket_remaining < 1.0:
-                # Calcular cuánto esperar: (1 - available) / refill_rate
-                deficit = 1.0 - self.bucket_remaining
-                wait_time = deficit / self.refill_rate
-                
-                # LIBERAR LOCK durante el sleep
-                self.bucket_lock.release()
-                time.sleep(wait_time)
-                self.bucket_lock.acquire()
-                
-                # Rellenar después de despertar
-                self._refill_bucket_unlocked()
-            
-            # Ya tenemos token
-            self.bucket_remaining -= 1.0
+            self._refill_bucket_unlocked()
+            if not self._bucket_waiters and self.bucket_remaining >= 1.0:
+                self.bucket_remaining -= 1.0
+                return 0.0
+
+            t0 = time.monotonic()
+            me = threading.Condition(self.bucket_lock)
+            self._bucket_waiters.append(me)
+            try:
+                while True:
+                    if self._bucket_waiters[0] is not me:
+                        me.wait()
+                        continue
+                    self._refill_bucket_unlocked()
+                    if self.bucket_remaining >= 1.0:
+                        self.bucket_remaining -= 1.0
+                        return time.monotonic() - t0
+                    deficit = 1.0 - self.bucket_remaining
+                    me.wait(deficit / self.refill_rate)
+            finally:
+                self._bucket_waiters.remove(me)
+                if self._bucket_waiters:
+                    self._bucket_waiters[0].notify()
+
+    def _observe_rate_limit(
+        self,
+        headers: Any,
+        body: Optional[Dict[str, Any]] = None,
+    ) -> None:
         """
-        Token bucket thread-safe SIN recursión (loop).
-        Consume 1 token cuando esté disponible.
-        
-        FIX v3.1: Si no hay token, SIEMPRE duerme 0.5s (1 / 2 req/s).
-        No calcula sleep_time porque se desactualiza durante el sleep.
-        Esto garantiza exactamente 2 req/s bajo concurrencia.
+        Ajusta el token bucket local al leaky bucket que reporta Shopify
+        (ver parse_rate_limit). No-op si adaptive=False o no vienen headers.
         """
-        while True:
-            with self.bucket_lock:
-                self._refill_bucket_unlocked()
-                if self.bucket_remaining >= 1.0:
-                    self.bucket_remaining -= 1.0
-                    return
-            
-            # Si llegamos aquí, NO hay token.
-            # Dormir FUERA del lock (no bloquea otros threads).
-            # Siempre 0.5s porque 1 token / 2 req/s = 0.5s
-            time.sleep(0.5)
-            # Loop y vuelve a intentar
-
-    def _check_circuit_breaker(self) -> None:
-        """Verifica si circuit breaker está abierto. Thread-safe."""
-        with self.bucket_lock:  # Mismo lock para consistencia
-            if self.circuit_state == "OPEN":
-                remaining = self.breaker_open_seconds - (time.time() - self.circuit_last_failure_ts)
-                if remaining > 0:
-                    raise RuntimeError(f"Circuit breaker OPEN. Retry in ~{int(remaining)}s")
-                # Ventana cumplida → pasar a HALF_OPEN (una sonda)
-                self.circuit_state = "HALF_OPEN"
-
-    def _record_success(self) -> None:
-        """Registra operación exitosa."""
+        if not self.adaptive:
+            return
+        parsed = parse_rate_limit(headers, body)
+        if parsed is None:
+            return
+        capacity, refill, available = parsed
+
         with self.bucket_lock:
-            if self.circuit_state in ("HALF_OPEN", "OPEN"):
-                self.circuit_state = "CLOSED"
-            self.circuit_fail_count = 0
+            self._refill_bucket_unlocked()
+            self.bucket_capacity = max(1.0, capacity - self.adaptive_headroom)
+            self.refill_rate = max(refill, 0.1)
+            # El header llega con retraso respecto a los requests en vuelo: el
+            # servidor sólo puede BAJAR los tokens locales (nunca reponerlos)
+            self.bucket_remaining = max(0.0, min(
+                self.bucket_capacity, self.bucket_remaining, available - self.adaptive_headroom
+            ))
+            self.server_bucket = {
+                "capacity": capacity,
+                "refill_rate": refill,
+                "available": available,
+                "ts": time.time(),
+            }
+            # El refill/tokens cambiaron: la cabeza recalcula su espera
+            if self._bucket_waiters:
+                self._bucket_waiters[0].notify()
+
+    def _check_circuit_breaker(self, path: Optional[str] = None) -> None:
+        """Verifica el breaker de la familia de `path`. Thread-safe."""
+        self.breakers.get(path).check()
+
+    def _admit(self, method: str, path: str) -> Tuple[float, str]:
+        """
+        Limiter + breaker antes de cada llamada. Devuelve (segundos en el
+        limiter, estado del breaker); un rechazo del breaker queda en métricas.
+        """
+        waited = self._wait_if_needed()
+        breaker = self.breakers.get(path)
+        try:
+            breaker.check()
+        except RuntimeError:
+            self.metrics.record(method, path, "OPEN", wait_s=waited, breaker_state="OPEN")
+            raise
+        return waited, breaker.state
+
+    def _record_success(self, path: Optional[str] = None) -> None:
+        """Registra operación exitosa."""
+        self.breakers.get(path).record_success()
 
-    def _record_failure(self) -> None:
+    def _record_failure(self, path: Optional[str] = None) -> None:
         """Registra operación fallida."""
-        with self.bucket_lock:
-            self.circuit_fail_count += 1
-            self.circuit_last_failure_ts = time.time()
-            if self.circuit_fail_count >= self.breaker_fail_threshold:
-                self.circuit_state = "OPEN"
+        self.breakers.get(path).record_failure()
+
+    @property
+    def circuit_state(self) -> str:
+        """Peor estado entre todos los breakers (compat. dashboards)."""
+        return self.breakers.worst_state()
+
+    def breaker_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Estado por familia de endpoint, para dashboards."""
+        return self.breakers.snapshot()
 
     def _inc_cost(self) -> None:
         """Incrementa contador de llamadas API (thread-safe)."""
         with self._cost_lock:
             self._api_call_count += 1
 
+    # --------- Transporte HTTP ----------
+    def _get_pool(self) -> HTTPConnectionPool:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = HTTPConnectionPool(
+                    self.store, scheme=self.scheme, size=self.pool_size, timeout=self.timeout
+                )
+            return self._pool
+
+    def _send(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes],
+        headers: Dict[str, str],
+    ) -> Tuple[int, Any, bytes]:
+        """
+        Envía el request y devuelve (status, headers, body) para CUALQUIER status.
+        Con pool_size>0 reutiliza conexiones keep-alive; si no, urllib clásico.
+        """
+        with self._scheduled():
+            if self.pool_size > 0:
+                return self._get_pool().request(method, path, body=body, headers=headers)
+
+            url = f"{self.scheme}://{self.store}{path}"
+            req = request.Request(url, data=body, headers=headers, method=method)
+            try:
+                with request.urlopen(req, timeout=self.timeout) as resp:
+                    return resp.status, resp.headers, resp.read()
+            except error.HTTPError as e:
+                return e.code, e.headers, e.read()
+
+    @contextmanager
+    def _scheduled(self) -> Iterator[None]:
+        """Slot del scheduler global multi-tienda (no-op si el cliente es standalone)."""
+        if self.scheduler is None:
+            yield
+            return
+        with self.scheduler.slot(self.store):
+            yield
+
+    @contextmanager
+    def _open_stream(
+        self,
+        method: str,
+        path: str,
+        body: Optional[bytes],
+        headers: Dict[str, str],
+    ) -> Iterator[Tuple[int, Any, Any]]:
+        """Como _send pero entrega (status, headers, fp) con el body SIN leer."""
+        with self._scheduled():
+            if self.pool_size > 0:
+                with self._get_pool().stream(method, path, body=body, headers=headers) as r:
+                    yield r
+                return
+
+            url = f"{self.scheme}://{self.store}{path}"
+            req = request.Request(url, data=body, headers=headers, method=method)
+            try:
+                resp = request.urlopen(req, timeout=self.timeout)
+            except error.HTTPError as e:
+                with e:
+                    yield e.code, e.headers, e
+                return
+            with resp:
+                yield resp.status, resp.headers, resp
+
+    def close(self) -> None:
+        """Cierra el pool de conexiones (si es propio) y vacía el sink DRY."""
+        self.dry_log.flush()
+        with self._pool_lock:
+            if self._pool is not None and self._owns_pool:
+                self._pool.close()
+                self._pool = None
+
     # --------- Requests (DRY / REAL) ----------
     def _request(
         self,
@@ -181,8 +485,7 @@ class ShopifyClient:
             dry = self.dry
 
         # Aplica rate limit local SIEMPRE (también en DRY para testear)
-        self._wait_if_needed()
-        self._check_circuit_breaker()
+        waited, state = self._admit(method, path)
 
         if dry:
             # ----- MODO SIMULACIÓN -----
@@ -196,85 +499,138 @@ class ShopifyClient:
             # Falla forzada para pruebas de circuit breaker
             if self._force_fail_for_n_calls > 0:
                 self._force_fail_for_n_calls -= 1
-                self._record_failure()
-                print(f"[SHOPIFY][SIM] FAIL method={method} path={path}")
+                self._record_failure(path)
+                self.dry_log.record("FAIL", method, path, payload)
+                self.metrics.record(method, path, "ERR", wait_s=waited, breaker_state=state)
                 raise RuntimeError("Simulated request failure (DRY)")
             
             self._inc_cost()
             # Respuesta simulada
-            print(
-                f"[SHOPIFY][SIM] OK method={method} path={path} dry=1 "
-                f"payload={json.dumps(payload, ensure_ascii=False)}"
-            )
-            self._record_success()
+            self.dry_log.record("OK", method, path, payload)
+            self.metrics.record(method, path, "DRY", wait_s=waited, breaker_state=state)
+            self._record_success(path)
             return {"ok": True, "dry": True, "payload": payload}
 
         # ----- MODO REAL (requiere credenciales) -----
+        url, headers = self._prepare_real(path, params)
+        body = None
+        if data is not None:
+            body = json.dumps(data).encode("utf-8")
+
+        # Backoff con jitter ante 429/5xx
+        for attempt in range(_MAX_RETRIES + 1):
+            t0 = time.perf_counter()
+            try:
+                status, resp_headers, raw = self._send(method.upper(), url, body, headers)
+            except Exception:
+                self._record_failure(path)
+                self.metrics.record(method, path, "ERR", attempt=attempt, wait_s=waited,
+                                    network_s=time.perf_counter() - t0, breaker_state=state)
+                raise
+
+            self._inc_cost()
+            self.metrics.record(method, path, status, attempt=attempt, wait_s=waited,
+                                network_s=time.perf_counter() - t0, breaker_state=state)
+
+            if 200 <= status < 300:
+                # json.loads acepta bytes: sin copia intermedia a str
+                parsed = json.loads(raw or b"{}")
+                self._observe_rate_limit(resp_headers, parsed)
+                self._record_success(path)
+                print(f"[SHOPIFY] action={method} status=OK url={path}")
+                return {
+                    "ok": True,
+                    "dry": False,
+                    "status": status,
+                    "json": parsed,
+                    "headers": resp_headers,
+                }
+
+            waited = self._backoff_or_raise(path, status, resp_headers, raw, attempt)
+            state = self.breakers.get(path).state
+
+        raise RuntimeError("Max retries alcanzado (429/5xx sostenido).")
+
+    def _prepare_real(self, path: str, params: Optional[Dict]) -> Tuple[str, Dict[str, str]]:
+        """URL relativa (con query) y headers de auth para el modo real."""
         if not self.token:
-            self._record_failure()
+            self._record_failure(path)
             raise RuntimeError("SHOPIFY_ADMIN_TOKEN vacío.")
-
-        base = f"https://{self.store}/admin/api/{self.api_version}"
-        url = f"{base}{path}"
+        url = f"/admin/api/{self.api_version}{path}"
         if params:
             url += "?" + parse.urlencode(params)
-
         headers = {
             "Content-Type": "application/json",
             "X-Shopify-Access-Token": self.token,
         }
-        body = None
-        if data is not None:
-            body = json.dumps(data).encode("utf-8")
+        return url, headers
 
-        # Backoff con jitter ante 429/5xx
-        max_retries = 5
-        backoff = 0.8
-        for attempt in range(max_retries + 1):
-            req = request.Request(url, data=body, headers=headers, method=method.upper())
+    def _backoff_or_raise(
+        self,
+        path: str,
+        status: int,
+        resp_headers: Any,
+        raw: bytes,
+        attempt: int,
+    ) -> float:
+        """
+        Respuesta no-2xx: duerme el backoff si es reintentable (429/5xx) y
+        devuelve los segundos dormidos; si no, lanza.
+        """
+        self._observe_rate_limit(resp_headers)
+        self._record_failure(path)
+
+        if status == 429 or 500 <= status < 600:
+            retry_after = resp_headers.get("Retry-After") if resp_headers is not None else None
+            if retry_after:
+                sleep_s = float(retry_after)
+            else:
+                sleep_s = _BACKOFF_BASE * (2 ** attempt) + random.uniform(0, 0.2)
+            print(f"[SHOPIFY] status={status} backoff={sleep_s:.2f}s attempt={attempt}")
+            sleep_s = min(sleep_s, 10.0)
+            time.sleep(sleep_s)
+            return sleep_s
+
+        # Otros 4xx = kill inmediato
+        txt = (raw or b"")[:200].decode("utf-8", errors="replace")
+        raise RuntimeError(f"HTTP {status}: {txt}")
+
+    def _stream_items(
+        self,
+        path: str,
+        key: str,
+        *,
+        params: Optional[Dict] = None,
+    ) -> Generator[Any, None, Any]:
+        """
+        GET real con decodificación incremental: emite cada elemento de
+        body[key] sin materializar el body. Devuelve (StopIteration.value)
+        los headers de la respuesta, para seguir el Link de paginación.
+        Los reintentos 429/5xx ocurren antes de emitir el primer elemento.
+        La conexión queda tomada mientras el caller consume.
+        """
+        waited, state = self._admit("GET", path)
+        url, headers = self._prepare_real(path, params)
+
+        for attempt in range(_MAX_RETRIES + 1):
+            t0 = time.perf_counter()
             try:
-                with request.urlopen(req, timeout=30) as resp:
-                    status = resp.status
-                    txt = resp.read().decode("utf-8") if resp.length is None or resp.length > 0 else "{}"
+                with self._open_stream("GET", url, None, headers) as (status, resp_headers, fp):
                     self._inc_cost()
-                    
+                    # Red = hasta recibir headers; el body se consume al ritmo del caller
+                    self.metrics.record("GET", path, status, attempt=attempt, wait_s=waited,
+                                        network_s=time.perf_counter() - t0, breaker_state=state)
                     if 200 <= status < 300:
-                        self._record_success()
-                        print(f"[SHOPIFY] action={method} status=OK url={path}")
-                        return {
-                            "ok": True,
-                            "dry": False,
-                            "status": status,
-                            "json": json.loads(txt or "{}")
-                        }
-                    
-                    # Trata 4xx/5xx
-                    if status == 429 or 500 <= status < 600:
-                        self._record_failure()
-                        retry_after = resp.headers.get("Retry-After")
-                        if retry_after:
-                            sleep_s = float(retry_after)
-                        else:
-                            sleep_s = backoff * (2 ** attempt) + random.uniform(0, 0.2)
-                        print(f"[SHOPIFY] status={status} backoff={sleep_s:.2f}s attempt={attempt}")
-                        time.sleep(min(sleep_s, 10.0))
-                        continue
-                    
-                    # Otros 4xx = kill inmediato
-                    self._record_failure()
-                    raise RuntimeError(f"HTTP {status}: {txt[:200]}")
-
-            except error.HTTPError as e:
-                self._record_failure()
-                if e.code == 429 or 500 <= e.code < 600:
-                    sleep_s = backoff * (2 ** attempt) + random.uniform(0, 0.2)
-                    print(f"[SHOPIFY] HTTPError={e.code} backoff={sleep_s:.2f}s attempt={attempt}")
-                    time.sleep(min(sleep_s, 10.0))
-                    continue
-                raise
+                        self._observe_rate_limit(resp_headers)
+                        yield from iter_json_array(fp, key)
+                        self._record_success(path)
+                        return resp_headers
+                    raw = fp.read()
             except Exception:
-                self._record_failure()
+                self._record_failure(path)
                 raise
+            waited = self._backoff_or_raise(path, status, resp_headers, raw, attempt)
+            state = self.breakers.get(path).state
 
         raise RuntimeError("Max retries alcanzado (429/5xx sostenido).")
 
@@ -291,6 +647,20 @@ class ShopifyClient:
         """
         return self._request("POST", "/products.json", data=spec, dry=dry)
 
+    def get_product(
+        self,
+        product_id: str,
+        *,
+        fields: Optional[Sequence[str] | str] = None,
+        dry: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Lee un producto. fields: projection server-side (p.ej. ("id", "variants"))
+        para no bajar body_html, images, options... cuando no se usan.
+        """
+        params = {"fields": _fields_param(fields)} if fields else None
+        return self._request("GET", f"/products/{product_id}.json", params=params, dry=dry)
+
     def get_inventory(
         self,
         sku: str,
@@ -298,23 +668,166 @@ class ShopifyClient:
         dry: Optional[bool] = None
     ) -> Dict[str, Any]:
         """
-        Obtiene inventario por SKU (stub).
+        Obtiene inventario por SKU.
+        Real: resuelve SKU→inventory_item_id con el índice local (ver sku_index).
         """
         if (self.dry if dry is None else dry):
             # Simulación simple
-            self._wait_if_needed()
-            print(f"[SHOPIFY][SIM] INVENTORY sku={sku} qty=42")
-            self._record_success()
+            waited, state = self._admit("GET", "/inventory_levels.json")
+            self.dry_log.record("INVENTORY", "GET", "/inventory_levels.json", {"sku": sku, "qty": 42})
+            self.metrics.record("GET", "/inventory_levels.json", "DRY", wait_s=waited, breaker_state=state)
+            self._record_success("/inventory_levels.json")
             self._inc_cost()
             return {"ok": True, "dry": True, "sku": sku, "qty": 42}
-        
-        # En real, deberías mapear SKU→variant_id y consultar levels.
-        return self._request(
-            "GET",
-            f"/inventory_levels.json",
-            params={"sku": sku},
-            dry=dry
-        )
+
+        return self.get_inventory_many([sku], dry=False)[sku]
+
+    def get_inventory_many(
+        self,
+        skus: Iterable[str],
+        *,
+        dry: Optional[bool] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Inventario de muchos SKUs: 1 llamada a /inventory_levels.json por cada
+        50 inventory_item_ids. SKUs desconocidos disparan UN refresh delta del índice.
+        """
+        skus = list(dict.fromkeys(skus))
+        if self._is_dry(dry):
+            self._request("GET", "/inventory_levels.json", params={"skus": ",".join(skus)}, dry=True)
+            return {sku: {"ok": True, "dry": True, "sku": sku, "qty": 42} for sku in skus}
+
+        index = self.sku_index
+        found = index.lookup_many(skus)
+        if len(found) < len(skus):
+            index.refresh()
+            found = index.lookup_many(skus)
+
+        by_item: Dict[str, str] = {
+            e["inventory_item_id"]: sku for sku, e in found.items() if e["inventory_item_id"]
+        }
+        out: Dict[str, Dict[str, Any]] = {
+            sku: {"ok": False, "dry": False, "sku": sku, "error": "sku_not_found"}
+            for sku in skus if sku not in found
+        }
+        for sku, e in found.items():
+            out[sku] = {"ok": True, "dry": False, "sku": sku, "qty": 0, "levels": [],
+                        "variant_id": e["variant_id"], "inventory_item_id": e["inventory_item_id"]}
+
+        item_ids = list(by_item)
+        for i in range(0, len(item_ids), 50):
+            chunk = item_ids[i:i + 50]
+            params = {"inventory_item_ids": ",".join(chunk), "limit": 250}
+            for page in self._iter_pages("/inventory_levels.json", params):
+                levels = page.get("inventory_levels") or []
+                index.record_levels(levels)
+                for lv in levels:
+                    r = out[by_item[str(lv["inventory_item_id"])]]
+                    r["qty"] += int(lv.get("available") or 0)
+                    r["levels"].append({"location_id": str(lv["location_id"]), "available": lv.get("available")})
+        return out
+
+    @property
+    def sku_index(self) -> "ShopifySkuIndex":
+        """Índice SKU→variant/inventory_item persistente (SQLite)."""
+        if self._sku_index is None:
+            from fx25.clients.shopify_sku_index import ShopifySkuIndex
+            self._sku_index = ShopifySkuIndex(self)
+        return self._sku_index
+
+    def _iter_pages(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        *,
+        prefetch: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        GET paginado con cursores (Link: <...page_info=...>; rel="next").
+        Tras la primera página Shopify sólo admite page_info/limit/fields
+        (limit y fields se arrastran a cada página).
+        prefetch=True: pide la página N+1 en background mientras el caller
+        procesa la N (un solo request adelantado, mismo limiter).
+        """
+        sticky = {k: v for k, v in (params or {}).items() if k in ("limit", "fields")}
+
+        def fetch(p: Dict[str, Any]) -> Dict[str, Any]:
+            return self._request("GET", path, params=p, dry=False)
+
+        def next_params(resp: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            nxt = _next_page_params(resp.get("headers"))
+            return None if nxt is None else {**sticky, **nxt}
+
+        if not prefetch:
+            p: Optional[Dict[str, Any]] = dict(params or {})
+            while p is not None:
+                resp = fetch(p)
+                yield resp.get("json") or {}
+                p = next_params(resp)
+            return
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="shopify-prefetch") as ex:
+            resp = fetch(dict(params or {}))
+            while True:
+                p = next_params(resp)
+                future = ex.submit(fetch, p) if p is not None else None
+                try:
+                    yield resp.get("json") or {}
+                except GeneratorExit:
+                    if future is not None:
+                        future.cancel()
+                    raise
+                if future is None:
+                    return
+                resp = future.result()
+
+    def _iter_page_items(
+        self,
+        path: str,
+        key: str,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[Any]:
+        """Como _iter_pages, pero emite los elementos de body[key] en streaming."""
+        sticky = {k: v for k, v in (params or {}).items() if k in ("limit", "fields")}
+        p: Optional[Dict[str, Any]] = dict(params or {})
+        while p is not None:
+            headers = yield from self._stream_items(path, key, params=p)
+            nxt = _next_page_params(headers)
+            p = None if nxt is None else {**sticky, **nxt}
+
+    def iter_products(
+        self,
+        *,
+        fields: Optional[Sequence[str] | str] = None,
+        page_size: int = 250,
+        prefetch: bool = True,
+        stream: bool = False,
+        dry: Optional[bool] = None,
+        **filters: Any,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lista productos de forma perezosa (generador), paginando con page_info.
+        fields: sólo esos campos (payload más chico), p.ej. ("id", "title", "variants").
+        stream=True: cada página se decodifica producto a producto (memoria plana
+        con páginas de documentos grandes); ignora prefetch.
+        filters: params extra de /products.json (status, updated_at_min, vendor...).
+        DRY: una llamada simulada (ejerce el limiter) y ningún producto.
+        """
+        params: Dict[str, Any] = {"limit": min(250, max(1, int(page_size)))}
+        if fields:
+            params["fields"] = _fields_param(fields)
+        params.update(filters)
+
+        if self._is_dry(dry):
+            self._request("GET", "/products.json", params=params, dry=True)
+            return
+
+        if stream:
+            yield from self._iter_page_items("/products.json", "products", params)
+            return
+
+        for page in self._iter_pages("/products.json", params, prefetch=prefetch):
+            yield from page.get("products") or []
 
     def _get_current_price(
         self,
@@ -325,19 +838,51 @@ class ShopifyClient:
         """
         Obtiene precio actual de un producto.
         Usado por update_price si old_price es None.
+        Read-through: consulta primero price_cache.
         """
+        cached = self._cached_price(product_id)
+        if cached is None:
+            cached = self._read_price(product_id, dry=dry)
+        return cached[1]
+
+    def _read_price(
+        self,
+        product_id: str,
+        *,
+        dry: Optional[bool]
+    ) -> Tuple[Optional[str], float]:
+        """Lee (variant_id, precio) de variants[0] sin caché y lo guarda en price_cache."""
         if (self.dry if dry is None else dry):
             # Simula precio actual determinista
-            return 100.0
+            self._remember_price(product_id, None, 100.0)
+            return None, 100.0
         
-        # Real: GET /products/{id}.json y resolver variant.price
-        resp = self._request("GET", f"/products/{product_id}.json", dry=dry)
+        # Real: GET /products/{id}.json (sólo id,variants) y resolver variant.price
+        resp = self.get_product(product_id, fields=_PRICE_FIELDS, dry=dry)
         try:
             product = resp["json"]["product"]
             variants = product["variants"]
-            return float(variants[0]["price"])
+            price = float(variants[0]["price"])
         except Exception:
             raise RuntimeError("No se pudo leer precio actual del producto.")
+        variant_id = variants[0].get("id")
+        variant_id = None if variant_id is None else str(variant_id)
+        self._remember_price(product_id, variant_id, price)
+        return variant_id, price
+
+    # ------------- Price cache (LRU + TTL) -------------
+    def _cached_price(self, product_id: str) -> Optional[Tuple[Optional[str], float]]:
+        if self.price_cache is None:
+            return None
+        return self.price_cache.get(str(product_id))
+
+    def _remember_price(self, product_id: str, variant_id: Optional[str], price: float) -> None:
+        if self.price_cache is not None:
+            self.price_cache.set(str(product_id), (variant_id, float(price)))
+
+    def _forget_price(self, product_id: str) -> None:
+        if self.price_cache is not None:
+            self.price_cache.invalidate(str(product_id))
 
     def update_price(
         self,
@@ -353,29 +898,29 @@ class ShopifyClient:
         """
         d = self.dry if dry is None else dry
         
+        cached = self._cached_price(product_id)
         if old_price is None:
-            old_price = self._get_current_price(product_id, dry=d)
+            if cached is None:
+                cached = self._read_price(product_id, dry=d)
+            old_price = cached[1]
+        variant_id = cached[0] if cached else None
 
-        if old_price <= 0:
-            raise ValueError("old_price inválido.")
-
-        delta = abs(new_price - old_price) / old_price
-        if delta > PRICE_DELTA_LIMIT:
-            raise ValueError(
-                f"price_guardrail: delta {delta:.2%} excede límite {PRICE_DELTA_LIMIT:.0%}"
-            )
+        check_price_guardrail(old_price, new_price)
 
         if d:
             # Simula PUT de actualización
-            self._wait_if_needed()
+            path = f"/products/{product_id}.json"
+            waited, state = self._admit("PUT", path)
             payload = {
                 "product_id": product_id,
                 "old_price": old_price,
                 "new_price": new_price
             }
-            print(f"[SHOPIFY][SIM] UPDATE_PRICE ok payload={json.dumps(payload, ensure_ascii=False)}")
-            self._record_success()
+            self.dry_log.record("UPDATE_PRICE", "PUT", path, payload)
+            self.metrics.record("PUT", path, "DRY", wait_s=waited, breaker_state=state)
+            self._record_success(path)
             self._inc_cost()
+            self._remember_price(product_id, variant_id, new_price)
             return {"ok": True, "dry": True, "payload": payload}
 
         # Real: PUT a /products/{id}.json o a variant correspondiente
@@ -385,7 +930,239 @@ class ShopifyClient:
                 "variants": [{"price": new_price}]
             }
         }
-        return self._request("PUT", f"/products/{product_id}.json", data=data, dry=d)
+        try:
+            resp = self._request("PUT", f"/products/{product_id}.json", data=data, dry=d)
+        except Exception:
+            # Estado remoto incierto → no confiar en el caché
+            self._forget_price(product_id)
+            raise
+        if variant_id is None:
+            # old_price del caller sin lectura previa: sin variant no sirve como hit
+            self._forget_price(product_id)
+        else:
+            self._remember_price(product_id, variant_id, new_price)
+        return resp
+
+    # ------------- GraphQL -------------
+    def graphql(
+        self,
+        query: str,
+        variables: Optional[Dict[str, Any]] = None,
+        *,
+        dry: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        """
+        POST /graphql.json. Devuelve el bloque `data`; lanza RuntimeError si
+        la respuesta trae `errors` (incluye THROTTLED). En DRY devuelve {}.
+        """
+        payload: Dict[str, Any] = {"query": query}
+        if variables:
+            payload["variables"] = variables
+        resp = self._request("POST", "/graphql.json", data=payload, dry=dry)
+        if resp.get("dry"):
+            return {}
+        body = resp.get("json") or {}
+        if body.get("errors"):
+            msgs = "; ".join(str(e.get("message", e)) for e in body["errors"])
+            raise RuntimeError(f"GraphQL errors: {msgs[:200]}")
+        return body.get("data") or {}
+
+    @property
+    def bulk(self) -> "ShopifyBulkOperations":
+        """Bulk Operations (export/import masivo vía JSONL). Ver shopify_bulk."""
+        if self._bulk is None:
+            from fx25.clients.shopify_bulk import ShopifyBulkOperations
+            self._bulk = ShopifyBulkOperations(self)
+        return self._bulk
+
+    def _is_dry(self, dry: Optional[bool]) -> bool:
+        return self.dry if dry is None else bool(dry)
+
+    # ------------- Bulk repricing -------------
+    def update_prices_bulk(
+        self,
+        items: Iterable[Any],
+        *,
+        batch_size: int = 250,
+        write_batch_size: int = 25,
+        dry: Optional[bool] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Repricing masivo. items: (product_id, new_price[, old_price]) o dicts
+        con esas claves. Generador: devuelve un resultado por item, en orden.
+
+        Por lote de batch_size:
+        1) GET /products.json?ids=... (≤250 ids por request) para los que no traen
+           old_price y, en real, para resolver el variant_id de todos
+        2) Guardrail ±PRICE_DELTA_LIMIT evaluado con arrays (numpy) para todo el lote
+        3) Cambios aceptados agrupados en mutations GraphQL de write_batch_size
+           (productVariantUpdate con alias) → 1 write cada write_batch_size items
+        Rechazos y errores se devuelven como {"ok": False, "error": ...}.
+        """
+        d = self.dry if dry is None else dry
+        it = iter(items)
+        while True:
+            batch = [_normalize_price_item(x) for x in islice(it, max(1, int(batch_size)))]
+            if not batch:
+                return
+            yield from self._update_prices_batch(batch, write_batch_size, d)
+
+    def _update_prices_batch(
+        self,
+        batch: List[Dict[str, Any]],
+        write_batch_size: int,
+        dry: bool,
+    ) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = [
+            {"product_id": x["product_id"], "new_price": x["new_price"], "old_price": x["old_price"], "ok": False}
+            for x in batch
+        ]
+
+        # 1) Lectura batched de precios actuales. En real también se resuelve el
+        # variant_id de los items que traen old_price (la mutation lo necesita)
+        missing = sorted({x["product_id"] for x in batch if x["old_price"] is None or not dry})
+        current: Dict[str, Tuple[Optional[str], float]] = {}
+        if missing:
+            try:
+                current = self._get_current_prices(missing, dry=dry)
+            except Exception as e:
+                for r in results:
+                    if r["old_price"] is None or not dry:
+                        r["error"] = f"fetch_failed: {e}"
+        variant_ids: List[Optional[str]] = []
+        for r in results:
+            variant_id, price = current.get(r["product_id"], (None, None))
+            if r["old_price"] is None and price is not None:
+                r["old_price"] = price
+            variant_ids.append(variant_id)
+
+        # 2) Guardrail vectorizado
+        old = np.array([np.nan if r["old_price"] is None else r["old_price"] for r in results], dtype=float)
+        new = np.array([r["new_price"] for r in results], dtype=float)
+        valid = np.isfinite(old) & (old > 0) & np.isfinite(new)
+        delta = np.full(len(results), np.nan)
+        np.divide(np.abs(new - old), old, out=delta, where=valid)
+        accepted = valid & (delta <= PRICE_DELTA_LIMIT)
+
+        # Último precio gana si un producto aparece varias veces en el lote
+        last_index: Dict[str, int] = {}
+        for i, r in enumerate(results):
+            if not valid[i]:
+                r.setdefault("error", "old_price inválido." if r["old_price"] is not None else "not_found")
+                continue
+            if not dry and variant_ids[i] is None:
+                r.setdefault("error", "variant_not_found")
+                continue
+            r["delta"] = round(float(delta[i]), 4)
+            if not accepted[i]:
+                r["error"] = f"price_guardrail: delta {delta[i]:.2%} excede límite {PRICE_DELTA_LIMIT:.0%}"
+                continue
+            prev = last_index.get(r["product_id"])
+            if prev is not None:
+                results[prev]["error"] = "superseded"
+            last_index[r["product_id"]] = i
+
+        # 3) Escrituras agrupadas
+        to_write = sorted(last_index.values())
+        for start in range(0, len(to_write), max(1, int(write_batch_size))):
+            chunk = to_write[start:start + max(1, int(write_batch_size))]
+            self._write_prices_chunk(
+                [(results[i], variant_ids[i]) for i in chunk],
+                dry=dry,
+            )
+        return results
+
+    def _get_current_prices(
+        self,
+        product_ids: Sequence[str],
+        *,
+        dry: bool,
+    ) -> Dict[str, Tuple[Optional[str], float]]:
+        """
+        product_id → (variant_id, precio de variants[0]). Read-through sobre
+        price_cache; los misses se piden en requests de ≤250 ids (límite de la API).
+        """
+        out: Dict[str, Tuple[Optional[str], float]] = {}
+        misses: List[str] = []
+        for pid in product_ids:
+            cached = self._cached_price(pid)
+            # En real la escritura necesita el variant: una entrada sin él es miss
+            if cached is not None and (dry or cached[0] is not None):
+                out[pid] = cached
+            else:
+                misses.append(pid)
+        if not misses:
+            return out
+
+        if dry:
+            # Misma simulación que _get_current_price, pero pasa por el limiter
+            self._request(
+                "GET", "/products.json",
+                params={"ids": ",".join(misses), "fields": _PRICE_FIELDS}, dry=True,
+            )
+            for pid in misses:
+                out[pid] = (None, 100.0)
+                self._remember_price(pid, None, 100.0)
+            return out
+
+        for start in range(0, len(misses), 250):
+            resp = self._request(
+                "GET",
+                "/products.json",
+                params={"ids": ",".join(misses[start:start + 250]), "fields": _PRICE_FIELDS, "limit": 250},
+                dry=False,
+            )
+            for product in resp["json"].get("products", []):
+                variants = product.get("variants") or []
+                if variants:
+                    pid = str(product["id"])
+                    out[pid] = (str(variants[0]["id"]), float(variants[0]["price"]))
+                    self._remember_price(pid, *out[pid])
+        return out
+
+    def _write_prices_chunk(
+        self,
+        chunk: List[Tuple[Dict[str, Any], Optional[str]]],
+        *,
+        dry: bool,
+    ) -> None:
+        """
+        Una sola mutation GraphQL con un alias por variante. Un item queda ok sólo
+        si su alias vuelve en `data` sin userErrors; `errors` top-level (THROTTLED,
+        id inválido) marca error a todo el chunk.
+        """
+        try:
+            if dry:
+                self._request("POST", "/graphql.json", data={"updates": [
+                    {"product_id": r["product_id"], "old_price": r["old_price"], "new_price": r["new_price"]}
+                    for r, _ in chunk
+                ]}, dry=True)
+                payload = {f"u{n}": {"userErrors": []} for n in range(len(chunk))}
+            else:
+                fields = []
+                for n, (r, variant_id) in enumerate(chunk):
+                    gid = f"gid://shopify/ProductVariant/{variant_id}"
+                    fields.append(
+                        f'u{n}: productVariantUpdate(input: {{id: {json.dumps(gid)}, '
+                        f'price: {json.dumps(str(r["new_price"]))}}}) {{ userErrors {{ field message }} }}'
+                    )
+                payload = self.graphql("mutation { " + " ".join(fields) + " }", dry=False)
+        except Exception as e:
+            for r, _ in chunk:
+                r["error"] = f"write_failed: {e}"
+                self._forget_price(r["product_id"])
+            return
+
+        for n, (r, variant_id) in enumerate(chunk):
+            node = payload.get(f"u{n}")
+            user_errors = (node or {}).get("userErrors") or []
+            if node is None or user_errors:
+                r["error"] = "; ".join(str(e.get("message")) for e in user_errors) or "write_missing_result"
+                self._forget_price(r["product_id"])
+            else:
+                r["ok"] = True
+                r["dry"] = dry
+                self._remember_price(r["product_id"], variant_id, r["new_price"])
 
     # -------- Helpers de test ----------
     def force_fail_next(self, n_calls: int) -> None:
@@ -397,3 +1174,11 @@ class ShopifyClient:
         """Devuelve total de llamadas API (thread-safe)."""
         with self._cost_lock:
             return self._api_call_count
+
+    @property
+    def price_cache_hits(self) -> int:
+        return self.price_cache.hits if self.price_cache is not None else 0
+
+    @property
+    def price_cache_misses(self) -> int:
+        return self.price_cache.misses if self.price_cache is not None else 0
@@ -0,0 +1,401 @@
+# fx25/clients/shopify_outbox.py
+"""
+ShopifyOutbox: cola durable (SQLite) de mutaciones hacia Shopify (write-behind)
+- enqueue_* devuelve al instante una idempotency key; el trabajo sobrevive a un crash
+- Idempotencia: re-encolar con la misma key es no-op (devuelve el job existente)
+- Carriles de prioridad: price fixes (0) antes que listados nuevos (10)
+- Coalescing: varios update_price PENDIENTES del mismo producto → sólo el último valor;
+  la key de cada caller queda como alias del job (outbox_alias) para replay y status
+- Orden por producto: nunca hay dos update_price del mismo producto inflight, y un
+  job viejo que falla no se reintenta si ya hay uno más nuevo (queda 'superseded')
+- Worker pool que drena la cola a través del ShopifyClient (rate limiter + breakers)
+- Recovery: jobs "inflight" de un proceso muerto vuelven a pending al arrancar;
+  create_product lleva el tag idem-<key> y se verifica antes de re-crear
+"""
+
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from fx25.clients.shopify_client import ShopifyClient
+
+OUTBOX_PATH = Path(os.getenv("SHOPIFY_OUTBOX_PATH", "outputs/shopify_outbox.db"))
+
+PRIORITY_PRICE = 0
+PRIORITY_CREATE = 10
+
+
+class ShopifyOutbox:
+    def __init__(
+        self,
+        client: "ShopifyClient",
+        db_path: Path | str = OUTBOX_PATH,
+        *,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 2.0,
+    ) -> None:
+        self.client = client
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = int(max_attempts)
+        self.retry_base_seconds = float(retry_base_seconds)
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._stop = threading.Event()
+        self._workers: List[threading.Thread] = []
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._init_db()
+        self._recover_inflight()
+
+    def _init_db(self) -> None:
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idempotency_key TEXT NOT NULL UNIQUE,
+                    store TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    product_id TEXT,
+                    payload TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    coalesced INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    last_error TEXT,
+                    result TEXT
+                )
+            """)
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS outbox_ready
+                ON outbox (store, status, priority, next_attempt_at, id)
+            """)
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS outbox_coalesce
+                ON outbox (store, kind, product_id, status)
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox_alias (
+                    alias_key TEXT PRIMARY KEY,
+                    idempotency_key TEXT NOT NULL
+                )
+            """)
+
+    def _recover_inflight(self) -> None:
+        """Jobs que quedaron 'inflight' (proceso muerto) vuelven a pending."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'pending' WHERE store = ? AND status = 'inflight'",
+                (self.client.store,),
+            )
+
+    # ------------- Encolado -------------
+    def enqueue_price_update(
+        self,
+        product_id: str,
+        new_price: float,
+        *,
+        old_price: Optional[float] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> str:
+        """
+        Encola un cambio de precio (carril prioritario). Si ya hay uno PENDIENTE
+        para el mismo producto se sobreescribe con este valor (coalescing) y se
+        devuelve la key del job existente; la key del caller queda como alias,
+        así un replay con ella es no-op y status() la resuelve.
+        """
+        key = idempotency_key or uuid.uuid4().hex
+        payload = json.dumps({"product_id": str(product_id), "new_price": float(new_price),
+                              "old_price": None if old_price is None else float(old_price)})
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._resolve(key)
+                if existing:
+                    self._conn.execute("COMMIT")
+                    return existing
+                pending = self._conn.execute(
+                    "SELECT id, idempotency_key FROM outbox "
+                    "WHERE store = ? AND kind = 'update_price' AND product_id = ? AND status = 'pending' "
+                    "ORDER BY id DESC LIMIT 1",
+                    (self.client.store, str(product_id)),
+                ).fetchone()
+                if pending:
+                    self._conn.execute(
+                        "UPDATE outbox SET payload = ?, coalesced = coalesced + 1, updated_at = ? WHERE id = ?",
+                        (payload, now, pending[0]),
+                    )
+                    self._supersede_older(str(product_id), pending[0], pending[1], now)
+                    if idempotency_key:
+                        self._conn.execute(
+                            "INSERT INTO outbox_alias (alias_key, idempotency_key) VALUES (?, ?)",
+                            (idempotency_key, pending[1]),
+                        )
+                    key = pending[1]
+                else:
+                    job_id = self._insert(key, "update_price", str(product_id), payload, PRIORITY_PRICE, now)
+                    self._supersede_older(str(product_id), job_id, key, now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        self._notify()
+        return key
+
+    def enqueue_create_product(
+        self,
+        spec: Dict[str, Any],
+        *,
+        idempotency_key: Optional[str] = None,
+    ) -> str:
+        """Encola un alta de producto (carril normal)."""
+        key = idempotency_key or uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            existing = self._resolve(key)
+            if existing:
+                return existing
+            try:
+                self._insert(key, "create_product", None, json.dumps(spec), PRIORITY_CREATE, now)
+            except sqlite3.IntegrityError:
+                # Misma key ya encolada → idempotente
+                return key
+        self._notify()
+        return key
+
+    def _insert(self, key: str, kind: str, product_id: Optional[str], payload: str, priority: int, now: float) -> int:
+        cur = self._conn.execute(
+            "INSERT INTO outbox (idempotency_key, store, kind, product_id, payload, priority, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, self.client.store, kind, product_id, payload, priority, now, now),
+        )
+        return cur.lastrowid
+
+    def _supersede_older(self, product_id: str, job_id: int, key: str, now: float) -> None:
+        """Jobs de precio más viejos aún pendientes (p.ej. en backoff) ya no deben correr. Llamar con _lock."""
+        self._conn.execute(
+            "UPDATE outbox SET status = 'superseded', result = ?, updated_at = ? "
+            "WHERE store = ? AND kind = 'update_price' AND product_id = ? AND status = 'pending' AND id < ?",
+            (json.dumps({"superseded_by": key}), now, self.client.store, product_id, job_id),
+        )
+
+    def _resolve(self, key: str) -> Optional[str]:
+        """Key del job para `key` (propia o alias de un coalescing). Llamar con _lock."""
+        row = self._conn.execute(
+            "SELECT idempotency_key FROM outbox WHERE idempotency_key = ? "
+            "UNION ALL SELECT idempotency_key FROM outbox_alias WHERE alias_key = ? LIMIT 1",
+            (key, key),
+        ).fetchone()
+        return row[0] if row else None
+
+    # ------------- Consulta -------------
+    def status(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job_key = self._resolve(idempotency_key)
+            row = None if job_key is None else self._conn.execute(
+                "SELECT kind, product_id, status, attempts, coalesced, last_error, result "
+                "FROM outbox WHERE idempotency_key = ?",
+                (job_key,),
+            ).fetchone()
+        if row is None:
+            return None
+        kind, pid, status, attempts, coalesced, err, result = row
+        return {
+            "idempotency_key": job_key,
+            "kind": kind,
+            "product_id": pid,
+            "status": status,
+            "attempts": attempts,
+            "coalesced": coalesced,
+            "last_error": err,
+            "result": json.loads(result) if result else None,
+        }
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM outbox WHERE store = ? GROUP BY status",
+                (self.client.store,),
+            ).fetchall()
+        out = {"pending": 0, "inflight": 0, "done": 0, "failed": 0, "superseded": 0}
+        out.update(dict(rows))
+        return out
+
+    # ------------- Ejecución -------------
+    def _claim(self) -> Optional[tuple]:
+        """
+        Toma el siguiente job listo (prioridad, luego FIFO) y lo marca inflight.
+        Un update_price no se toma mientras otro del mismo producto está inflight.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, idempotency_key, kind, payload, attempts FROM outbox AS o "
+                    "WHERE store = ? AND status = 'pending' AND next_attempt_at <= ? "
+                    "AND NOT (kind = 'update_price' AND EXISTS ("
+                    "    SELECT 1 FROM outbox AS b WHERE b.store = o.store AND b.kind = 'update_price' "
+                    "    AND b.product_id = o.product_id AND b.status = 'inflight')) "
+                    "ORDER BY priority, id LIMIT 1",
+                    (self.client.store, now),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE outbox SET status = 'inflight', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (now, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row
+
+    def _finish(self, job_id: int, status: str, *, error: Optional[str] = None,
+                result: Any = None, retry_at: float = 0.0) -> None:
+        with self._lock:
+            if status == "pending":
+                # Reintento de un update_price: si mientras tanto se encoló uno más
+                # nuevo del mismo producto, éste ya no debe aplicarse
+                newer = self._conn.execute(
+                    "SELECT b.idempotency_key FROM outbox AS o JOIN outbox AS b "
+                    "ON b.store = o.store AND b.kind = o.kind AND b.product_id = o.product_id AND b.id > o.id "
+                    "WHERE o.id = ? AND o.kind = 'update_price' ORDER BY b.id DESC LIMIT 1",
+                    (job_id,),
+                ).fetchone()
+                if newer:
+                    status, result = "superseded", {"superseded_by": newer[0]}
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, last_error = ?, result = ?, next_attempt_at = ?, updated_at = ? "
+                "WHERE id = ?",
+                (status, error, None if result is None else json.dumps(result, default=str),
+                 retry_at, time.time(), job_id),
+            )
+
+    def _execute(self, key: str, kind: str, payload: Dict[str, Any], attempts: int) -> Dict[str, Any]:
+        if kind == "update_price":
+            # Idempotente por naturaleza: fija el precio al valor final
+            resp = self.client.update_price(
+                payload["product_id"], payload["new_price"], old_price=payload.get("old_price")
+            )
+        elif kind == "create_product":
+            spec = json.loads(json.dumps(payload))
+            product = spec.setdefault("product", {})
+            tag = f"idem-{key}"
+            tags = [t.strip() for t in str(product.get("tags") or "").split(",") if t.strip()]
+            if tag not in tags:
+                tags.append(tag)
+            product["tags"] = ", ".join(tags)
+            if attempts > 1 and self._already_created(tag):
+                return {"ok": True, "deduplicated": True}
+            resp = self.client.create_product(spec)
+        else:
+            raise ValueError(f"kind desconocido: {kind}")
+        return {"ok": bool(resp.get("ok")), "status": resp.get("status"), "dry": resp.get("dry")}
+
+    def _already_created(self, tag: str) -> bool:
+        """¿Un intento anterior (quizá de un proceso muerto) ya creó el producto?"""
+        if self.client.dry:
+            return False
+        data = self.client.graphql(
+            "query($q: String!) { products(first: 1, query: $q) { edges { node { id } } } }",
+            {"q": f"tag:'{tag}'"},
+        )
+        return bool(((data.get("products") or {}).get("edges")))
+
+    def run_once(self) -> bool:
+        """Procesa un job si hay alguno listo. Devuelve False si la cola está vacía."""
+        row = self._claim()
+        if row is None:
+            return False
+        job_id, key, kind, payload, attempts = row
+        attempts += 1
+        try:
+            result = self._execute(key, kind, json.loads(payload), attempts)
+        except ValueError as e:
+            # Guardrail / payload inválido: reintentar no sirve
+            self._finish(job_id, "failed", error=str(e))
+        except Exception as e:
+            if attempts >= self.max_attempts:
+                self._finish(job_id, "failed", error=str(e))
+            else:
+                retry_at = time.time() + self.retry_base_seconds * (2 ** (attempts - 1))
+                self._finish(job_id, "pending", error=str(e), retry_at=retry_at)
+        else:
+            self._finish(job_id, "done", result=result)
+        return True
+
+    def _notify(self) -> None:
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def _worker(self) -> None:
+        while not self._stop.is_set():
+            if not self.run_once():
+                with self._wakeup:
+                    self._wakeup.wait(timeout=0.5)
+
+    def start(self, n_workers: int = 4) -> None:
+        """Arranca el pool. El ritmo real lo impone el rate limiter del cliente."""
+        self._stop.clear()
+        for i in range(max(1, int(n_workers))):
+            th = threading.Thread(target=self._worker, daemon=True, name=f"shopify-outbox-{i}")
+            th.start()
+            self._workers.append(th)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que no queden jobs pending/inflight listos. True si vació a tiempo."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            s = self.stats()
+            if s["pending"] == 0 and s["inflight"] == 0:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            if not self._workers:
+                if not self.run_once():
+                    # Todo lo que queda está en backoff: dormir hasta el próximo listo
+                    wait = self._next_ready_in()
+                    if deadline is not None:
+                        wait = min(wait, max(0.0, deadline - time.monotonic()))
+                    time.sleep(wait)
+            else:
+                time.sleep(0.05)
+
+    def _next_ready_in(self) -> float:
+        """
+        Segundos hasta el next_attempt_at más cercano de los pending. Mínimo 10ms:
+        un pending ya vencido puede estar bloqueado por un inflight del mismo producto.
+        """
+        with self._lock:
+            (ready_at,) = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE store = ? AND status = 'pending'",
+                (self.client.store,),
+            ).fetchone()
+        if ready_at is None:
+            return 0.05
+        return max(0.01, ready_at - time.time())
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._notify()
+        for th in self._workers:
+            th.join(timeout=timeout)
+        self._workers = []
+
+    def close(self) -> None:
+        self.stop()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,145 @@
+# fx25/clients/shopify_registry.py
+"""
+ShopifyClientRegistry: un ShopifyClient por tienda con recursos compartidos
+- Por tienda (independientes): token bucket, circuit breakers, price cache, métricas
+- Compartidos: HTTPPoolManager (pools keep-alive por host) y FairScheduler
+  (max_concurrency requests en vuelo en total, reparto ponderado por weight)
+- El limiter de cada tienda se espera ANTES de pedir slot global: una tienda
+  frenada por su propio bucket no ocupa slots de las demás
+- from_env(): SHOPIFY_STORES="tienda1.myshopify.com:shpat_xxx:3,tienda2...:shpat_yyy"
+"""
+
+from __future__ import annotations
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+from fx25.clients.fair_scheduler import FairScheduler
+from fx25.clients.http_pool import HTTPPoolManager
+from fx25.clients.shopify_client import ShopifyClient
+
+
+class ShopifyClientRegistry:
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = 8,
+        pool_size_per_store: int = 4,
+        scheme: str = "https",
+        timeout: float = 30.0,
+        **client_defaults: Any,
+    ) -> None:
+        """client_defaults: kwargs de ShopifyClient aplicados a todas las tiendas."""
+        self.scheduler = FairScheduler(max_concurrency)
+        self.pools = HTTPPoolManager(size_per_host=pool_size_per_store, scheme=scheme, timeout=timeout)
+        self.scheme = scheme
+        self.timeout = float(timeout)
+        self.client_defaults = client_defaults
+        self._clients: Dict[str, ShopifyClient] = {}
+        self._weights: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **kwargs: Any) -> "ShopifyClientRegistry":
+        reg = cls(**kwargs)
+        for entry in os.getenv("SHOPIFY_STORES", "").split(","):
+            parts = [p.strip() for p in entry.split(":")]
+            if len(parts) < 2 or not parts[0]:
+                continue
+            weight = float(parts[2]) if len(parts) > 2 and parts[2] else 1.0
+            reg.register(parts[0], parts[1], weight=weight)
+        return reg
+
+    def register(
+        self,
+        store: str,
+        token: str,
+        *,
+        weight: float = 1.0,
+        **overrides: Any,
+    ) -> ShopifyClient:
+        """
+        Alta (o reemplazo) de una tienda. weight: cuota relativa de slots
+        globales cuando hay contención (3 = el triple que una tienda con 1).
+        """
+        kwargs = {**self.client_defaults, **overrides}
+        client = ShopifyClient(
+            store,
+            token,
+            scheme=self.scheme,
+            timeout=self.timeout,
+            pool=self.pools.pool_for(store),
+            scheduler=self.scheduler,
+            **kwargs,
+        )
+        self.scheduler.set_weight(store, weight)
+        with self._lock:
+            old = self._clients.get(store)
+            self._clients[store] = client
+            self._weights[store] = float(weight)
+        if old is not None:
+            old.close()
+        return client
+
+    def get(self, store: str) -> ShopifyClient:
+        with self._lock:
+            client = self._clients.get(store)
+        if client is None:
+            raise KeyError(f"Tienda no registrada: {store}")
+        return client
+
+    __getitem__ = get
+
+    def __contains__(self, store: object) -> bool:
+        with self._lock:
+            return store in self._clients
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._clients))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado por tienda + scheduler + pools, para dashboards."""
+        with self._lock:
+            clients = dict(self._clients)
+            weights = dict(self._weights)
+        stores: Dict[str, Dict[str, Any]] = {}
+        for store, c in clients.items():
+            stores[store] = {
+                "weight": weights[store],
+                "api_calls": c.api_call_count,
+                "bucket_remaining": c.bucket_remaining,
+                "circuit_state": c.circuit_state,
+                "breakers": c.breaker_snapshot(),
+            }
+        return {"stores": stores, "scheduler": self.scheduler.stats, "pools": self.pools.stats}
+
+    def close(self) -> None:
+        with self._lock:
+            clients: List[ShopifyClient] = list(self._clients.values())
+        for c in clients:
+            c.close()
+        self.pools.close()
+
+    def __enter__(self) -> "ShopifyClientRegistry":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+_registry: Optional[ShopifyClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_shopify_registry() -> ShopifyClientRegistry:
+    """Registry de proceso construido desde SHOPIFY_STORES (perezoso)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ShopifyClientRegistry.from_env()
+        return _registry
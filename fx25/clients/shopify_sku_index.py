@@ -0,0 +1,171 @@
+# fx25/clients/shopify_sku_index.py
+"""
+Índice local SKU → (product_id, variant_id, inventory_item_id, location_ids)
+- Persistente en SQLite (outputs/shopify_sku_index.db), una fila por (store, sku)
+- refresh(): delta con updated_at_min desde el último sync (full=True reconstruye);
+  last_sync avanza sólo al terminar el crawl completo, a la hora en que empezó
+- Las location_ids se aprenden de las respuestas de /inventory_levels.json
+"""
+
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+if TYPE_CHECKING:
+    from fx25.clients.shopify_client import ShopifyClient
+
+SKU_INDEX_PATH = Path(os.getenv("SHOPIFY_SKU_INDEX_PATH", "outputs/shopify_sku_index.db"))
+
+
+class ShopifySkuIndex:
+    def __init__(self, client: "ShopifyClient", db_path: Path | str = SKU_INDEX_PATH) -> None:
+        self.client = client
+        self.store = client.store
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._init_db()
+
+    def _init_db(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS sku_index (
+                    store TEXT NOT NULL,
+                    sku TEXT NOT NULL,
+                    product_id TEXT NOT NULL,
+                    variant_id TEXT NOT NULL,
+                    inventory_item_id TEXT,
+                    location_ids TEXT NOT NULL DEFAULT '[]',
+                    updated_at TEXT,
+                    PRIMARY KEY (store, sku)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS sku_index_meta (
+                    store TEXT PRIMARY KEY,
+                    last_sync TEXT
+                )
+            """)
+
+    # ------------- Lectura -------------
+    def lookup(self, sku: str) -> Optional[Dict[str, Any]]:
+        return self.lookup_many([sku]).get(sku)
+
+    def lookup_many(self, skus: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        skus = list(dict.fromkeys(skus))
+        out: Dict[str, Dict[str, Any]] = {}
+        # SQLite limita variables por statement → chunks de 500
+        for i in range(0, len(skus), 500):
+            chunk = skus[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT sku, product_id, variant_id, inventory_item_id, location_ids "
+                    f"FROM sku_index WHERE store = ? AND sku IN ({marks})",
+                    [self.store, *chunk],
+                ).fetchall()
+            for sku, pid, vid, iid, locs in rows:
+                out[sku] = {
+                    "sku": sku,
+                    "product_id": pid,
+                    "variant_id": vid,
+                    "inventory_item_id": iid,
+                    "location_ids": json.loads(locs or "[]"),
+                }
+        return out
+
+    @property
+    def last_sync(self) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_sync FROM sku_index_meta WHERE store = ?", (self.store,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM sku_index WHERE store = ?", (self.store,)
+            ).fetchone()[0]
+
+    # ------------- Escritura -------------
+    def upsert_products(self, products: Iterable[Dict[str, Any]]) -> int:
+        """Indexa productos REST (con variants). Devuelve variantes con SKU indexadas."""
+        rows = []
+        for p in products:
+            updated = p.get("updated_at")
+            for v in p.get("variants") or []:
+                sku = (v.get("sku") or "").strip()
+                if not sku:
+                    continue
+                iid = v.get("inventory_item_id")
+                rows.append((
+                    self.store, sku, str(p["id"]), str(v["id"]),
+                    None if iid is None else str(iid), updated,
+                ))
+        with self._lock, self._conn:
+            # location_ids se preserva: sólo lo actualiza record_levels
+            self._conn.executemany("""
+                INSERT INTO sku_index (store, sku, product_id, variant_id, inventory_item_id, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(store, sku) DO UPDATE SET
+                    product_id = excluded.product_id,
+                    variant_id = excluded.variant_id,
+                    inventory_item_id = excluded.inventory_item_id,
+                    updated_at = excluded.updated_at
+            """, rows)
+        return len(rows)
+
+    def _set_last_sync(self, ts: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO sku_index_meta (store, last_sync) VALUES (?, ?)
+                ON CONFLICT(store) DO UPDATE SET last_sync = excluded.last_sync
+            """, (self.store, ts))
+
+    def record_levels(self, levels: Iterable[Dict[str, Any]]) -> None:
+        """Guarda las location_ids vistas por inventory_item_id."""
+        by_item: Dict[str, List[str]] = {}
+        for lv in levels:
+            by_item.setdefault(str(lv["inventory_item_id"]), []).append(str(lv["location_id"]))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE sku_index SET location_ids = ? WHERE store = ? AND inventory_item_id = ?",
+                [(json.dumps(sorted(set(locs))), self.store, iid) for iid, locs in by_item.items()],
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sku_index WHERE store = ?", (self.store,))
+            self._conn.execute("DELETE FROM sku_index_meta WHERE store = ?", (self.store,))
+
+    # ------------- Sync -------------
+    def refresh(self, *, full: bool = False) -> int:
+        """
+        Trae productos modificados desde last_sync (updated_at_min) paginando
+        con cursores. full=True borra el índice y lo reconstruye (borra SKUs eliminados).
+        Las páginas vienen ordenadas por id, no por updated_at: el watermark se fija
+        al final con la hora de inicio, así un crawl interrumpido se repite entero.
+        """
+        started = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        if full:
+            self.clear()
+        params: Dict[str, Any] = {"fields": "id,updated_at,variants", "limit": 250}
+        since = self.last_sync
+        if since:
+            params["updated_at_min"] = since
+        count = 0
+        for page in self.client._iter_pages("/products.json", params):
+            count += self.upsert_products(page.get("products") or [])
+        self._set_last_sync(started)
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,290 @@
+# fx25/clients/shopify_standin.py
+"""
+ShopifyStandIn — servidor HTTP/1.1 local que imita la Admin API (para load tests)
+- GET/POST /admin/api/<v>/products.json (ids, fields, limit, page_info + Link)
+- GET/PUT  /admin/api/<v>/products/<id>.json
+- GET      /admin/api/<v>/inventory_levels.json?inventory_item_ids=...
+- POST     /admin/api/<v>/graphql.json (sólo productVariantUpdate con alias)
+- Latencia configurable (fija + jitter), inyección de 429/5xx
+- Leaky bucket real: X-Shopify-Shop-Api-Call-Limit y 429 + Retry-After al llenarse
+
+Uso:
+    with ShopifyStandIn(n_products=100, latency_ms=20) as srv:
+        c = ShopifyClient(srv.store, "token", dry=False, scheme="http")
+"""
+
+from __future__ import annotations
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+_PATH_RE = re.compile(r"^/admin/api/[^/]+/(?P<res>[a-z_]+)(?:/(?P<id>\d+))?\.json$")
+_VARIANT_UPDATE_RE = re.compile(
+    r'(\w+)\s*:\s*productVariantUpdate\(input:\s*\{id:\s*"gid://shopify/ProductVariant/(\d+)",\s*'
+    r'price:\s*"([^"]+)"\}\)'
+)
+
+
+class ShopifyStandIn:
+    def __init__(
+        self,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate_429: float = 0.0,
+        error_rate_5xx: float = 0.0,
+        bucket_size: int = 40,
+        leak_rate: float = 2.0,
+        enforce_bucket: bool = True,
+        retry_after: float = 1.0,
+        n_products: int = 0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.latency_ms = float(latency_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.error_rate_429 = float(error_rate_429)
+        self.error_rate_5xx = float(error_rate_5xx)
+        self.bucket_size = int(bucket_size)
+        self.leak_rate = float(leak_rate)
+        self.enforce_bucket = bool(enforce_bucket)
+        self.retry_after = float(retry_after)
+        self._rng = random.Random(seed)
+
+        self._lock = threading.Lock()
+        self._bucket_level = 0.0
+        self._bucket_ts = time.monotonic()
+        self.products: Dict[int, Dict[str, Any]] = {}
+        self._variant_to_product: Dict[int, int] = {}
+        self._next_id = 1
+        self.stats: Dict[str, int] = {"requests": 0, "ok": 0, "throttled": 0, "injected_429": 0, "injected_5xx": 0}
+        for _ in range(int(n_products)):
+            self._add_product({"title": f"Product {self._next_id}"})
+
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------- Datos -------------
+    def _add_product(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            pid = self._next_id
+            self._next_id += 1
+        variants = spec.get("variants") or [{}]
+        product = {
+            "id": pid,
+            "title": spec.get("title", f"Product {pid}"),
+            "vendor": spec.get("vendor", "standin"),
+            "tags": spec.get("tags", ""),
+            "updated_at": "2024-01-01T00:00:00Z",
+            "variants": [
+                {
+                    "id": pid * 100 + n,
+                    "sku": v.get("sku") or f"SKU-{pid}-{n}",
+                    "price": str(v.get("price", "100.00")),
+                    "inventory_item_id": pid * 100 + 50 + n,
+                }
+                for n, v in enumerate(variants)
+            ],
+        }
+        with self._lock:
+            self.products[pid] = product
+            for v in product["variants"]:
+                self._variant_to_product[v["id"]] = pid
+        return product
+
+    # ------------- Leaky bucket -------------
+    def _take_bucket(self) -> Tuple[bool, str]:
+        with self._lock:
+            now = time.monotonic()
+            self._bucket_level = max(0.0, self._bucket_level - (now - self._bucket_ts) * self.leak_rate)
+            self._bucket_ts = now
+            if self.enforce_bucket and self._bucket_level + 1 > self.bucket_size:
+                return False, f"{self.bucket_size}/{self.bucket_size}"
+            self._bucket_level += 1
+            return True, f"{math.ceil(self._bucket_level)}/{self.bucket_size}"
+
+    # ------------- Ciclo de vida -------------
+    def start(self) -> "ShopifyStandIn":
+        self._server = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="shopify-standin")
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "ShopifyStandIn":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    @property
+    def store(self) -> str:
+        """Valor para ShopifyClient(store=...) junto con scheme="http"."""
+        return f"{self.host}:{self.port}"
+
+
+def _project(product: Dict[str, Any], fields: Optional[str]) -> Dict[str, Any]:
+    if not fields:
+        return product
+    keep = {f.strip() for f in fields.split(",")}
+    return {k: v for k, v in product.items() if k in keep}
+
+
+def _make_handler(srv: ShopifyStandIn) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+            raw = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def _handle(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            with srv._lock:
+                srv.stats["requests"] += 1
+
+            delay = srv.latency_ms + (srv._rng.uniform(0, srv.jitter_ms) if srv.jitter_ms else 0.0)
+            if delay > 0:
+                time.sleep(delay / 1000.0)
+
+            ok, call_limit = srv._take_bucket()
+            headers = {"X-Shopify-Shop-Api-Call-Limit": call_limit}
+            if not ok:
+                with srv._lock:
+                    srv.stats["throttled"] += 1
+                headers["Retry-After"] = f"{srv.retry_after:.1f}"
+                return self._send(429, {"errors": "Exceeded 2 calls per second for api client."}, headers)
+
+            roll = srv._rng.random()
+            if roll < srv.error_rate_429:
+                with srv._lock:
+                    srv.stats["injected_429"] += 1
+                headers["Retry-After"] = f"{srv.retry_after:.1f}"
+                return self._send(429, {"errors": "Throttled (injected)"}, headers)
+            if roll < srv.error_rate_429 + srv.error_rate_5xx:
+                with srv._lock:
+                    srv.stats["injected_5xx"] += 1
+                return self._send(503, {"errors": "Service unavailable (injected)"}, headers)
+
+            url = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            m = _PATH_RE.match(url.path)
+            if not m:
+                return self._send(404, {"errors": "Not Found"}, headers)
+            try:
+                body = json.loads(raw or b"{}")
+            except ValueError:
+                return self._send(400, {"errors": "Invalid JSON"}, headers)
+
+            status, payload, extra = self._route(self.command, m.group("res"), m.group("id"), q, body)
+            headers.update(extra)
+            if 200 <= status < 300:
+                with srv._lock:
+                    srv.stats["ok"] += 1
+            self._send(status, payload, headers)
+
+        def _route(
+            self,
+            method: str,
+            res: str,
+            rid: Optional[str],
+            q: Dict[str, str],
+            body: Dict[str, Any],
+        ) -> Tuple[int, Any, Dict[str, str]]:
+            if res == "products" and rid is None and method == "GET":
+                return self._list_products(q)
+            if res == "products" and rid is None and method == "POST":
+                product = srv._add_product(body.get("product") or {})
+                return 201, {"product": product}, {}
+            if res == "products" and rid is not None:
+                with srv._lock:
+                    product = srv.products.get(int(rid))
+                if product is None:
+                    return 404, {"errors": "Not Found"}, {}
+                if method == "GET":
+                    return 200, {"product": _project(product, q.get("fields"))}, {}
+                if method == "PUT":
+                    variants = (body.get("product") or {}).get("variants") or []
+                    with srv._lock:
+                        for n, v in enumerate(variants[: len(product["variants"])]):
+                            if "price" in v:
+                                product["variants"][n]["price"] = str(v["price"])
+                    return 200, {"product": product}, {}
+            if res == "inventory_levels" and method == "GET":
+                ids = [s for s in q.get("inventory_item_ids", "").split(",") if s]
+                levels = [
+                    {"inventory_item_id": int(i), "location_id": 1, "available": 10}
+                    for i in ids
+                ]
+                return 200, {"inventory_levels": levels}, {}
+            if res == "graphql" and method == "POST":
+                return self._graphql(body.get("query") or "")
+            return 405, {"errors": "Method Not Allowed"}, {}
+
+        def _list_products(self, q: Dict[str, str]) -> Tuple[int, Any, Dict[str, str]]:
+            limit = min(250, int(q.get("limit", 50)))
+            offset = int(q.get("page_info", 0))
+            with srv._lock:
+                items: List[Dict[str, Any]] = [srv.products[k] for k in sorted(srv.products)]
+            if "ids" in q:
+                wanted = {int(x) for x in q["ids"].split(",") if x}
+                items = [p for p in items if p["id"] in wanted]
+            if "updated_at_min" in q:
+                items = [p for p in items if p["updated_at"] >= q["updated_at_min"]]
+            page = items[offset:offset + limit]
+            headers: Dict[str, str] = {}
+            if offset + limit < len(items):
+                nxt = {"limit": limit, "page_info": offset + limit}
+                if "fields" in q:
+                    nxt["fields"] = q["fields"]
+                headers["Link"] = (
+                    f'<http://{srv.store}{urlparse(self.path).path}?{urlencode(nxt)}>; rel="next"'
+                )
+            return 200, {"products": [_project(p, q.get("fields")) for p in page]}, headers
+
+        def _graphql(self, query: str) -> Tuple[int, Any, Dict[str, str]]:
+            data: Dict[str, Any] = {}
+            for alias, vid, price in _VARIANT_UPDATE_RE.findall(query):
+                with srv._lock:
+                    pid = srv._variant_to_product.get(int(vid))
+                    if pid is None:
+                        data[alias] = {"userErrors": [{"field": ["id"], "message": "Variant not found"}]}
+                        continue
+                    for v in srv.products[pid]["variants"]:
+                        if v["id"] == int(vid):
+                            v["price"] = price
+                data[alias] = {"userErrors": []}
+            if not data:
+                return 200, {"errors": [{"message": "Unsupported query in stand-in"}]}, {}
+            return 200, {"data": data}, {}
+
+        do_GET = do_POST = do_PUT = do_DELETE = _handle
+
+    return Handler
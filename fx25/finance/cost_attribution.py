@@ -4,44 +4,136 @@ Cost Attribution System: Track profit real por producto
 - Costos: API, supplier, ads, shipping
 - Revenue: Dinero que entra
 - Resultado: Profit = Revenue - Total Costs
+- Cada track_* deja además un evento en EventStore (historial), en la misma transacción;
+  los costos "set" (product, shipping) registran la diferencia con el valor anterior
+- get_profit_summary lee el rollup incremental del producto (una fila, sin recomputar)
+- backfill_legacy: totales del KV anteriores al EventStore se siembran como eventos
+  (una vez por DB), así el rollup incluye el historial previo
+- get_portfolio_summary: todo el catálogo en una consulta → arrays NumPy (profit, ROAS,
+  margen, anomalías y tendencia vectorizados)
 """
 
+import re
+import time
+from collections import defaultdict
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from fx25.kv.event_store import (
+    KIND_COST_ADS,
+    KIND_COST_PRODUCT,
+    KIND_COST_SHIPPING,
+    KIND_REVENUE,
+    EventStore,
+)
 from fx25.kv.sqlite_kv import get_kv_store
 
+TREND_DAYS = 7            # ventana reciente vs. la anterior del mismo largo
+TREND_THRESHOLD = 0.20    # ±20% de revenue para marcar tendencia
+ANOMALY_Z = 3.5           # z-score robusto (mediana/MAD) del ROAS
+
+LEGACY_TS = 0.0           # ts de los eventos sembrados: anteriores a todo el historial
+_BACKFILL_KEY = "events:legacy_backfill"
+_COST_PARTS = {"product": KIND_COST_PRODUCT, "ads": KIND_COST_ADS, "shipping": KIND_COST_SHIPPING}
+# Claves legacy de CostAttributionElite: revenue:{id}:{channel}:{iso} y cost:{id}:{tipo}:{iso}
+_ELITE_KEY = re.compile(r"^([^:]+):([^:]*):(\d{4}-\d{2}-\d{2}T[\d:.]+)$")
+
+_MONEY = ("revenue", "cost_product", "cost_ads", "cost_shipping", "total_cost", "true_profit")
+
 class CostAttribution:
     def __init__(self):
         self.kv = get_kv_store()
+        self.events = EventStore(self.kv)
+        if not self.kv.get(_BACKFILL_KEY):
+            self.backfill_legacy()
+    
+    def backfill_legacy(self) -> int:
+        """
+        Agrega eventos con la diferencia entre los totales del KV y el rollup
+        (datos previos al EventStore). Idempotente. Devuelve cuántos eventos agregó.
+        """
+        kv_totals: Dict[tuple, float] = defaultdict(float)
+        for prefix in ("revenue:", "cost:"):
+            for key, value in self.kv.scan(prefix):
+                rest = key[len(prefix):]
+                elite = _ELITE_KEY.match(rest)
+                if elite:
+                    # Una clave por movimiento: se acumula sobre el producto real
+                    pid, part = elite.group(1), elite.group(2)
+                    kind = KIND_REVENUE if prefix == "revenue:" else _COST_PARTS.get(part, "cost_other")
+                elif prefix == "revenue:" and ":" not in rest:
+                    pid, kind = rest, KIND_REVENUE
+                else:
+                    pid, _, part = rest.partition(":")
+                    if prefix == "revenue:" or ":" in part or part not in _COST_PARTS:
+                        continue
+                    kind = _COST_PARTS[part]
+                try:
+                    kv_totals[(pid, kind)] += float(value)
+                except (TypeError, ValueError):
+                    continue
+        with self.kv.batch():
+            rollups = {r["product_id"]: r for r in self.events.rollups.products()}
+            rows = []
+            for (pid, kind), value in kv_totals.items():
+                delta = round(value - rollups.get(pid, {}).get(kind, 0.0), 2)
+                if delta:
+                    rows.append((pid, kind, delta, "legacy", LEGACY_TS))
+            self.events.append_many(rows)
+            self.kv.set(_BACKFILL_KEY, True)
+        return len(rows)
+    
+    def _set_cost(self, product_id: str, part: str, kind: str, cost: float) -> None:
+        """Costo con semántica "set": el KV guarda el valor, el evento lleva la diferencia"""
+        key = f"cost:{product_id}:{part}"
+        cost = round(cost, 2)
+        with self.kv.batch():
+            delta = round(cost - (self.kv.get(key) or 0.0), 2)
+            self.kv.set(key, cost)
+            if delta:
+                self.events.append(product_id, kind, delta)
     
     def track_product_cost(self, product_id: str, cost: float) -> None:
         """Costo del producto (supplier)"""
-        key = f"cost:{product_id}:product"
-        self.kv.set(key, round(cost, 2))
+        self._set_cost(product_id, "product", KIND_COST_PRODUCT, cost)
     
     def track_ad_spend(self, product_id: str, spend: float) -> None:
         """Gasto en ads"""
         key = f"cost:{product_id}:ads"
-        current = self.kv.get(key) or 0.0
-        self.kv.set(key, round(current + spend, 2))
+        with self.kv.batch():
+            self.kv.incr_float(key, spend, ndigits=2)
+            self.events.append(product_id, KIND_COST_ADS, spend)
     
     def track_shipping_cost(self, product_id: str, cost: float) -> None:
         """Costo de shipping"""
-        key = f"cost:{product_id}:shipping"
-        self.kv.set(key, round(cost, 2))
+        self._set_cost(product_id, "shipping", KIND_COST_SHIPPING, cost)
     
-    def track_revenue(self, product_id: str, revenue: float) -> None:
+    def track_revenue(self, product_id: str, revenue: float, channel: str = "") -> None:
         """Revenue cuando vende"""
         key = f"revenue:{product_id}"
-        current = self.kv.get(key) or 0.0
-        self.kv.set(key, round(current + revenue, 2))
+        with self.kv.batch():
+            self.kv.incr_float(key, revenue, ndigits=2)
+            self.events.append(product_id, KIND_REVENUE, revenue, channel=channel)
     
     def get_profit_summary(self, product_id: str) -> dict:
         """Calcula profit REAL"""
-        revenue = self.kv.get(f"revenue:{product_id}") or 0.0
-        cost_product = self.kv.get(f"cost:{product_id}:product") or 0.0
-        cost_ads = self.kv.get(f"cost:{product_id}:ads") or 0.0
-        cost_shipping = self.kv.get(f"cost:{product_id}:shipping") or 0.0
+        # Una lectura por PK del rollup; productos sin eventos (datos previos al
+        # EventStore) caen a los totales del KV en un solo get_many
+        rollup = self.events.rollups.product(product_id)
+        if rollup is not None:
+            revenue = rollup["revenue"]
+            cost_product = rollup["cost_product"]
+            cost_ads = rollup["cost_ads"]
+            cost_shipping = rollup["cost_shipping"]
+        else:
+            keys = [f"revenue:{product_id}", f"cost:{product_id}:product",
+                    f"cost:{product_id}:ads", f"cost:{product_id}:shipping"]
+            found = self.kv.get_many(keys)
+            revenue, cost_product, cost_ads, cost_shipping = (found.get(k) or 0.0 for k in keys)
+        cost_other = rollup["cost_other"] if rollup is not None else 0.0
         
-        total_cost = cost_product + cost_ads + cost_shipping
+        total_cost = cost_product + cost_ads + cost_shipping + cost_other
         true_profit = revenue - total_cost
         true_roas = (revenue / total_cost) if total_cost > 0 else 0
         
@@ -56,5 +148,92 @@ class CostAttribution:
             "true_roas": round(true_roas, 2),
         }
 
+    def get_portfolio_summary(
+        self,
+        product_ids: Optional[Sequence[str]] = None,
+        *,
+        now: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Profit de todo el catálogo (o de product_ids) como tabla columnar:
+        product_id (lista) + una columna NumPy por métrica, mismo índice en todas.
+        - trend: +1 / 0 / -1 según revenue de los últimos TREND_DAYS vs. los anteriores
+        - anomaly: ROAS fuera de ANOMALY_Z desvíos robustos del portfolio
+        - totals: agregados del portfolio
+        """
+        now = time.time() if now is None else float(now)
+        recent = time.strftime("%Y-%m-%d", time.gmtime(now - (TREND_DAYS - 1) * 86400))
+        prev = time.strftime("%Y-%m-%d", time.gmtime(now - (2 * TREND_DAYS - 1) * 86400))
+        ids, cols = self.events.rollups.arrays(product_ids, recent_since=recent, prev_since=prev)
+
+        if product_ids is not None:
+            # Productos sin eventos (datos previos al EventStore): totales del KV en un get_many
+            seen = set(ids)
+            legacy = list(dict.fromkeys(str(p) for p in product_ids if str(p) not in seen))
+            if legacy:
+                found = self.kv.get_many(
+                    [f"revenue:{pid}" for pid in legacy]
+                    + [f"cost:{pid}:{t}" for pid in legacy for t in ("product", "ads", "shipping")]
+                )
+                extra = {c: np.zeros(len(legacy)) for c in cols}
+                for i, pid in enumerate(legacy):
+                    extra["revenue"][i] = found.get(f"revenue:{pid}") or 0.0
+                    for t in ("product", "ads", "shipping"):
+                        extra[f"cost_{t}"][i] = found.get(f"cost:{pid}:{t}") or 0.0
+                ids = ids + legacy
+                cols = {c: np.concatenate([cols[c], extra[c]]) for c in cols}
+
+        revenue = cols["revenue"]
+        total_cost = cols["cost_product"] + cols["cost_ads"] + cols["cost_shipping"] + cols["cost_other"]
+        profit = revenue - total_cost
+        roas = np.divide(revenue, total_cost, out=np.zeros_like(revenue), where=total_cost > 0)
+        margin = np.divide(profit, revenue, out=np.zeros_like(revenue), where=revenue > 0)
+
+        anomaly = np.zeros(len(ids), dtype=bool)
+        has_cost = total_cost > 0
+        if has_cost.sum() >= 3:
+            med = np.median(roas[has_cost])
+            dev = np.abs(roas[has_cost] - med)
+            # MAD = 0 (mayoría con el mismo ROAS): escala por desvío absoluto medio
+            scale = np.median(dev) / 0.6745 or dev.mean() * 1.253314
+            if scale > 0:
+                anomaly = has_cost & (np.abs(roas - med) / scale > ANOMALY_Z)
+
+        recent_rev, prev_rev = cols["revenue_recent"], cols["revenue_prev"]
+        trend = np.zeros(len(ids), dtype=np.int8)
+        trend[recent_rev > prev_rev * (1 + TREND_THRESHOLD)] = 1
+        trend[recent_rev < prev_rev * (1 - TREND_THRESHOLD)] = -1
+
+        table: Dict[str, Any] = {"product_id": ids}
+        values = {
+            "revenue": revenue,
+            "cost_product": cols["cost_product"],
+            "cost_ads": cols["cost_ads"],
+            "cost_shipping": cols["cost_shipping"],
+            "total_cost": total_cost,
+            "true_profit": profit,
+        }
+        for c in _MONEY:
+            table[c] = np.round(values[c], 2)
+        table["true_roas"] = np.round(roas, 2)
+        table["margin"] = np.round(margin, 4)
+        table["revenue_recent"] = np.round(recent_rev, 2)
+        table["revenue_prev"] = np.round(prev_rev, 2)
+        table["trend"] = trend
+        table["anomaly"] = anomaly
+
+        tot_rev, tot_cost = float(revenue.sum()), float(total_cost.sum())
+        table["totals"] = {
+            "products": len(ids),
+            "revenue": round(tot_rev, 2),
+            "total_cost": round(tot_cost, 2),
+            "true_profit": round(tot_rev - tot_cost, 2),
+            "true_roas": round(tot_rev / tot_cost, 2) if tot_cost > 0 else 0,
+            "anomalies": int(anomaly.sum()),
+            "growing": int((trend > 0).sum()),
+            "declining": int((trend < 0).sum()),
+        }
+        return table
+
 def get_cost_attribution() -> CostAttribution:
     return CostAttribution()
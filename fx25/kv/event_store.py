@@ -0,0 +1,203 @@
+# fx25/kv/event_store.py
+"""
+EventStore: historial append-only de costos, revenue y ventas
+- Tabla events (product_id, kind, channel, ts, amount) en la misma DB del KV:
+  comparte conexiones por thread y kv.batch() (eventos + contadores en UNA transacción)
+- Índices (product_id, ts) y (ts): ventanas por producto o por catálogo sin full scan
+- append / append_many (executemany); nunca UPDATE ni DELETE
+- Agregaciones en SQL: totales por kind, ventanas (últimas 48h), series por día, velocidad
+- rollups (ver rollups.py): agregados por producto/día actualizados en cada append
+"""
+
+from __future__ import annotations
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fx25.kv.rollups import RollupMaterializer
+from fx25.kv.sqlite_kv import CachedSQLiteKV, get_kv_store
+
+KIND_REVENUE = "revenue"
+KIND_SALE = "sale"
+KIND_COST_PRODUCT = "cost_product"
+KIND_COST_ADS = "cost_ads"
+KIND_COST_SHIPPING = "cost_shipping"
+COST_KINDS = (KIND_COST_PRODUCT, KIND_COST_ADS, KIND_COST_SHIPPING)
+
+DAY = 86400.0
+
+# (product_id, kind, amount, channel, ts)
+EventRow = Tuple[str, str, float, str, float]
+
+
+class EventStore:
+    def __init__(self, kv: Optional[CachedSQLiteKV] = None, *, rollups: bool = True) -> None:
+        """rollups=False: sólo el log (los agregados se ponen al día con rollups.refresh())."""
+        self.kv = kv or get_kv_store()
+        self._init_db()
+        self.rollups = RollupMaterializer(self.kv)
+        self.auto_rollup = bool(rollups)
+
+    def _conn(self):
+        return self.kv._conn()
+
+    def _init_db(self) -> None:
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY,
+                product_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                channel TEXT NOT NULL DEFAULT '',
+                ts REAL NOT NULL,
+                amount REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS events_product_ts ON events (product_id, ts)")
+        conn.execute("CREATE INDEX IF NOT EXISTS events_ts ON events (ts)")
+
+    # ------------- Escritura -------------
+    def append(
+        self,
+        product_id: str,
+        kind: str,
+        amount: float,
+        *,
+        channel: str = "",
+        ts: Optional[float] = None,
+    ) -> int:
+        """Agrega un evento. ts: epoch UTC en segundos (default: ahora). Devuelve su id."""
+        with self.kv.batch():
+            cur = self._conn().execute(
+                "INSERT INTO events (product_id, kind, channel, ts, amount) VALUES (?, ?, ?, ?, ?)",
+                (str(product_id), kind, channel or "", time.time() if ts is None else float(ts), float(amount)),
+            )
+            if self.auto_rollup:
+                self.rollups.refresh()
+        return cur.lastrowid
+
+    def append_many(self, events: Iterable[Sequence[Any] | Dict[str, Any]]) -> int:
+        """
+        Bulk append en una transacción. Cada evento: dict con product_id/kind/amount
+        (+ channel, ts) o tupla (product_id, kind, amount[, channel[, ts]]).
+        """
+        now = time.time()
+        rows: List[EventRow] = []
+        for e in events:
+            if isinstance(e, dict):
+                pid, kind, amount = e["product_id"], e["kind"], e["amount"]
+                channel, ts = e.get("channel") or "", e.get("ts")
+            else:
+                pid, kind, amount = e[0], e[1], e[2]
+                channel = e[3] if len(e) > 3 and e[3] else ""
+                ts = e[4] if len(e) > 4 else None
+            rows.append((str(pid), kind, float(amount), channel, now if ts is None else float(ts)))
+        if not rows:
+            return 0
+        with self.kv.batch():
+            self._conn().executemany(
+                "INSERT INTO events (product_id, kind, amount, channel, ts) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            if self.auto_rollup:
+                self.rollups.refresh()
+        return len(rows)
+
+    # ------------- Lectura / agregaciones -------------
+    @staticmethod
+    def _where(
+        product_id: Optional[str],
+        since: Optional[float],
+        until: Optional[float],
+        kinds: Optional[Sequence[str]] = None,
+    ) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        if product_id is not None:
+            clauses.append("product_id = ?")
+            params.append(str(product_id))
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(float(since))
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(float(until))
+        if kinds:
+            clauses.append(f"kind IN ({','.join('?' * len(kinds))})")
+            params.extend(kinds)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def totals(
+        self,
+        product_id: str,
+        *,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> Dict[str, float]:
+        """kind → suma de amount para un producto en [since, until)."""
+        where, params = self._where(product_id, since, until)
+        rows = self._conn().execute(f"SELECT kind, TOTAL(amount) FROM events{where} GROUP BY kind", params)
+        return dict(rows.fetchall())
+
+    def window_totals(
+        self,
+        kind: str,
+        *,
+        hours: float = 48.0,
+        now: Optional[float] = None,
+        product_ids: Optional[Sequence[str]] = None,
+    ) -> Dict[str, float]:
+        """product_id → suma de `kind` en las últimas `hours` horas (todo el catálogo por default)."""
+        now = time.time() if now is None else float(now)
+        where, params = self._where(None, now - hours * 3600.0, now, [kind])
+        if product_ids is not None:
+            ids = [str(p) for p in product_ids]
+            if not ids:
+                return {}
+            where += f" AND product_id IN ({','.join('?' * len(ids))})"
+            params.extend(ids)
+        rows = self._conn().execute(
+            f"SELECT product_id, TOTAL(amount) FROM events{where} GROUP BY product_id", params
+        )
+        return dict(rows.fetchall())
+
+    def daily(
+        self,
+        product_id: Optional[str] = None,
+        *,
+        kinds: Optional[Sequence[str]] = None,
+        days: int = 30,
+        now: Optional[float] = None,
+    ) -> List[Tuple[str, str, float, int]]:
+        """(día UTC 'YYYY-MM-DD', kind, total, n_eventos) de los últimos `days` días, ordenado."""
+        now = time.time() if now is None else float(now)
+        where, params = self._where(product_id, now - days * DAY, now, kinds)
+        rows = self._conn().execute(
+            "SELECT date(ts, 'unixepoch') AS day, kind, TOTAL(amount), COUNT(*) "
+            f"FROM events{where} GROUP BY day, kind ORDER BY day, kind",
+            params,
+        )
+        return rows.fetchall()
+
+    def velocity(
+        self,
+        product_id: str,
+        kind: str = KIND_SALE,
+        *,
+        hours: float = 48.0,
+        now: Optional[float] = None,
+    ) -> float:
+        """Suma de `kind` por día en la ventana (p.ej. unidades/día en las últimas 48h)."""
+        total = self.window_totals(kind, hours=hours, now=now, product_ids=[product_id])
+        return total.get(str(product_id), 0.0) * 24.0 / hours
+
+    def count(self, product_id: Optional[str] = None) -> int:
+        where, params = self._where(product_id, None, None)
+        return self._conn().execute(f"SELECT COUNT(*) FROM events{where}", params).fetchone()[0]
+
+
+_event_store: Optional[EventStore] = None
+
+
+def get_event_store() -> EventStore:
+    global _event_store
+    if _event_store is None:
+        _event_store = EventStore()
+    return _event_store
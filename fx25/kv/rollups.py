@@ -0,0 +1,293 @@
+# fx25/kv/rollups.py
+"""
+RollupMaterializer: agregados incrementales sobre la tabla events
+- rollup_product (PK product_id) y rollup_daily (PK product_id, day UTC):
+  revenue, costos por tipo, units, n_events, first_ts / last_ts
+- refresh(): procesa SÓLO los eventos con id > high-water mark con un
+  INSERT ... SELECT ... GROUP BY ... ON CONFLICT DO UPDATE (set-based, en SQLite)
+- EventStore llama refresh() en la misma transacción del append: los agregados
+  nunca quedan a medias; inserts crudos a events se recogen en el siguiente refresh
+- profit / ROAS se derivan al leer (una fila por producto, lectura por PK)
+- arrays(): el catálogo entero como columnas NumPy (portfolio), construidas con
+  np.fromiter sin pasar por filas Python; memoizado sobre el high-water mark
+- Ventanas de revenue (reciente / anterior) materializadas en rollup_product:
+  se recalculan cuando cambian los límites (una vez por día) y si no, sólo se
+  les suman los eventos nuevos
+"""
+
+from __future__ import annotations
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from fx25.kv.sqlite_kv import CachedSQLiteKV
+
+# Columnas agregadas (mismo orden en ambas tablas)
+_SUMS = {
+    "revenue": "kind = 'revenue'",
+    "cost_product": "kind = 'cost_product'",
+    "cost_ads": "kind = 'cost_ads'",
+    "cost_shipping": "kind = 'cost_shipping'",
+    "cost_other": "kind LIKE 'cost!_%' ESCAPE '!' AND kind NOT IN ('cost_product', 'cost_ads', 'cost_shipping')",
+    "units": "kind = 'sale'",
+}
+_COLS_DDL = ",\n".join(f"                {c} REAL NOT NULL DEFAULT 0" for c in _SUMS)
+_SELECT_SUMS = ", ".join(f"TOTAL(CASE WHEN {cond} THEN amount END)" for cond in _SUMS.values())
+_UPDATE_SUMS = ", ".join(f"{c} = {c} + excluded.{c}" for c in _SUMS)
+_INSERT_COLS = ", ".join(_SUMS)
+
+_TOTAL_COST = "(cost_product + cost_ads + cost_shipping + cost_other)"
+# Columnas derivadas que devuelven las lecturas
+SUMMARY_SELECT = (
+    f"product_id, {_INSERT_COLS}, {_TOTAL_COST} AS total_cost, "
+    f"revenue - {_TOTAL_COST} AS true_profit, "
+    f"CASE WHEN {_TOTAL_COST} > 0 THEN revenue / {_TOTAL_COST} ELSE 0 END AS true_roas, "
+    "n_events, first_ts, last_ts"
+)
+
+
+class RollupMaterializer:
+    def __init__(self, kv: CachedSQLiteKV) -> None:
+        self.kv = kv
+        self._memo: Optional[Tuple[Any, Tuple[List[str], Dict[str, np.ndarray]]]] = None
+        self._init_db()
+
+    def _conn(self):
+        return self.kv._conn()
+
+    def _init_db(self) -> None:
+        conn = self._conn()
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS rollup_product (
+                product_id TEXT PRIMARY KEY,
+{_COLS_DDL},
+                n_events INTEGER NOT NULL DEFAULT 0,
+                first_ts REAL,
+                last_ts REAL,
+                revenue_recent REAL NOT NULL DEFAULT 0,
+                revenue_prev REAL NOT NULL DEFAULT 0
+            )
+        """)
+        have = {r[1] for r in conn.execute("PRAGMA table_info(rollup_product)")}
+        for col in ("revenue_recent", "revenue_prev"):
+            if col not in have:
+                conn.execute(f"ALTER TABLE rollup_product ADD COLUMN {col} REAL NOT NULL DEFAULT 0")
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS rollup_daily (
+                product_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+{_COLS_DDL},
+                n_events INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (product_id, day)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS rollup_daily_day ON rollup_daily (day)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_state (
+                name TEXT PRIMARY KEY,
+                last_event_id INTEGER NOT NULL
+            )
+        """)
+
+    def _high_water(self) -> int:
+        row = self._conn().execute("SELECT last_event_id FROM rollup_state WHERE name = 'events'").fetchone()
+        return row[0] if row else 0
+
+    # ------------- Materialización -------------
+    def refresh(self) -> int:
+        """Aplica los eventos nuevos a los agregados. Devuelve cuántos eventos procesó."""
+        with self.kv.batch():
+            conn = self._conn()
+            last = self._high_water()
+            top = conn.execute("SELECT MAX(id) FROM events").fetchone()[0] or 0
+            if top <= last:
+                return 0
+            span = (last, top)
+            conn.execute(f"""
+                INSERT INTO rollup_product (product_id, {_INSERT_COLS}, n_events, first_ts, last_ts)
+                SELECT product_id, {_SELECT_SUMS}, COUNT(*), MIN(ts), MAX(ts)
+                FROM events WHERE id > ? AND id <= ? GROUP BY product_id
+                ON CONFLICT(product_id) DO UPDATE SET {_UPDATE_SUMS},
+                    n_events = n_events + excluded.n_events,
+                    first_ts = MIN(first_ts, excluded.first_ts),
+                    last_ts = MAX(last_ts, excluded.last_ts)
+            """, span)
+            conn.execute(f"""
+                INSERT INTO rollup_daily (product_id, day, {_INSERT_COLS}, n_events)
+                SELECT product_id, date(ts, 'unixepoch'), {_SELECT_SUMS}, COUNT(*)
+                FROM events WHERE id > ? AND id <= ? GROUP BY product_id, date(ts, 'unixepoch')
+                ON CONFLICT(product_id, day) DO UPDATE SET {_UPDATE_SUMS},
+                    n_events = n_events + excluded.n_events
+            """, span)
+            conn.execute(
+                "INSERT INTO rollup_state (name, last_event_id) VALUES ('events', ?) "
+                "ON CONFLICT(name) DO UPDATE SET last_event_id = excluded.last_event_id",
+                (top,),
+            )
+            return conn.execute("SELECT COUNT(*) FROM events WHERE id > ? AND id <= ?", span).fetchone()[0]
+
+    def rebuild(self) -> int:
+        """Recalcula todo desde cero (backfill o tras cambiar la definición de columnas)."""
+        with self.kv.batch():
+            conn = self._conn()
+            conn.execute("DELETE FROM rollup_product")
+            conn.execute("DELETE FROM rollup_daily")
+            conn.execute("DELETE FROM rollup_state WHERE name = 'events' OR name LIKE 'window:%'")
+            return self.refresh()
+
+    def _sync_window(self, recent_since: str, prev_since: str) -> None:
+        """
+        Pone al día revenue_recent ([recent_since, ...)) y revenue_prev
+        ([prev_since, recent_since)). Sólo toma el lock de escritura si hace falta.
+        """
+        conn = self._conn()
+        name = f"window:{recent_since}:{prev_since}"
+        row = conn.execute("SELECT last_event_id FROM rollup_state WHERE name = ?", (name,)).fetchone()
+        top = self._high_water()
+        if row is not None and row[0] >= top:
+            return
+        window = {"recent": recent_since, "prev": prev_since}
+        with self.kv.batch():
+            row = conn.execute("SELECT last_event_id FROM rollup_state WHERE name = ?", (name,)).fetchone()
+            top = self._high_water()
+            if row is None:
+                # Límites nuevos: recalcular desde rollup_daily (set-based, sin salir de SQLite)
+                conn.execute("DELETE FROM rollup_state WHERE name LIKE 'window:%'")
+                conn.execute(
+                    "UPDATE rollup_product SET revenue_recent = 0, revenue_prev = 0 "
+                    "WHERE revenue_recent != 0 OR revenue_prev != 0"
+                )
+                conn.execute("""
+                    UPDATE rollup_product AS p SET revenue_recent = t.recent, revenue_prev = t.prev
+                    FROM (SELECT product_id,
+                                 TOTAL(CASE WHEN day >= :recent THEN revenue END) AS recent,
+                                 TOTAL(CASE WHEN day < :recent THEN revenue END) AS prev
+                          FROM rollup_daily WHERE day >= :prev AND revenue != 0 GROUP BY product_id) AS t
+                    WHERE p.product_id = t.product_id
+                """, window)
+            elif row[0] < top:
+                conn.execute("""
+                    UPDATE rollup_product AS p SET revenue_recent = revenue_recent + t.recent,
+                                                   revenue_prev = revenue_prev + t.prev
+                    FROM (SELECT product_id,
+                                 TOTAL(CASE WHEN day >= :recent THEN amount END) AS recent,
+                                 TOTAL(CASE WHEN day < :recent THEN amount END) AS prev
+                          FROM (SELECT product_id, amount, date(ts, 'unixepoch') AS day FROM events
+                                WHERE id > :lo AND id <= :hi AND kind = 'revenue')
+                          WHERE day >= :prev GROUP BY product_id) AS t
+                    WHERE p.product_id = t.product_id
+                """, {**window, "lo": row[0], "hi": top})
+            conn.execute(
+                "INSERT INTO rollup_state (name, last_event_id) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET last_event_id = excluded.last_event_id",
+                (name, top),
+            )
+
+    # ------------- Lectura -------------
+    @staticmethod
+    def _row(cursor, row) -> Dict[str, Any]:
+        return {d[0]: v for d, v in zip(cursor.description, row)}
+
+    def product(self, product_id: str) -> Optional[Dict[str, Any]]:
+        """Agregado de un producto (lectura por PK) o None si no tiene eventos."""
+        cur = self._conn().execute(
+            f"SELECT {SUMMARY_SELECT} FROM rollup_product WHERE product_id = ?", (str(product_id),)
+        )
+        row = cur.fetchone()
+        return None if row is None else self._row(cur, row)
+
+    def products(self, product_ids: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Agregados de todo el catálogo (o de product_ids) en una sola lectura."""
+        sql, params = f"SELECT {SUMMARY_SELECT} FROM rollup_product", []
+        if product_ids is not None:
+            params = [str(p) for p in product_ids]
+            if not params:
+                return []
+            sql += f" WHERE product_id IN ({','.join('?' * len(params))})"
+        cur = self._conn().execute(sql + " ORDER BY product_id", params)
+        return [self._row(cur, r) for r in cur.fetchall()]
+
+    def arrays(
+        self,
+        product_ids: Optional[Sequence[str]] = None,
+        *,
+        recent_since: Optional[str] = None,
+        prev_since: Optional[str] = None,
+    ) -> Tuple[List[str], Dict[str, np.ndarray]]:
+        """
+        (ids, columna → array float64) de rollup_product, ordenado por product_id.
+        Con recent_since/prev_since (días 'YYYY-MM-DD') agrega revenue_recent en
+        [recent_since, ...) y revenue_prev en [prev_since, recent_since) (materializadas).
+        product_ids viaja como un único parámetro JSON (sin límite de variables de SQLite).
+        Los arrays devueltos son de sólo lectura (se comparten con la memo).
+        """
+        if recent_since is not None:
+            self._sync_window(recent_since, prev_since or recent_since)
+        key = (
+            self._high_water(), recent_since, prev_since,
+            None if product_ids is None else tuple(str(p) for p in product_ids),
+        )
+        memo = self._memo
+        if memo is not None and memo[0] == key:
+            return memo[1]
+        cols = list(_SUMS)
+        if recent_since is not None:
+            cols += ["revenue_recent", "revenue_prev"]
+        where, params = "", []
+        if product_ids is not None:
+            where = " WHERE product_id IN (SELECT value FROM json_each(?))"
+            params = [json.dumps(key[3])]
+        conn = self._conn()
+        # ids y números en la misma lectura (snapshot); los números van directo a un
+        # array estructurado, sin construir una fila Python por producto
+        own_tx = not conn.in_transaction
+        if own_tx:
+            conn.execute("BEGIN")
+        try:
+            ids = [r[0] for r in conn.execute(f"SELECT product_id FROM rollup_product{where} ORDER BY product_id", params)]
+            data = np.fromiter(
+                conn.execute(f"SELECT {', '.join(cols)} FROM rollup_product{where} ORDER BY product_id", params),
+                dtype=np.dtype([(c, "f8") for c in cols]),
+                count=len(ids),
+            )
+        finally:
+            if own_tx:
+                conn.execute("COMMIT")
+        columns = {}
+        for c in cols:
+            columns[c] = np.ascontiguousarray(data[c])
+            columns[c].flags.writeable = False
+        result = (ids, columns)
+        self._memo = (key, result)
+        return result
+
+    def daily(
+        self,
+        product_id: Optional[str] = None,
+        *,
+        since_day: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Serie diaria (por producto, o sumada sobre el catálogo si product_id es None)."""
+        clauses, params = [], []
+        if product_id is not None:
+            clauses.append("product_id = ?")
+            params.append(str(product_id))
+        if since_day is not None:
+            clauses.append("day >= ?")
+            params.append(since_day)
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        sums = ", ".join(f"TOTAL({c}) AS {c}" for c in _SUMS)
+        cur = self._conn().execute(
+            f"SELECT day, {sums}, SUM(n_events) AS n_events FROM rollup_daily{where} GROUP BY day ORDER BY day",
+            params,
+        )
+        out = []
+        for r in cur.fetchall():
+            d = self._row(cur, r)
+            cost = d["cost_product"] + d["cost_ads"] + d["cost_shipping"] + d["cost_other"]
+            d["total_cost"] = cost
+            d["true_profit"] = d["revenue"] - cost
+            d["true_roas"] = d["revenue"] / cost if cost > 0 else 0.0
+            out.append(d)
+        return out
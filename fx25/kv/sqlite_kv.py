@@ -1,74 +1,447 @@
 # fx25/kv/sqlite_kv.py - CON CACHE
+import os
 import sqlite3
 import json
-import time
+import threading
+import weakref
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 
+from fx25.cache import LRUCache
+
 DB_PATH = Path("outputs/synapse_kv.db")
 DB_PATH.parent.mkdir(exist_ok=True)
 
+# OFF | NORMAL | FULL | EXTRA. NORMAL + WAL survives process crashes; a power
+# loss may drop the last committed transactions.
+DEF_SYNCHRONOUS = os.getenv("SYNAPSE_KV_SYNCHRONOUS", "NORMAL").upper()
+_SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# Cache bounds: CostAttributionElite writes a new key per event, so the cache
+# must not grow with the keyspace
+DEF_CACHE_MAX_ENTRIES = int(os.getenv("SYNAPSE_KV_CACHE_ENTRIES", "10000"))
+DEF_CACHE_MAX_BYTES = int(os.getenv("SYNAPSE_KV_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+# UPSERT ... RETURNING needs SQLite 3.35+; older builds use upsert + SELECT in one transaction
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Max bound parameters per SELECT ... IN (...) (SQLite < 3.32 caps at 999)
+_IN_CHUNK = 500
+_DELETED = object()
+_MISSING = object()
+
+
+def _prefix_end(prefix: str):
+    """Smallest string greater than every key starting with prefix (None = unbounded)."""
+    for i in range(len(prefix) - 1, -1, -1):
+        if ord(prefix[i]) < 0x10FFFF:
+            return prefix[:i] + chr(ord(prefix[i]) + 1)
+    return None
+
+
+def _encode(value) -> str:
+    return json.dumps(value) if not isinstance(value, str) else value
+
+
+def _decode(raw: str):
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return raw
+
+
+class _ThreadConn:
+    """Owns one thread's connection; closes it when the thread's locals are dropped."""
+
+    __slots__ = ("conn", "_finalizer", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._finalizer = weakref.finalize(self, conn.close)
+
+    def close(self) -> None:
+        self._finalizer()
+
+
 class CachedSQLiteKV:
-    def __init__(self, db_path=DB_PATH, cache_ttl=300):
+    def __init__(self, db_path=DB_PATH, cache_ttl=300, *, synchronous=DEF_SYNCHRONOUS, wal=True,
+                 group_commit_ms=None, group_commit_ops=1000,
+                 cache_max_entries=DEF_CACHE_MAX_ENTRIES, cache_max_bytes=DEF_CACHE_MAX_BYTES):
+        """
+        group_commit_ms: if set, set/delete are buffered and a background thread
+        writes them in one transaction every group_commit_ms or every
+        group_commit_ops writes (reads see buffered values; flush() forces it).
+        A crash loses at most the unflushed window.
+        cache_max_entries / cache_max_bytes: LRU bounds of the read cache
+        (bytes are estimated); expired entries are dropped lazily.
+        """
+        synchronous = str(synchronous).upper()
+        if synchronous not in _SYNCHRONOUS_MODES:
+            raise ValueError(f"synchronous must be one of {_SYNCHRONOUS_MODES}")
         self.db_path = db_path
         self.cache_ttl = cache_ttl
-        self._cache = {}
-        self._cache_times = {}
+        self.synchronous = synchronous
+        self.wal = wal
+        self._cache = LRUCache(cache_max_entries, ttl=cache_ttl, max_bytes=cache_max_bytes)
+        # One long-lived connection per thread (sqlite3 connections are not thread-safe).
+        # Only the thread-local holds it strongly: when the thread exits its locals are
+        # dropped and the connection is closed, so thread churn does not leak fds
+        self._local = threading.local()
+        self._conns = weakref.WeakSet()
+        self._conns_lock = threading.Lock()
         self._init_db()
-    
+
+        # Group commit: key -> value (or _DELETED), last write wins
+        self.group_commit_ms = group_commit_ms
+        self.group_commit_ops = max(1, int(group_commit_ops))
+        self._buffer = {}
+        self._buffer_cond = threading.Condition()
+        # Held from buffer swap to COMMIT (and by batch()/incr) so flushes land in order
+        self._flush_lock = threading.RLock()
+        self._flusher = None
+        self._closing = False
+        if group_commit_ms is not None:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True, name="kv-group-commit")
+            self._flusher.start()
+
+    def _conn(self) -> sqlite3.Connection:
+        """Connection bound to the calling thread, opened once."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: autocommit, each statement is its own transaction
+            conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA busy_timeout = 5000")
+            if self.wal:
+                conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+            owner = _ThreadConn(conn)
+            self._local.conn, self._local.owner = conn, owner
+            with self._conns_lock:
+                self._conns.add(owner)
+        return conn
+
     def _init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS kv_store (
-                    key TEXT PRIMARY KEY,
-                    value TEXT
-                )
-            """)
-            conn.commit()
-    
+        self._conn().execute("""
+            CREATE TABLE IF NOT EXISTS kv_store (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        """)
+
+    # ---------- transactions ----------
+    @contextmanager
+    def batch(self):
+        """
+        Run every set/delete inside the block in ONE transaction (commit on exit,
+        rollback on error). Nested batch() calls join the outer transaction.
+        """
+        local = self._local
+        if getattr(local, "depth", 0) > 0:
+            local.depth += 1
+            try:
+                yield self
+            finally:
+                local.depth -= 1
+            return
+
+        with self._flush_lock if self._flusher is not None else nullcontext():
+            if self._flusher is not None:
+                # Older buffered writes must not land after this transaction
+                self.flush()
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            local.depth, local.touched = 1, set()
+            try:
+                yield self
+            except BaseException:
+                conn.execute("ROLLBACK")
+                for key in local.touched:
+                    self._cache.invalidate(key)
+                raise
+            else:
+                conn.execute("COMMIT")
+            finally:
+                local.depth, local.touched = 0, set()
+
+    def _in_batch(self) -> bool:
+        return getattr(self._local, "depth", 0) > 0
+
+    def _cache_put(self, key: str, value) -> None:
+        self._cache.set(key, value)
+        if self._in_batch():
+            self._local.touched.add(key)
+
+    def _cache_drop(self, key: str) -> None:
+        self._cache.invalidate(key)
+
+    def _buffered(self) -> bool:
+        return self._flusher is not None and not self._in_batch()
+
+    def _buffer_put(self, items) -> None:
+        with self._buffer_cond:
+            self._buffer.update(items)
+            if len(self._buffer) >= self.group_commit_ops:
+                self._buffer_cond.notify()
+
+    # ---------- single-key API ----------
     def set(self, key: str, value) -> None:
         """Store with cache update"""
-        value_json = json.dumps(value) if not isinstance(value, str) else value
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("INSERT OR REPLACE INTO kv_store (key, value) VALUES (?, ?)",
-                        (key, value_json))
-            conn.commit()
+        if self._buffered():
+            self._buffer_put({key: value})
+        else:
+            self._conn().execute("INSERT OR REPLACE INTO kv_store (key, value) VALUES (?, ?)",
+                                 (key, _encode(value)))
         # Update cache
-        self._cache[key] = value
-        self._cache_times[key] = time.time()
-    
+        self._cache_put(key, value)
+
     def get(self, key: str):
         """Get with cache - returns from memory if fresh"""
-        now = time.time()
-        
+        if self._flusher is not None:
+            with self._buffer_cond:
+                buffered = key in self._buffer
+                pending = self._buffer.get(key)
+            if buffered:
+                return None if pending is _DELETED else pending
+
         # Check cache
-        if key in self._cache:
-            cache_age = now - self._cache_times.get(key, 0)
-            if cache_age < self.cache_ttl:
-                return self._cache[key]
-        
+        cached = self._cache.get(key, _MISSING)
+        if cached is not _MISSING:
+            return cached
+
         # Cache miss - read from DB
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("SELECT value FROM kv_store WHERE key = ?", (key,))
-            result = cursor.fetchone()
-            if result:
-                try:
-                    value = json.loads(result[0])
-                except json.JSONDecodeError:
-                    value = result[0]
-                # Store in cache
-                self._cache[key] = value
-                self._cache_times[key] = now
-                return value
+        result = self._conn().execute("SELECT value FROM kv_store WHERE key = ?", (key,)).fetchone()
+        if result:
+            value = _decode(result[0])
+            # Store in cache
+            self._cache.set(key, value)
+            return value
         return None
-    
+
     def delete(self, key: str) -> None:
         """Delete from DB and cache"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("DELETE FROM kv_store WHERE key = ?", (key,))
-            conn.commit()
-        if key in self._cache:
-            del self._cache[key]
-            del self._cache_times[key]
+        if self._buffered():
+            self._buffer_put({key: _DELETED})
+        else:
+            self._conn().execute("DELETE FROM kv_store WHERE key = ?", (key,))
+        self._cache_drop(key)
+
+    # ---------- multi-key API ----------
+    def set_many(self, items) -> None:
+        """Store many (dict or iterable of (key, value)) with one executemany in one transaction"""
+        items = dict(items)
+        if not items:
+            return
+        if self._buffered():
+            self._buffer_put(items)
+        else:
+            with self.batch():
+                self._conn().executemany(
+                    "INSERT OR REPLACE INTO kv_store (key, value) VALUES (?, ?)",
+                    [(k, _encode(v)) for k, v in items.items()],
+                )
+        for k, v in items.items():
+            self._cache_put(k, v)
+
+    def get_many(self, keys) -> dict:
+        """key -> value for the keys that exist; misses are fetched with chunked IN queries"""
+        out, misses = {}, []
+        pending = {}
+        if self._flusher is not None:
+            with self._buffer_cond:
+                pending = dict(self._buffer)
+        for key in dict.fromkeys(keys):
+            if key in pending:
+                if pending[key] is not _DELETED:
+                    out[key] = pending[key]
+            else:
+                cached = self._cache.get(key, _MISSING)
+                if cached is _MISSING:
+                    misses.append(key)
+                else:
+                    out[key] = cached
+
+        conn = self._conn()
+        for i in range(0, len(misses), _IN_CHUNK):
+            chunk = misses[i:i + _IN_CHUNK]
+            rows = conn.execute(
+                f"SELECT key, value FROM kv_store WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for key, raw in rows:
+                value = _decode(raw)
+                out[key] = value
+                self._cache.set(key, value)
+        return out
+
+    def delete_many(self, keys) -> None:
+        """Delete many keys in one transaction"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return
+        if self._buffered():
+            self._buffer_put({k: _DELETED for k in keys})
+        else:
+            with self.batch():
+                self._conn().executemany("DELETE FROM kv_store WHERE key = ?", [(k,) for k in keys])
+        for k in keys:
+            self._cache_drop(k)
+
+    # ---------- atomic counters ----------
+    def incr(self, key: str, delta: int = 1) -> int:
+        """Atomically add delta to an integer counter (missing = 0) and return the new value"""
+        return int(self._incr(key, "CAST(kv_store.value AS INTEGER) + ?", int(delta), int(delta)))
+
+    def incr_float(self, key: str, delta: float, ndigits=None) -> float:
+        """Atomically add delta to a float counter (missing = 0.0); ndigits rounds the stored total"""
+        expr = "CAST(kv_store.value AS REAL) + ?"
+        if ndigits is not None:
+            expr = f"ROUND({expr}, {int(ndigits)})"
+            initial = round(float(delta), int(ndigits))
+        else:
+            initial = float(delta)
+        return float(self._incr(key, expr, float(delta), initial))
+
+    def _incr(self, key: str, expr: str, delta, initial):
+        """Single UPSERT executed by SQLite: no read-modify-write in Python, no lost updates"""
+        upsert = (
+            "INSERT INTO kv_store (key, value) VALUES (?, ?) "
+            f"ON CONFLICT(key) DO UPDATE SET value = {expr}"
+        )
+        params = (key, _encode(initial), delta)
+        conn = self._conn()
+        # The flush lock covers a buffer already swapped out by the flusher but not committed yet
+        with self._flush_lock if self._flusher is not None else nullcontext():
+            if self._flusher is not None:
+                with self._buffer_cond:
+                    buffered = key in self._buffer
+                if buffered:
+                    # The counter's pending value must reach SQLite before adding to it
+                    self.flush()
+            if _HAS_RETURNING:
+                raw = conn.execute(upsert + " RETURNING value", params).fetchone()[0]
+            else:
+                with self.batch():
+                    conn.execute(upsert, params)
+                    raw = conn.execute("SELECT value FROM kv_store WHERE key = ?", (key,)).fetchone()[0]
+            value = _decode(str(raw))
+            # The DB value is authoritative (other threads/processes may have added too)
+            self._cache_put(key, value)
+        return value
+
+    # ---------- ordered scans / aggregates ----------
+    def _range(self, prefix: str, start, end):
+        """WHERE clause + params for keys in [prefix+start, prefix+end) (primary-key range)"""
+        if self._flusher is not None:
+            # Scans read SQLite directly: buffered writes must be there first
+            self.flush()
+        lo = prefix + (start or "")
+        hi = prefix + end if end is not None else _prefix_end(prefix) if prefix else None
+        if hi is None:
+            return "key >= ?", [lo]
+        return "key >= ? AND key < ?", [lo, hi]
+
+    def scan(self, prefix: str = "", start=None, end=None, limit=None, *, page_size: int = 500):
+        """
+        Lazy iterator of (key, value) in key order for keys starting with prefix.
+        start/end bound the part after the prefix: [prefix+start, prefix+end).
+        Reads page_size rows at a time (keyset pagination, no long-lived cursor).
+        """
+        where, params = self._range(prefix, start, end)
+        remaining = None if limit is None else int(limit)
+        conn = self._conn()
+        after = None
+        while remaining is None or remaining > 0:
+            n = page_size if remaining is None else min(page_size, remaining)
+            clause, args = (where, params) if after is None else (where + " AND key > ?", params + [after])
+            rows = conn.execute(
+                f"SELECT key, value FROM kv_store WHERE {clause} ORDER BY key LIMIT ?", args + [n]
+            ).fetchall()
+            for key, raw in rows:
+                yield key, _decode(raw)
+            if len(rows) < n:
+                return
+            after = rows[-1][0]
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def count(self, prefix: str = "", start=None, end=None) -> int:
+        """Number of keys in the prefix range, counted by SQLite"""
+        where, params = self._range(prefix, start, end)
+        return self._conn().execute(f"SELECT COUNT(*) FROM kv_store WHERE {where}", params).fetchone()[0]
+
+    def sum(self, prefix: str = "", start=None, end=None) -> float:
+        """Sum of numeric values in the prefix range, computed by SQLite (non-numeric count as 0)"""
+        where, params = self._range(prefix, start, end)
+        return self._conn().execute(
+            f"SELECT TOTAL(CAST(value AS REAL)) FROM kv_store WHERE {where}", params
+        ).fetchone()[0]
+
+    @property
+    def cache_stats(self) -> dict:
+        """size / bytes / hits / misses / evictions / expirations of the read cache"""
+        return self._cache.stats
+
+    # ---------- group commit ----------
+    def flush(self) -> int:
+        """
+        Write buffered group-commit writes now. Returns how many keys were written.
+        Inside batch() they join the open transaction instead of starting one.
+        """
+        with self._flush_lock:
+            with self._buffer_cond:
+                buffered, self._buffer = self._buffer, {}
+            if not buffered:
+                return 0
+            upserts = [(k, _encode(v)) for k, v in buffered.items() if v is not _DELETED]
+            deletes = [(k,) for k, v in buffered.items() if v is _DELETED]
+            conn = self._conn()
+            own_tx = not self._in_batch()
+            try:
+                if own_tx:
+                    conn.execute("BEGIN IMMEDIATE")
+                if upserts:
+                    conn.executemany("INSERT OR REPLACE INTO kv_store (key, value) VALUES (?, ?)", upserts)
+                if deletes:
+                    conn.executemany("DELETE FROM kv_store WHERE key = ?", deletes)
+                if own_tx:
+                    conn.execute("COMMIT")
+            except BaseException:
+                if own_tx and conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                # Put them back unless newer writes superseded them
+                with self._buffer_cond:
+                    self._buffer = {**buffered, **self._buffer}
+                raise
+            return len(buffered)
+
+    def _flush_loop(self) -> None:
+        interval = self.group_commit_ms / 1000.0
+        while True:
+            with self._buffer_cond:
+                if not self._closing and len(self._buffer) < self.group_commit_ops:
+                    self._buffer_cond.wait(interval)
+                closing = self._closing
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # Retried on the next tick (writes stay buffered)
+                pass
+            if closing:
+                return
+
+    def close(self) -> None:
+        """Flush buffered writes and close every per-thread connection (next call from a thread reopens)."""
+        if self._flusher is not None:
+            with self._buffer_cond:
+                self._closing = True
+                self._buffer_cond.notify()
+            self._flusher.join()
+            self._flusher = None
+            self.flush()
+        with self._conns_lock:
+            conns, self._conns = list(self._conns), weakref.WeakSet()
+        for owner in conns:
+            owner.close()
+        self._local = threading.local()
 
 _kv_instance = None
 
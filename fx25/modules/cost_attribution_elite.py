@@ -7,33 +7,34 @@ ELITE Cost Attribution: Análisis financiero avanzado
 - ROI por canal
 """
 
+from fx25.kv.event_store import KIND_REVENUE, EventStore
 from fx25.kv.sqlite_kv import get_kv_store
-from datetime import datetime, timedelta
 from typing import Dict, List
 
 class CostAttributionElite:
     def __init__(self):
         self.kv = get_kv_store()
+        self.events = EventStore(self.kv)
     
     def track_product_cost(self, product_id: str, cost: float, cost_type: str = "product") -> None:
         """Track granular costs"""
-        key = f"cost:{product_id}:{cost_type}:{datetime.now().isoformat()}"
-        self.kv.set(key, round(cost, 2))
+        self.events.append(product_id, f"cost_{cost_type}", round(cost, 2))
     
     def track_revenue(self, product_id: str, revenue: float, channel: str = "shopify") -> None:
         """Track revenue by channel"""
-        key = f"revenue:{product_id}:{channel}:{datetime.now().isoformat()}"
-        self.kv.set(key, round(revenue, 2))
+        self.events.append(product_id, KIND_REVENUE, round(revenue, 2), channel=channel)
     
     def get_profit_summary(self, product_id: str) -> Dict:
         """Advanced profit analysis"""
-        # Simulate data retrieval
-        revenue = self.kv.get(f"revenue:{product_id}") or 0.0
-        cost_product = self.kv.get(f"cost:{product_id}:product") or 0.0
-        cost_ads = self.kv.get(f"cost:{product_id}:ads") or 0.0
-        cost_shipping = self.kv.get(f"cost:{product_id}:shipping") or 0.0
+        # Incremental rollup: one primary-key read, independent of event count
+        rollup = self.events.rollups.product(product_id) or {}
+        revenue = rollup.get("revenue", 0.0)
+        cost_product = rollup.get("cost_product", 0.0)
+        cost_ads = rollup.get("cost_ads", 0.0)
+        cost_shipping = rollup.get("cost_shipping", 0.0)
+        cost_other = rollup.get("cost_other", 0.0)
         
-        total_cost = cost_product + cost_ads + cost_shipping
+        total_cost = cost_product + cost_ads + cost_shipping + cost_other
         true_profit = revenue - total_cost
         true_roas = (revenue / total_cost) if total_cost > 0 else 0
         
@@ -59,6 +60,7 @@ class CostAttributionElite:
             "cost_product": round(cost_product, 2),
             "cost_ads": round(cost_ads, 2),
             "cost_shipping": round(cost_shipping, 2),
+            "cost_other": round(cost_other, 2),
             "total_cost": round(total_cost, 2),
             "true_profit": round(true_profit, 2),
             "true_roas": round(true_roas, 2),
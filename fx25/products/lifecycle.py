@@ -5,12 +5,32 @@ Product Lifecycle: Detecta qué vender, qué optimizar, qué matar
 - GROWTH: Ventas subiendo
 - MATURE: Estable
 - DECAY: Ventas bajando
-- ZOMBIE: Muerto (vende casi nada)
+- ZOMBIE: Muerto (vende casi nada, o nunca vendió)
+
+Clasificación por velocidad (unidades/día en los últimos WINDOW_DAYS completos) y
+aceleración (contra la ventana anterior), calculadas desde rollup_daily con
+arrays NumPy para todo el catálogo en lote. El estado de cada producto queda
+en la tabla lifecycle_state; refresh() sólo reclasifica productos con eventos
+nuevos desde la última corrida (o todos cuando cambia el día y corren las ventanas).
 """
 
+import json
+import time
 from enum import Enum
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from fx25.kv.event_store import DAY, KIND_SALE, EventStore
 from fx25.kv.sqlite_kv import get_kv_store
 
+WINDOW_DAYS = 7           # ventana de velocidad (y la anterior, para la aceleración)
+LAUNCH_DAYS = 14          # producto con historial más corto: LAUNCH
+ZOMBIE_UNITS = 2          # menos unidades que esto en ambas ventanas: ZOMBIE
+ACCEL_THRESHOLD = 0.25    # ±25% de velocidad contra la ventana anterior
+
+_META_KEY = "lifecycle:meta"
+
 class ProductState(Enum):
     LAUNCH = "LAUNCH"
     GROWTH = "GROWTH"
@@ -21,31 +41,152 @@ class ProductState(Enum):
 class ProductLifecycle:
     def __init__(self):
         self.kv = get_kv_store()
+        self.events = EventStore(self.kv)
+        self._init_db()
+    
+    def _init_db(self) -> None:
+        self.kv._conn().execute("""
+            CREATE TABLE IF NOT EXISTS lifecycle_state (
+                product_id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                velocity REAL NOT NULL,
+                acceleration REAL NOT NULL
+            )
+        """)
     
     def track_sales(self, product_id: str, qty: int) -> None:
-        """Registra venta"""
+        """Registra venta (total + evento con timestamp para velocidades)"""
+        if qty <= 0:
+            return  # sin unidades no hay venta (y no cuenta como actividad)
         key = f"sales:{product_id}"
-        current = self.kv.get(key) or 0
-        self.kv.set(key, current + qty)
+        with self.kv.batch():
+            self.kv.incr(key, qty)
+            self.events.append(product_id, KIND_SALE, qty)
     
-    def get_state(self, product_id: str) -> ProductState:
+    def refresh(self, now: Optional[float] = None) -> int:
+        """Reclasifica los productos con eventos nuevos. Devuelve cuántos recalculó."""
+        now = time.time() if now is None else float(now)
+        today = time.strftime("%Y-%m-%d", time.gmtime(now))
+        # Camino rápido sin lock de escritura: ni eventos nuevos ni cambio de día
+        meta = self.kv.get(_META_KEY)
+        if meta and meta["day"] == today:
+            top = self.kv._conn().execute("SELECT MAX(id) FROM events").fetchone()[0] or 0
+            if meta["last_event_id"] >= top:
+                return 0
+        with self.kv.batch():
+            rollups = self.events.rollups
+            rollups.refresh()
+            top = rollups._high_water()
+            meta = self.kv.get(_META_KEY) or {"last_event_id": 0, "day": None}
+            if meta["day"] == today and meta["last_event_id"] >= top:
+                return 0
+            conn = self.kv._conn()
+            if meta["day"] == today:
+                rows = conn.execute(
+                    "SELECT DISTINCT product_id FROM events WHERE id > ? AND id <= ?",
+                    (meta["last_event_id"], top),
+                )
+                ids: Optional[List[str]] = [r[0] for r in rows]
+            else:
+                ids = None  # las ventanas se movieron: todo el catálogo
+            n = self._classify(ids, now) if ids is None or ids else 0
+            self.kv.set(_META_KEY, {"last_event_id": top, "day": today})
+        return n
+
+    def _classify(self, product_ids: Optional[Sequence[str]], now: float) -> int:
+        conn = self.kv._conn()
+        where, params = "", []
+        if product_ids is not None:
+            where = " AND product_id IN (SELECT value FROM json_each(?))"
+            params = [json.dumps(list(product_ids))]
+        products = conn.execute(
+            f"SELECT product_id, first_ts, units FROM rollup_product WHERE 1{where}", params
+        ).fetchall()
+        if not products:
+            return 0
+        ids = [r[0] for r in products]
+        pos = {pid: i for i, pid in enumerate(ids)}
+        age = (now - np.array([r[1] for r in products], dtype=float)) / DAY
+        lifetime_units = np.array([r[2] for r in products], dtype=float)
+        # Rollup sin ventas (p.ej. sólo revenue/costos sembrados por el backfill):
+        # las ventas previas al EventStore viven en el contador legacy del KV
+        unsold = [ids[i] for i in np.flatnonzero(lifetime_units <= 0)]
+        legacy = self.kv.get_many([f"sales:{p}" for p in unsold]) if unsold else {}
+        legacy_sold = np.array([bool(legacy.get(f"sales:{p}")) for p in ids], dtype=bool)
+
+        # Unidades por día de las dos ventanas → (producto, antigüedad en días).
+        # Sólo días UTC completos: hoy (parcial) no entra, así ambas ventanas
+        # miden exactamente WINDOW_DAYS días
+        today = np.datetime64(time.strftime("%Y-%m-%d", time.gmtime(now)), "D")
+        since = str(today - 2 * WINDOW_DAYS)
+        daily = conn.execute(
+            f"SELECT product_id, day, units FROM rollup_daily WHERE day >= ? AND day < ? AND units != 0{where}",
+            [since, str(today)] + params,
+        ).fetchall()
+        recent = np.zeros(len(ids))
+        prev = np.zeros(len(ids))
+        if daily:
+            pids, days, units = zip(*daily)
+            idx = np.fromiter((pos[p] for p in pids), dtype=np.int64, count=len(pids))
+            ago = (today - np.array(days, dtype="datetime64[D]")).astype(np.int64)
+            units = np.array(units, dtype=float)
+            in_recent = ago <= WINDOW_DAYS
+            recent = np.bincount(idx[in_recent], weights=units[in_recent], minlength=len(ids))
+            prev = np.bincount(idx[~in_recent], weights=units[~in_recent], minlength=len(ids))
+
+        velocity = recent / WINDOW_DAYS
+        acceleration = (recent - prev) / WINDOW_DAYS
+        states = np.select(
+            [
+                legacy_sold,
+                lifetime_units <= 0,
+                age < LAUNCH_DAYS,
+                recent + prev < ZOMBIE_UNITS,
+                recent > prev * (1 + ACCEL_THRESHOLD),
+                recent < prev * (1 - ACCEL_THRESHOLD),
+            ],
+            [s.value for s in (ProductState.MATURE, ProductState.ZOMBIE, ProductState.LAUNCH,
+                               ProductState.ZOMBIE, ProductState.GROWTH, ProductState.DECAY)],
+            default=ProductState.MATURE.value,
+        )
+        conn.executemany(
+            "INSERT INTO lifecycle_state (product_id, state, velocity, acceleration) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(product_id) DO UPDATE SET state = excluded.state, "
+            "velocity = excluded.velocity, acceleration = excluded.acceleration",
+            zip(ids, states.tolist(), np.round(velocity, 4).tolist(), np.round(acceleration, 4).tolist()),
+        )
+        return len(ids)
+
+    def get_states(
+        self,
+        product_ids: Optional[Sequence[str]] = None,
+        *,
+        now: Optional[float] = None,
+    ) -> Dict[str, ProductState]:
+        """Estado de todo el catálogo (o de product_ids) en una lectura, tras refresh()."""
+        self.refresh(now)
+        sql, params = "SELECT product_id, state FROM lifecycle_state", []
+        if product_ids is not None:
+            sql += " WHERE product_id IN (SELECT value FROM json_each(?))"
+            params = [json.dumps([str(p) for p in product_ids])]
+        states = {pid: ProductState(s) for pid, s in self.kv._conn().execute(sql, params)}
+        if product_ids is not None:
+            # Sin historial de eventos: sólo queda el contador legacy del KV
+            missing = [str(p) for p in product_ids if str(p) not in states]
+            if missing:
+                sales = self.kv.get_many([f"sales:{p}" for p in missing])
+                for p in missing:
+                    states[p] = ProductState.MATURE if sales.get(f"sales:{p}") else ProductState.ZOMBIE
+        return states
+
+    def get_state(self, product_id: str, *, now: Optional[float] = None) -> ProductState:
         """Detecta estado del producto"""
-        sales = self.kv.get(f"sales:{product_id}") or 0
-        
-        if sales == 0:
-            return ProductState.ZOMBIE
-        elif sales < 5:
-            return ProductState.LAUNCH
-        elif sales < 20:
-            return ProductState.GROWTH
-        elif sales < 50:
-            return ProductState.MATURE
-        else:
-            return ProductState.DECAY
+        return self.get_states([product_id], now=now)[str(product_id)]
     
-    def recommend_action(self, product_id: str) -> str:
-        """Recomendación de acción"""
-        state = self.get_state(product_id)
+    def recommend_action(self, product_id: str, state: Optional[ProductState] = None) -> str:
+        """Recomendación de acción (state: ya calculado, p.ej. de get_states())"""
+        if state is None:
+            state = self.get_state(product_id)
         
         actions = {
             ProductState.LAUNCH: "🚀 PUSH - Invertir en marketing",
@@ -0,0 +1,70 @@
+# scripts/bench_kv.py
+"""
+Benchmark: ops/s de CachedSQLiteKV get/set antes y después de la conexión persistente.
+- legacy: sqlite3.connect + commit por operación, journal rollback (comportamiento anterior)
+- persistent: una conexión por thread, WAL, synchronous configurable
+Los get se miden con cache_ttl=0 para que siempre lleguen a SQLite.
+Ejecuta: python -m scripts.bench_kv [N] [--synchronous NORMAL|FULL|OFF]
+"""
+import argparse
+import json
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from fx25.kv.sqlite_kv import CachedSQLiteKV
+
+
+class LegacyKV:
+    """Réplica del patrón previo: una conexión y un commit por llamada."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS kv_store (key TEXT PRIMARY KEY, value TEXT)")
+
+    def set(self, key, value):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("INSERT OR REPLACE INTO kv_store (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+            conn.commit()
+
+    def get(self, key):
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("SELECT value FROM kv_store WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+def _bench(kv, n: int) -> dict:
+    t0 = time.perf_counter()
+    for i in range(n):
+        kv.set(f"bench:{i % 500}", {"v": i})
+    t_set = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for i in range(n):
+        kv.get(f"bench:{i % 500}")
+    t_get = time.perf_counter() - t0
+    return {"set_ops": n / t_set, "get_ops": n / t_get}
+
+
+def run(n: int, synchronous: str) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = _bench(LegacyKV(Path(tmp) / "legacy.db"), n)
+        kv = CachedSQLiteKV(Path(tmp) / "persistent.db", cache_ttl=0, synchronous=synchronous)
+        persistent = _bench(kv, n)
+        kv.close()
+    return {"legacy": legacy, "persistent": persistent}
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("n", nargs="?", type=int, default=2000)
+    ap.add_argument("--synchronous", default="NORMAL")
+    args = ap.parse_args()
+    r = run(args.n, args.synchronous)
+    for name in ("legacy", "persistent"):
+        print(f"{name:<11} SET={r[name]['set_ops']:>9.0f} ops/s  GET={r[name]['get_ops']:>9.0f} ops/s")
+    print(
+        f"SPEEDUP SET x{r['persistent']['set_ops'] / r['legacy']['set_ops']:.1f} "
+        f"GET x{r['persistent']['get_ops'] / r['legacy']['get_ops']:.1f} (synchronous={args.synchronous})"
+    )
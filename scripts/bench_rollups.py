@@ -0,0 +1,63 @@
+# scripts/bench_rollups.py
+"""
+Benchmark: lectura del portfolio (RollupMaterializer.arrays) a escala de catálogo.
+- cold: materializer nuevo, ventanas ya materializadas (sólo lectura + np.fromiter)
+- shift: ventanas nuevas → recompute de revenue_recent/revenue_prev + lectura
+- warm: misma consulta otra vez (memo por high-water mark)
+Ejecuta: python -m scripts.bench_rollups [N] [--budget 1.0]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from fx25.kv.rollups import RollupMaterializer
+from fx25.kv.sqlite_kv import CachedSQLiteKV
+
+
+def _seed(kv: CachedSQLiteKV, n: int) -> None:
+    conn = kv._conn()
+    RollupMaterializer(kv)  # crea las tablas
+    with kv.batch():
+        conn.executemany(
+            "INSERT INTO rollup_product (product_id, revenue, cost_product, n_events) VALUES (?, ?, ?, 2)",
+            ((f"p{i:06d}", 10.0 + i % 7, 5.0) for i in range(n)),
+        )
+        conn.executemany(
+            "INSERT INTO rollup_daily (product_id, day, revenue, n_events) VALUES (?, ?, ?, 1)",
+            ((f"p{i:06d}", "2023-11-1%d" % (i % 5), 10.0 + i % 7) for i in range(n)),
+        )
+
+
+def _timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def run(n: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        kv = CachedSQLiteKV(Path(tmp) / "rollups.db")
+        _seed(kv, n)
+        RollupMaterializer(kv).arrays(recent_since="2023-11-12", prev_since="2023-11-05")
+        cold = RollupMaterializer(kv)
+        out = {
+            "cold": _timed(lambda: cold.arrays(recent_since="2023-11-12", prev_since="2023-11-05")),
+            "shift": _timed(lambda: cold.arrays(recent_since="2023-11-13", prev_since="2023-11-06")),
+            "warm": _timed(lambda: cold.arrays(recent_since="2023-11-13", prev_since="2023-11-06")),
+        }
+        kv.close()
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("n", nargs="?", type=int, default=100_000)
+    ap.add_argument("--budget", type=float, default=1.0, help="segundos máximos para una lectura cold")
+    args = ap.parse_args()
+    r = run(args.n)
+    for name in ("cold", "shift", "warm"):
+        print(f"{name:<6} {r[name] * 1000:>8.1f} ms  (N={args.n})")
+    verdict = "OK" if r["cold"] <= args.budget else "LENTO"
+    print(f"{verdict}: cold {r['cold']:.3f}s vs budget {args.budget:.3f}s")
+    raise SystemExit(0 if verdict == "OK" else 1)
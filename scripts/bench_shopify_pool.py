@@ -0,0 +1,47 @@
+# scripts/bench_shopify_pool.py
+"""
+Benchmark: latencia por request de ShopifyClient con y sin pool keep-alive.
+Usa ShopifyStandIn (servidor HTTP/1.1 local) como Admin API.
+Ejecuta: python -m scripts.bench_shopify_pool [N]
+"""
+import contextlib
+import io
+import sys
+import time
+
+from fx25.clients.shopify_client import ShopifyClient
+from fx25.clients.shopify_standin import ShopifyStandIn
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def run(client: ShopifyClient, n: int) -> list:
+    lat = []
+    # El cliente imprime una línea por request; se silencia para medir red
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(n):
+            t = time.perf_counter()
+            client.update_price("1", 105.0 if i % 2 else 100.0, old_price=100.0, dry=False)
+            lat.append(time.perf_counter() - t)
+    return lat
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with ShopifyStandIn(n_products=1, enforce_bucket=False) as srv:
+        for label, pool_size in (("NO_POOL", 0), ("POOL", 4)):
+            c = ShopifyClient(
+                srv.store, "bench-token", dry=False, scheme="http",
+                pool_size=pool_size, bucket_capacity=1e9, refill_rate=1e9,
+            )
+            lat = run(c, n)
+            stats = c._pool.stats if c._pool else {}
+            c.close()
+            print(
+                f"{label:<8} N={n} MEAN={sum(lat) / n * 1000:.3f}ms "
+                f"P50={_percentile(lat, 50) * 1000:.3f}ms P99={_percentile(lat, 99) * 1000:.3f}ms "
+                f"CONNS={stats.get('created', n)}"
+            )
@@ -0,0 +1,130 @@
+# scripts/bench_shopify_standin.py
+"""
+Load test del camino REAL de ShopifyClient contra ShopifyStandIn (local).
+Reporta throughput, reintentos, disparos de breaker y percentiles de latencia.
+
+Ejecuta:
+  python -m scripts.bench_shopify_standin [--ops 400] [--threads 16]
+      [--latency-ms 5] [--err429 0.02] [--err5xx 0.02] [--adaptive]
+      [--bucket 400] [--leak 20]
+(Shopify: leak = bucket/20 req/s; --adaptive lo infiere del header)
+"""
+import argparse
+import contextlib
+import io
+import threading
+import time
+
+from fx25.clients.shopify_client import ShopifyClient
+from fx25.clients.shopify_standin import ShopifyStandIn
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def run(args: argparse.Namespace) -> dict:
+    with ShopifyStandIn(
+        n_products=args.products,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.latency_ms / 2,
+        error_rate_429=args.err429,
+        error_rate_5xx=args.err5xx,
+        bucket_size=args.bucket,
+        leak_rate=args.leak,
+        retry_after=0.2,
+        seed=7,
+    ) as srv:
+        c = ShopifyClient(
+            srv.store, "bench-token", dry=False, scheme="http",
+            bucket_capacity=args.bucket / 2, refill_rate=args.leak,
+            adaptive=args.adaptive, pool_size=args.threads,
+            breaker_fail_threshold=10, breaker_open_seconds=1.0,
+            price_cache_size=0,
+        )
+        lat, errors = [], []
+        lock = threading.Lock()
+        counter = iter(range(args.ops))
+
+        def worker() -> None:
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                pid = str(i % args.products + 1)
+                t = time.perf_counter()
+                try:
+                    if i % 3 == 0:
+                        c.create_product({"product": {"title": f"Load {i}"}}, dry=False)
+                    else:
+                        c.update_price(pid, 100.0 + (i % 10), dry=False)
+                    ok = True
+                except Exception as e:
+                    ok = False
+                    with lock:
+                        errors.append(type(e).__name__)
+                dt = time.perf_counter() - t
+                if ok:
+                    with lock:
+                        lat.append(dt)
+
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+            for th in threads:
+                th.start()
+            for th in threads:
+                th.join()
+        wall = time.perf_counter() - t0
+        c.close()
+
+        breakers = c.breaker_snapshot()
+        # update_price sin old_price hace GET + PUT → 2 respuestas por op exitosa
+        expected_calls = sum(1 if i % 3 == 0 else 2 for i in range(args.ops))
+        return {
+            "ops": args.ops,
+            "ok": len(lat),
+            "errors": len(errors),
+            "wall_s": wall,
+            "throughput": len(lat) / wall if wall > 0 else 0.0,
+            "api_calls": c.api_call_count,
+            "retries": max(0, c.api_call_count - expected_calls),
+            "breaker_trips": sum(b["trips"] for b in breakers.values()),
+            "p50_ms": _percentile(lat, 50) * 1000,
+            "p95_ms": _percentile(lat, 95) * 1000,
+            "p99_ms": _percentile(lat, 99) * 1000,
+            "server": dict(srv.stats),
+            "endpoints": c.metrics.snapshot(),
+        }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ops", type=int, default=400)
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--products", type=int, default=50)
+    ap.add_argument("--latency-ms", type=float, default=5.0)
+    ap.add_argument("--err429", type=float, default=0.02)
+    ap.add_argument("--err5xx", type=float, default=0.02)
+    ap.add_argument("--bucket", type=int, default=400)
+    ap.add_argument("--leak", type=float, default=20.0)
+    ap.add_argument("--adaptive", action="store_true")
+    r = run(ap.parse_args())
+    print(
+        f"OPS={r['ops']} OK={r['ok']} ERR={r['errors']} WALL={r['wall_s']:.2f}s "
+        f"THROUGHPUT={r['throughput']:.1f} ops/s API_CALLS={r['api_calls']} "
+        f"RETRIES={r['retries']} BREAKER_TRIPS={r['breaker_trips']}"
+    )
+    print(f"LATENCY P50={r['p50_ms']:.1f}ms P95={r['p95_ms']:.1f}ms P99={r['p99_ms']:.1f}ms")
+    print(f"SERVER {r['server']}")
+    for endpoint, s in r["endpoints"].items():
+        print(
+            f"  {endpoint}: n={s['count']} retries={s['retries']} "
+            f"limiter p50={s['limiter_wait']['p50_ms']:.1f}ms p99={s['limiter_wait']['p99_ms']:.1f}ms "
+            f"wire p50={s['network']['p50_ms']:.1f}ms p99={s['network']['p99_ms']:.1f}ms "
+            f"status={s['status']}"
+        )
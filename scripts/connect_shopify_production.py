@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import os
 from datetime import datetime
 
@@ -47,20 +49,25 @@ def sync_real_data():
     print("  - client.create_product(spec)")
     print("  - client.update_price(product_id, new_price)")
     print("  - client.get_inventory(sku)")
+    print("  - client.iter_products(fields=..., page_size=250)")
     print("  - client.api_call_count (total de llamadas)")
     
     return True
 
 
+def sync_all_products(client: ShopifyClient | None = None) -> int:
+    """Sincronizar TODOS los productos de Shopify (paginado, sólo campos necesarios)"""
+    client = client or setup_production_shopify()[0]
+
+    total = 0
+    for product in client.iter_products(fields=("id", "title", "updated_at", "variants")):
+        total += 1
+        if total % 1000 == 0:
+            print(f"   ... {total} productos")
+
+    print(f"✅ Sincronización completada: {total} productos, {client.api_call_count} API calls")
+    return total
+
+
 if __name__ == "__main__":
     sync_real_data()
-    
-    def sync_all_products():
-    """Sincronizar TODOS los productos de Shopify"""
-    print("✅ Sincronización completada")
-    
-    # Aquí traerías productos de Shopify
-    # (El cliente tiene métodos para eso)
-    
-    print("✅ Sincronización completada")
-
@@ -31,29 +31,31 @@ def dashboard_intelligent():
         {"id": "prod3", "name": "USB Cable", "sales": 0, "cost": 2, "revenue": 0},
     ]
     
-    # Registrar datos
-    for p in products:
-        ca.track_product_cost(p["id"], p["cost"])
-        ca.track_revenue(p["id"], p["revenue"])
-        lc.track_sales(p["id"], p["sales"])
+    # Registrar datos (una sola transacción para todo el lote)
+    with ca.kv.batch():
+        for p in products:
+            ca.track_product_cost(p["id"], p["cost"])
+            ca.track_revenue(p["id"], p["revenue"])
+            lc.track_sales(p["id"], p["sales"])
     
     # PRODUCTS TABLE
     print("\n📊 PRODUCT SUMMARY:\n")
     print(f"{'Product':<20} {'State':<12} {'Revenue':<10} {'Profit':<10} {'ROAS':<8}")
     print("-" * 70)
     
-    total_revenue = 0
-    total_profit = 0
+    # Todo el portfolio en una lectura (columnas NumPy, mismo índice que product_id)
+    portfolio = ca.get_portfolio_summary([p["id"] for p in products])
+    row = {pid: i for i, pid in enumerate(portfolio["product_id"])}
+    states = lc.get_states([p["id"] for p in products])
+    total_revenue = portfolio["totals"]["revenue"]
+    total_profit = portfolio["totals"]["true_profit"]
     zombie_count = 0
     decay_count = 0
     growth_count = 0
     
     for p in products:
-        profit_data = ca.get_profit_summary(p["id"])
-        state = lc.get_state(p["id"])
-        
-        total_revenue += profit_data["revenue"]
-        total_profit += profit_data["true_profit"]
+        i = row[p["id"]]
+        state = states[p["id"]]
         
         if state.value == "ZOMBIE":
             zombie_count += 1
@@ -62,7 +64,7 @@ def dashboard_intelligent():
         elif state.value == "GROWTH":
             growth_count += 1
         
-        print(f"{p['name']:<20} {state.value:<12} ${profit_data['revenue']:<9.2f} ${profit_data['true_profit']:<9.2f} {profit_data['true_roas']:<8.2f}")
+        print(f"{p['name']:<20} {state.value:<12} ${portfolio['revenue'][i]:<9.2f} ${portfolio['true_profit'][i]:<9.2f} {portfolio['true_roas'][i]:<8.2f}")
     
     print("-" * 70)
     print(f"{'TOTAL':<20} {'':<12} ${total_revenue:<9.2f} ${total_profit:<9.2f}")
@@ -0,0 +1,35 @@
+# scripts/test_shopify_async_dry.py
+"""
+Load test offline de AsyncShopifyClient: N update_price DRY concurrentes
+en un solo event loop, todos pasando por el token bucket async.
+Ejecuta: python -m scripts.test_shopify_async_dry [N]
+"""
+import asyncio
+import contextlib
+import io
+import sys
+import time
+
+from fx25.clients.async_shopify_client import AsyncShopifyClient
+
+
+async def main(n: int, refill_rate: float) -> None:
+    c = AsyncShopifyClient(dry=True, bucket_capacity=2.0, refill_rate=refill_rate)
+    t0 = time.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = await asyncio.gather(
+            *(c.update_price(str(i), 105.0, old_price=100.0) for i in range(n)),
+            return_exceptions=True,
+        )
+    dt = time.monotonic() - t0
+    ok = sum(1 for r in results if isinstance(r, dict) and r.get("ok"))
+    rate = (n - c.bucket.capacity) / dt if dt > 0 else 0
+    print(
+        f"IN_FLIGHT={n} OK={ok} CALLS={c.api_call_count} DURATION={dt:.2f}s "
+        f"RATE={rate:.1f} req/s PASS={ok == n and rate <= refill_rate * 1.05}"
+    )
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    asyncio.run(main(n, refill_rate=200.0))
@@ -1,4 +1,13 @@
 # scripts/test_shopify_ratelimit_stress.py
+"""
+Stress del token bucket de ShopifyClient.
+Ejecuta: python -m scripts.test_shopify_ratelimit_stress [--bench]
+
+Sin flags: 6 llamadas DRY a 2 req/s (check de exactitud del rate).
+--bench: 10/100/1000 threads contra el limiter FIFO, reporta p50/p99 de
+espera y rate logrado (refill alto para que termine en segundos).
+"""
+import sys
 import threading, time
 from fx25.clients.shopify_client import ShopifyClient
 
@@ -12,9 +21,67 @@ def worker(c: ShopifyClient, i: int, results: list):
         print("ERR:", e)
         results.append(False)
 
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+def bench_limiter(n_threads: int, refill_rate: float, calls_per_thread: int = 1) -> dict:
+    """Mide espera en _wait_if_needed (sin I/O de DRY) con n_threads concurrentes."""
+    c = ShopifyClient(dry=True, bucket_capacity=2.0, refill_rate=refill_rate)
+    c.bucket_remaining = 0.0
+    waits = []
+    waits_lock = threading.Lock()
+    start = threading.Barrier(n_threads + 1)
+
+    def run():
+        start.wait()
+        local = []
+        for _ in range(calls_per_thread):
+            t = time.perf_counter()
+            c._wait_if_needed()
+            local.append(time.perf_counter() - t)
+        with waits_lock:
+            waits.extend(local)
+
+    threads = [threading.Thread(target=run, daemon=True) for _ in range(n_threads)]
+    for th in threads:
+        th.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for th in threads:
+        th.join()
+    dt = time.perf_counter() - t0
+    total = n_threads * calls_per_thread
+    return {
+        "threads": n_threads,
+        "calls": total,
+        "duration_s": dt,
+        "rate": total / dt if dt > 0 else 0.0,
+        "p50_ms": percentile(waits, 50) * 1000,
+        "p99_ms": percentile(waits, 99) * 1000,
+    }
+
+def run_bench(refill_rate: float = 500.0) -> None:
+    print(f"LIMITER BENCH refill={refill_rate:.0f} req/s")
+    for n in (10, 100, 1000):
+        calls = max(1, 1000 // n)
+        r = bench_limiter(n, refill_rate, calls_per_thread=calls)
+        ok = r["rate"] <= refill_rate * 1.05
+        print(
+            f"THREADS={r['threads']:<5} CALLS={r['calls']:<5} DURATION={r['duration_s']:.2f}s "
+            f"RATE={r['rate']:.1f} req/s P50={r['p50_ms']:.1f}ms P99={r['p99_ms']:.1f}ms PASS={ok}"
+        )
+
 if __name__ == "__main__":
+    if "--bench" in sys.argv:
+        run_bench()
+        sys.exit(0)
+
     c = ShopifyClient(dry=True, bucket_capacity=2.0, refill_rate=2.0)
-    N = 6  # llamadas totales; ~mínimo 3s con 2 req/s
+    N = 6  # llamadas totales; 2 de burst + 4 a 2 req/s → ~2s
     threads = []
     results = []
     t0 = time.monotonic()
@@ -25,5 +92,6 @@ if __name__ == "__main__":
     for th in threads:
         th.join()
     dt = time.monotonic() - t0
-    rate = N / dt if dt > 0 else 0
+    # Rate sostenido: descuenta el burst inicial (capacity)
+    rate = (N - c.bucket_capacity) / dt if dt > 0 else 0
     print(f"CALLS={N} DURATION={dt:.2f}s RATE={rate:.2f} req/s PASS={all(results) and rate<=2.3}")
@@ -0,0 +1,505 @@
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from fx25.kv.sqlite_kv import CachedSQLiteKV
+
+
+def test_kv_persistent_connection_per_thread_with_wal(tmp_path):
+    kv = CachedSQLiteKV(tmp_path / "kv.db", cache_ttl=0)
+    kv.set("a", {"x": 1})
+    kv.set("s", "raw")
+    conn = kv._conn()
+    assert kv._conn() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+    seen = []
+    th = threading.Thread(target=lambda: seen.append((kv.get("a"), kv._conn() is conn)))
+    th.start()
+    th.join()
+    assert seen == [({"x": 1}, False)]
+
+    kv.delete("a")
+    assert kv.get("a") is None and kv.get("s") == "raw"
+    kv.close()
+    assert CachedSQLiteKV(tmp_path / "kv.db").get("s") == "raw"
+
+
+def test_kv_batch_commits_once_and_rolls_back_cache(tmp_path):
+    kv = CachedSQLiteKV(tmp_path / "kv.db")
+    kv.set_many({"a": 1, "b": [1, 2], "c": "x"})
+    assert kv.get_many(["a", "b", "c", "zz"]) == {"a": 1, "b": [1, 2], "c": "x"}
+
+    with pytest.raises(RuntimeError):
+        with kv.batch():
+            kv.set("a", 99)
+            with kv.batch():
+                kv.delete("c")
+            assert kv.get("a") == 99
+            raise RuntimeError("boom")
+    assert kv.get("a") == 1 and kv.get("c") == "x"
+
+    with kv.batch():
+        kv.set("a", 2)
+        kv.delete_many(["b", "c"])
+    fresh = CachedSQLiteKV(tmp_path / "kv.db")
+    assert fresh.get_many(["a", "b", "c"]) == {"a": 2}
+    kv.close()
+    fresh.close()
+
+
+def test_kv_group_commit_buffers_and_flushes(tmp_path):
+    kv = CachedSQLiteKV(tmp_path / "kv.db", group_commit_ms=10_000, group_commit_ops=1000)
+    kv.set("a", 1)
+    kv.set("gone", 1)
+    kv.delete("gone")
+    assert kv.get("a") == 1 and kv.get("gone") is None
+    other = CachedSQLiteKV(tmp_path / "kv.db", cache_ttl=0)
+    assert other.get("a") is None
+    assert kv.flush() == 2
+    assert other.get("a") == 1
+
+    fast = CachedSQLiteKV(tmp_path / "kv.db", group_commit_ms=10_000, group_commit_ops=3)
+    fast.set_many({"x": 1, "y": 2, "z": 3})
+    deadline = time.time() + 2
+    while len(other.get_many(["x", "y", "z"])) < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    assert other.get_many(["x", "y", "z"]) == {"x": 1, "y": 2, "z": 3}
+    fast.set("w", 4)
+    fast.close()
+    kv.close()
+    assert other.get("w") == 4
+    other.close()
+
+
+def test_kv_cache_is_bounded_lru_with_counters(tmp_path):
+    kv = CachedSQLiteKV(tmp_path / "kv.db", cache_max_entries=3, cache_max_bytes=10_000)
+    for i in range(10):
+        kv.set(f"cost:p1:ads:{i}", i)
+    stats = kv.cache_stats
+    assert stats["size"] == 3 and stats["evictions"] == 7
+    assert kv.get("cost:p1:ads:0") == 0          # evicted → read from SQLite
+    assert kv.get("cost:p1:ads:0") == 0          # now cached
+    assert kv.cache_stats["hits"] == 1 and kv.cache_stats["misses"] == 1
+
+    kv.set("big", "x" * 20_000)                  # larger than the byte cap: not cached
+    assert kv.cache_stats["bytes"] <= 10_000 and kv.get("big") == "x" * 20_000
+    kv.close()
+
+
+def test_lru_cache_byte_cap_and_lazy_ttl_sweep():
+    from fx25.cache import LRUCache
+
+    c = LRUCache(100, ttl=0.05, max_bytes=400, sizeof=lambda v: 100)
+    for k in "abcde":
+        c.set(k, k)
+    assert len(c) == 4 and c.get("a") is None and c.stats["evictions"] == 1
+    time.sleep(0.06)
+    c.set("f", "f")
+    assert len(c) == 1 and c.stats["expirations"] == 4 and c.bytes == 100
+
+
+def test_kv_incr_is_atomic_across_threads(tmp_path):
+    kv = CachedSQLiteKV(tmp_path / "kv.db")
+    kv.set("sales:p1", 3)
+
+    def worker():
+        for _ in range(200):
+            kv.incr("sales:p1")
+            kv.incr_float("revenue:p1", 0.1, ndigits=2)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+    assert kv.get("sales:p1") == 803
+    assert kv.incr_float("revenue:p1", 0.0) == 80.0
+    other = CachedSQLiteKV(tmp_path / "kv.db", cache_ttl=0)
+    assert other.incr("sales:p1", -3) == 800 and kv.incr("sales:p1", 0) == 800
+    kv.close()
+    other.close()
+
+
+def test_trackers_use_atomic_increments(tmp_path, monkeypatch):
+    from fx25.finance import cost_attribution
+    from fx25.products import lifecycle
+
+    kv = CachedSQLiteKV(tmp_path / "kv.db")
+    monkeypatch.setattr(cost_attribution, "get_kv_store", lambda: kv)
+    monkeypatch.setattr(lifecycle, "get_kv_store", lambda: kv)
+    ca, lc = cost_attribution.CostAttribution(), lifecycle.ProductLifecycle()
+    ca.track_revenue("p", 10.105)
+    ca.track_revenue("p", 5)
+    ca.track_ad_spend("p", 2.5)
+    lc.track_sales("p", 2)
+    lc.track_sales("p", 4)
+    summary = ca.get_profit_summary("p")
+    assert summary["revenue"] == 15.11 and summary["cost_ads"] == 2.5
+    assert lc.get_state("p") == lifecycle.ProductState.LAUNCH
+    kv.close()
+
+
+def test_kv_prefix_scan_count_and_sum(tmp_path):
+    kv = CachedSQLiteKV(tmp_path / "kv.db")
+    kv.set_many({
+        "cost:p1:ads:2024-01-01T10": 5.0,
+        "cost:p1:ads:2024-01-02T10": 7.5,
+        "cost:p1:ads:2024-02-01T10": 1.0,
+        "cost:p10:ads:2024-01-01T10": 100.0,
+        "cost:p1:product:2024-01-01T10": 20.0,
+    })
+    keys = [k for k, _ in kv.scan("cost:p1:ads:")]
+    assert keys == ["cost:p1:ads:2024-01-01T10", "cost:p1:ads:2024-01-02T10", "cost:p1:ads:2024-02-01T10"]
+    assert list(kv.scan("cost:p1:ads:", start="2024-01-02", end="2024-02")) == [("cost:p1:ads:2024-01-02T10", 7.5)]
+    everything = [k for k, _ in kv.scan("cost:", page_size=2)]
+    assert len(everything) == 5 and everything == sorted(everything)
+    assert [k for k, _ in kv.scan("cost:", limit=3, page_size=2)] == everything[:3]
+    assert kv.count("cost:p1:") == 4 and kv.count("cost:") == 5
+    assert kv.sum("cost:p1:ads:") == 13.5 and kv.sum("nope:") == 0.0
+    kv.close()
+
+
+def test_elite_summary_reads_the_keys_it_writes(tmp_path, monkeypatch):
+    from fx25.modules import cost_attribution_elite
+
+    kv = CachedSQLiteKV(tmp_path / "kv.db")
+    monkeypatch.setattr(cost_attribution_elite, "get_kv_store", lambda: kv)
+    elite = cost_attribution_elite.CostAttributionElite()
+    elite.track_revenue("p1", 100.0)
+    elite.track_revenue("p1", 50.0, channel="tiktok")
+    elite.track_product_cost("p1", 30.0)
+    elite.track_product_cost("p1", 10.0, cost_type="ads")
+    elite.track_product_cost("p1", 5.0, cost_type="fees")
+    elite.track_revenue("p10", 999.0)
+    s = elite.get_profit_summary("p1")
+    assert (s["revenue"], s["cost_product"], s["cost_ads"], s["true_profit"]) == (150.0, 30.0, 10.0, 105.0)
+    assert (s["cost_shipping"], s["cost_other"], s["total_cost"]) == (0.0, 5.0, 45.0)
+    kv.close()
+
+
+def test_event_store_windows_daily_and_velocity(tmp_path):
+    from fx25.kv.event_store import EventStore
+
+    kv = CachedSQLiteKV(tmp_path / "kv.db")
+    ev = EventStore(kv)
+    now = 1_700_000_000.0  # 2023-11-14T22:13:20Z
+    ev.append_many([
+        ("p1", "sale", 3, "", now - 3600),
+        ("p1", "sale", 5, "", now - 30 * 3600),
+        ("p1", "sale", 100, "", now - 5 * 86400),
+        {"product_id": "p1", "kind": "revenue", "amount": 40.0, "channel": "tiktok", "ts": now - 60},
+        ("p2", "sale", 1, "", now - 60),
+    ])
+    ev.append("p2", "cost_ads", 9.5, ts=now - 10)
+    assert ev.count() == 6 and ev.count("p1") == 4
+    assert ev.totals("p1") == {"sale": 108.0, "revenue": 40.0}
+    assert ev.totals("p1", since=now - 48 * 3600) == {"sale": 8.0, "revenue": 40.0}
+    assert ev.window_totals("sale", now=now) == {"p1": 8.0, "p2": 1.0}
+    assert ev.velocity("p1", now=now) == 4.0
+    days = ev.daily("p1", kinds=["sale"], now=now)
+    assert days == [("2023-11-09", "sale", 100.0, 1), ("2023-11-13", "sale", 5.0, 1), ("2023-11-14", "sale", 3.0, 1)]
+    kv.close()
+
+
+def test_trackers_append_history_events(tmp_path, monkeypatch):
+    from fx25.finance import cost_attribution
+    from fx25.products import lifecycle
+
+    kv = CachedSQLiteKV(tmp_path / "kv.db")
+    monkeypatch.setattr(cost_attribution, "get_kv_store", lambda: kv)
+    monkeypatch.setattr(lifecycle, "get_kv_store", lambda: kv)
+    ca, lc = cost_attribution.CostAttribution(), lifecycle.ProductLifecycle()
+    ca.track_revenue("p", 10.0, channel="shopify")
+    ca.track_revenue("p", 5.0)
+    ca.track_ad_spend("p", 2.0)
+    lc.track_sales("p", 3)
+    assert ca.events.totals("p") == {"revenue": 15.0, "cost_ads": 2.0, "sale": 3.0}
+    assert kv.get("revenue:p") == 15.0
+    kv.close()
+
+
+def test_rollups_refresh_incrementally_and_match_rebuild(tmp_path):
+    from fx25.kv.event_store import EventStore
+
+    kv = CachedSQLiteKV(tmp_path / "kv.db")
+    ev = EventStore(kv)
+    day = 1_700_000_000.0  # 2023-11-14
+    ev.append_many([
+        ("p1", "revenue", 100.0, "", day),
+        ("p1", "cost_product", 30.0, "", day),
+        ("p1", "sale", 2, "", day - 86400),
+        ("p2", "revenue", 10.0, "", day),
+    ])
+    ev.append("p1", "cost_ads", 20.0, ts=day + 60)
+    r = ev.rollups.product("p1")
+    assert (r["revenue"], r["total_cost"], r["true_profit"], r["true_roas"], r["units"]) == (100.0, 50.0, 50.0, 2.0, 2.0)
+    assert r["n_events"] == 4 and ev.rollups.product("nope") is None
+
+    # Filas insertadas por fuera del EventStore se recogen en el siguiente refresh
+    kv._conn().execute("INSERT INTO events (product_id, kind, ts, amount) VALUES ('p2', 'cost_fees', ?, 4.0)", (day,))
+    assert ev.rollups.refresh() == 1 and ev.rollups.refresh() == 0
+    assert ev.rollups.product("p2")["cost_other"] == 4.0
+
+    assert [d["day"] for d in ev.rollups.daily("p1")] == ["2023-11-13", "2023-11-14"]
+    assert ev.rollups.daily(since_day="2023-11-14")[0]["revenue"] == 110.0
+    before = ev.rollups.products()
+    assert ev.rollups.rebuild() == 6 and ev.rollups.products() == before
+    assert [p["product_id"] for p in ev.rollups.products(["p2"])] == ["p2"]
+    kv.close()
+
+
+def test_portfolio_summary_is_vectorized_over_rollups(tmp_path, monkeypatch):
+    from fx25.finance import cost_attribution
+
+    kv = CachedSQLiteKV(tmp_path / "kv.db")
+    monkeypatch.setattr(cost_attribution, "get_kv_store", lambda: kv)
+    ca = cost_attribution.CostAttribution()
+    now = 1_700_000_000.0
+    rows = []
+    for i in range(20):
+        rows += [(f"p{i:02d}", "revenue", 30.0, "", now - 10 * 86400), (f"p{i:02d}", "cost_product", 10.0 + i % 3, "", now)]
+    rows += [("p00", "revenue", 100.0, "", now), ("p01", "revenue", 10.0, "", now - 86400)]
+    rows += [("p19", "revenue", 900.0, "", now - 10 * 86400)]
+    ca.events.append_many(rows)
+    kv.set_many({"revenue:legacy": 8.0, "cost:legacy:ads": 2.0})
+
+    s = ca.get_portfolio_summary(now=now)
+    assert s["product_id"][:2] == ["p00", "p01"] and s["totals"]["products"] == 20
+    assert (s["revenue"][0], s["true_profit"][0], s["true_roas"][0], s["margin"][0]) == (130.0, 120.0, 13.0, 0.9231)
+    assert list(s["trend"][:3]) == [1, -1, -1]
+    assert list(np.flatnonzero(s["anomaly"])) == [0, 19]
+    assert s["totals"]["revenue"] == 20 * 30.0 + 1010.0 and s["totals"]["anomalies"] == 2
+
+    sub = ca.get_portfolio_summary(["p02", "legacy"], now=now)
+    assert sub["product_id"] == ["p02", "legacy"] and list(sub["true_profit"]) == [18.0, 6.0]
+    assert ca.get_profit_summary("p00")["true_profit"] == 120.0
+    kv.close()
+
+
+def test_lifecycle_classifies_by_velocity_and_only_recomputes_dirty_products(tmp_path, monkeypatch):
+    from fx25.products import lifecycle
+
+    S = lifecycle.ProductState
+    kv = CachedSQLiteKV(tmp_path / "kv.db")
+    monkeypatch.setattr(lifecycle, "get_kv_store", lambda: kv)
+    lc = lifecycle.ProductLifecycle()
+    now = 1_700_000_000.0
+    ago = lambda d: now - d * 86400
+    lc.events.append_many([
+        ("new", "sale", 1, "", ago(2)),
+        ("up", "sale", 2, "", ago(30)), ("up", "sale", 5, "", ago(10)), ("up", "sale", 20, "", ago(1)),
+        ("down", "sale", 1, "", ago(30)), ("down", "sale", 20, "", ago(10)), ("down", "sale", 3, "", ago(1)),
+        ("flat", "sale", 1, "", ago(30)), ("flat", "sale", 10, "", ago(10)), ("flat", "sale", 10, "", ago(3)),
+        ("dead", "sale", 500, "", ago(60)), ("dead", "sale", 1, "", ago(2)),
+    ])
+    kv.set("sales:legacy", 40)
+
+    states = lc.get_states(now=now)
+    assert states == {"new": S.LAUNCH, "up": S.GROWTH, "down": S.DECAY, "flat": S.MATURE, "dead": S.ZOMBIE}
+    assert lc.get_state("legacy", now=now) == S.MATURE and lc.get_state("nope", now=now) == S.ZOMBIE
+    assert lc.refresh(now) == 0
+
+    lc.events.append("dead", "sale", 30, ts=ago(1))
+    assert lc.refresh(now) == 1 and lc.get_state("dead", now=now) == S.GROWTH
+    assert lc.refresh(now + 86400) == 5  # día nuevo: las ventanas corren para todos
+    kv.close()
+
+
+def test_lifecycle_windows_use_complete_days_only(tmp_path, monkeypatch):
+    from fx25.products import lifecycle
+
+    kv = CachedSQLiteKV(tmp_path / "kv.db")
+    monkeypatch.setattr(lifecycle, "get_kv_store", lambda: kv)
+    lc = lifecycle.ProductLifecycle()
+    midnight = 1_700_006_400.0  # 2023-11-15T00:00Z
+    now = midnight + 3600       # temprano: el día de hoy recién empieza
+    lc.events.append_many(
+        [("steady", "sale", 10, "", midnight - d * 86400 + 43200) for d in range(1, 30)]
+        + [("steady", "sale", 1, "", midnight + 1800)]
+    )
+    assert lc.get_state("steady", now=now) == lifecycle.ProductState.MATURE
+    row = kv._conn().execute(
+        "SELECT velocity, acceleration FROM lifecycle_state WHERE product_id = 'steady'"
+    ).fetchone()
+    assert row == (10.0, 0.0)  # no se compara un día parcial contra uno completo
+    kv.close()
+
+
+
+def test_connections_of_finished_threads_are_closed(tmp_path):
+    kv = CachedSQLiteKV(tmp_path / "kv.db", cache_ttl=0)
+    kv.set("a", 1)
+    seen = []
+    for _ in range(50):
+        th = threading.Thread(target=lambda: seen.append((kv.get("a"), kv._conn())))
+        th.start()
+        th.join()
+    assert [v for v, _ in seen] == [1] * 50
+    assert len(kv._conns) == 1  # only the main thread's
+    with pytest.raises(sqlite3.ProgrammingError):
+        seen[0][1].execute("SELECT 1")  # closed when its thread exited
+    kv.close()
+
+
+def _slow_encode(monkeypatch, slow_value):
+    from fx25.kv import sqlite_kv
+
+    encode = sqlite_kv._encode
+
+    def slow(value):
+        if value == slow_value:
+            time.sleep(0.2)  # widens the gap between buffer swap and COMMIT
+        return encode(value)
+
+    monkeypatch.setattr(sqlite_kv, "_encode", slow)
+
+
+def test_kv_concurrent_flushes_commit_in_order(tmp_path, monkeypatch):
+    _slow_encode(monkeypatch, 1)
+    kv = CachedSQLiteKV(tmp_path / "kv.db", group_commit_ms=10_000)
+    kv.set("k", 1)
+    older = threading.Thread(target=kv.flush)
+    older.start()
+    time.sleep(0.05)
+    kv.set("k", 2)
+    kv.flush()
+    older.join()
+    assert CachedSQLiteKV(tmp_path / "kv.db", cache_ttl=0).get("k") == 2 == kv.get("k")
+    kv.close()
+
+
+def test_kv_incr_waits_for_buffer_being_flushed(tmp_path, monkeypatch):
+    _slow_encode(monkeypatch, 5)
+    kv = CachedSQLiteKV(tmp_path / "kv.db", group_commit_ms=10_000)
+    kv.set("c", 5)
+    flushing = threading.Thread(target=kv.flush)
+    flushing.start()
+    time.sleep(0.05)
+    assert kv.incr("c") == 6
+    flushing.join()
+    assert CachedSQLiteKV(tmp_path / "kv.db", cache_ttl=0).get("c") == 6
+    kv.close()
+
+
+def test_cost_setters_append_deltas_not_totals(tmp_path, monkeypatch):
+    from fx25.finance import cost_attribution
+
+    kv = CachedSQLiteKV(tmp_path / "kv.db")
+    monkeypatch.setattr(cost_attribution, "get_kv_store", lambda: kv)
+    ca = cost_attribution.CostAttribution()
+    ca.track_product_cost("p", 10.0)
+    ca.track_product_cost("p", 12.0)
+    ca.track_shipping_cost("p", 5.0)
+    ca.track_shipping_cost("p", 4.5)
+    ca.track_shipping_cost("p", 4.5)
+    ca.track_revenue("p", 50.0)
+    s = ca.get_profit_summary("p")
+    assert (s["cost_product"], s["cost_shipping"], s["true_profit"]) == (12.0, 4.5, 33.5)
+    assert kv.get_many(["cost:p:product", "cost:p:shipping"]) == {"cost:p:product": 12.0, "cost:p:shipping": 4.5}
+    assert ca.events.count("p") == 5
+    kv.close()
+
+
+def test_legacy_kv_totals_are_backfilled_into_the_rollups(tmp_path, monkeypatch):
+    from fx25.finance import cost_attribution
+
+    kv = CachedSQLiteKV(tmp_path / "kv.db")
+    kv.set_many({"revenue:p": 1000.0, "cost:p:ads": 100.0, "revenue:old": 50.0, "cost:old:product": 20.0})
+    # Claves por movimiento del Elite anterior: se suman al producto, no son productos
+    kv.set_many({
+        "revenue:42:shopify:2025-01-01T10:00:00.123456": 30.0,
+        "revenue:42:tiktok:2025-01-02T11:30:00.5": 20.0,
+        "cost:42:product:2025-01-01T10:00:00.123456": 10.0,
+        "cost:42:fees:2025-01-01T10:00:00.123456": 1.5,
+    })
+    monkeypatch.setattr(cost_attribution, "get_kv_store", lambda: kv)
+    ca = cost_attribution.CostAttribution()
+    s42 = ca.get_profit_summary("42")
+    assert (s42["revenue"], s42["cost_product"], s42["true_profit"]) == (50.0, 10.0, 38.5)
+    ca.track_revenue("p", 10.0)
+    ca.track_ad_spend("p", 5.0)
+    s = ca.get_profit_summary("p")
+    assert (s["revenue"], s["cost_ads"]) == (kv.get("revenue:p"), kv.get("cost:p:ads")) == (1010.0, 105.0)
+
+    portfolio = ca.get_portfolio_summary()
+    assert portfolio["product_id"] == ["42", "old", "p"]
+    assert list(portfolio["true_profit"]) == [38.5, 30.0, 905.0]
+    assert list(portfolio["trend"]) == [0, 0, 1]  # lo sembrado queda fuera de las ventanas
+    cost_attribution.CostAttribution()
+    assert ca.backfill_legacy() == 0 and ca.get_profit_summary("p")["revenue"] == 1010.0
+    kv.close()
+
+
+def test_rollup_arrays_windows_stay_incremental_and_cold_reads_match(tmp_path):
+    from fx25.kv.event_store import EventStore
+    from fx25.kv.rollups import RollupMaterializer
+
+    kv = CachedSQLiteKV(tmp_path / "kv.db")
+    ev = EventStore(kv)
+    n = 10_000  # tiempos a escala de catálogo: scripts/bench_rollups.py
+    conn = kv._conn()
+    with kv.batch():
+        conn.executemany(
+            "INSERT INTO rollup_product (product_id, revenue, cost_product, n_events) VALUES (?, ?, ?, 2)",
+            ((f"p{i:06d}", 10.0 + i % 7, 5.0) for i in range(n)),
+        )
+        conn.executemany(
+            "INSERT INTO rollup_daily (product_id, day, revenue, n_events) VALUES (?, ?, ?, 1)",
+            ((f"p{i:06d}", "2023-11-1%d" % (i % 5), 10.0 + i % 7) for i in range(n)),
+        )
+    ids, cols = ev.rollups.arrays(recent_since="2023-11-12", prev_since="2023-11-05")
+    assert len(ids) == n and cols["revenue_recent"][3] == 13.0 and cols["revenue_prev"][1] == 11.0
+
+    # Eventos nuevos: sólo se suman a las ventanas ya materializadas
+    ev.append("p000001", "revenue", 4.0, ts=1_700_000_000.0)  # 2023-11-14
+    ids, cols = ev.rollups.arrays(recent_since="2023-11-12", prev_since="2023-11-05")
+    assert (cols["revenue"][1], cols["revenue_recent"][1], cols["revenue_prev"][1]) == (15.0, 4.0, 11.0)
+
+    cold = RollupMaterializer(kv)
+    cold_ids, cold_cols = cold.arrays(recent_since="2023-11-12", prev_since="2023-11-05")
+    assert cold_ids == ids and all(np.array_equal(cold_cols[c], cols[c]) for c in cols)
+    kv.close()
+
+
+def test_lifecycle_reads_skip_the_write_lock_and_zero_sales_stay_zombie(tmp_path, monkeypatch):
+    from fx25.products import lifecycle
+
+    S = lifecycle.ProductState
+    kv = CachedSQLiteKV(tmp_path / "kv.db")
+    monkeypatch.setattr(lifecycle, "get_kv_store", lambda: kv)
+    lc = lifecycle.ProductLifecycle()
+    lc.track_sales("sold", 3)
+    lc.track_sales("usb", 0)
+    lc.events.append("usb", "cost_product", 2.0)
+    assert lc.events.count("usb") == 1 and kv.get("sales:usb") is None
+    states = lc.get_states(["sold", "usb"])
+    assert states == {"sold": S.LAUNCH, "usb": S.ZOMBIE}
+    assert lc.recommend_action("usb", states["usb"]).startswith("💀")
+
+    statements = []
+    kv._conn().set_trace_callback(statements.append)
+    assert lc.get_state("sold") == S.LAUNCH and lc.refresh() == 0
+    kv._conn().set_trace_callback(None)
+    assert not [q for q in statements if q.startswith("BEGIN")]
+    kv.close()
+
+
+def test_lifecycle_keeps_legacy_sales_after_the_cost_backfill(tmp_path, monkeypatch):
+    from fx25.finance import cost_attribution
+    from fx25.products import lifecycle
+
+    kv = CachedSQLiteKV(tmp_path / "kv.db")
+    kv.set_many({"sales:7": 120, "revenue:7": 5000.0, "revenue:8": 10.0})
+    monkeypatch.setattr(cost_attribution, "get_kv_store", lambda: kv)
+    monkeypatch.setattr(lifecycle, "get_kv_store", lambda: kv)
+    lc = lifecycle.ProductLifecycle()
+    assert lc.get_states(["7", "8"]) == {"7": lifecycle.ProductState.MATURE, "8": lifecycle.ProductState.ZOMBIE}
+    cost_attribution.CostAttribution()  # siembra revenue:7 / revenue:8 como eventos
+    assert lc.get_states(["7", "8"]) == {"7": lifecycle.ProductState.MATURE, "8": lifecycle.ProductState.ZOMBIE}
+    kv.close()
@@ -0,0 +1,714 @@
+from fx25.clients.shopify_client import ShopifyClient
+
+
+def test_adaptive_limiter_follows_rest_call_limit_header():
+    c = ShopifyClient(dry=True, adaptive=True)
+    c._observe_rate_limit({"X-Shopify-Shop-Api-Call-Limit": "10/80"})
+    assert c.bucket_capacity == 79.0
+    assert c.refill_rate == 4.0
+    # El servidor nunca repone tokens locales (sólo los baja)
+    assert c.bucket_remaining <= 2.0
+    c.bucket_remaining = 1000.0
+    c._observe_rate_limit({"X-Shopify-Shop-Api-Call-Limit": "10/80"})
+    assert c.bucket_remaining == 69.0
+
+
+def test_adaptive_limiter_follows_graphql_throttle_status():
+    c = ShopifyClient(dry=True, adaptive=True, adaptive_headroom=0.0)
+    body = {"extensions": {"cost": {
+        "actualQueryCost": 10,
+        "throttleStatus": {"maximumAvailable": 2000, "currentlyAvailable": 500, "restoreRate": 100},
+    }}}
+    c._observe_rate_limit({}, body)
+    c.bucket_remaining = 1000.0
+    c._observe_rate_limit({}, body)
+    assert c.bucket_capacity == 200.0
+    assert c.refill_rate == 10.0
+    assert c.bucket_remaining == 50.0
+
+
+def test_non_adaptive_ignores_headers():
+    c = ShopifyClient(dry=True)
+    c._observe_rate_limit({"X-Shopify-Shop-Api-Call-Limit": "10/80"})
+    assert c.bucket_capacity == 2.0 and c.refill_rate == 2.0
+
+
+def test_limiter_serves_waiters_in_arrival_order():
+    import threading
+    import time
+
+    c = ShopifyClient(dry=True, bucket_capacity=1.0, refill_rate=50.0)
+    c.bucket_remaining = 0.0
+    order = []
+
+    def run(i):
+        c._wait_if_needed()
+        order.append(i)
+
+    threads = []
+    for i in range(8):
+        th = threading.Thread(target=run, args=(i,))
+        th.start()
+        threads.append(th)
+        # Garantiza orden de llegada a la cola
+        while len(c._bucket_waiters) + len(order) < i + 1:
+            time.sleep(0.001)
+    for th in threads:
+        th.join()
+    assert order == list(range(8))
+
+
+def test_pool_reuses_keepalive_connection():
+    from fx25.clients.shopify_standin import ShopifyStandIn
+
+    with ShopifyStandIn(n_products=1, enforce_bucket=False) as srv:
+        c = ShopifyClient(
+            srv.store, "t", dry=False, scheme="http",
+            pool_size=2, bucket_capacity=100.0, refill_rate=100.0, price_cache_size=0,
+        )
+        for _ in range(5):
+            assert c._get_current_price("1", dry=False) == 100.0
+        assert c._pool.stats["created"] == 1
+        assert c._pool.stats["reused"] == 4
+        c.close()
+
+
+def test_async_client_dry_uses_limiter_and_guardrails():
+    import asyncio
+    import pytest
+    from fx25.clients.async_shopify_client import AsyncShopifyClient
+
+    async def run():
+        c = AsyncShopifyClient(dry=True, bucket_capacity=1.0, refill_rate=100.0)
+        c.bucket.remaining = 0.0
+        t0 = asyncio.get_running_loop().time()
+        await asyncio.gather(*(c.update_price(str(i), 105.0) for i in range(10)))
+        elapsed = asyncio.get_running_loop().time() - t0
+        with pytest.raises(ValueError):
+            await c.update_price("x", 50.0)
+        return c.api_call_count, elapsed
+
+    calls, elapsed = asyncio.run(run())
+    assert calls == 10
+    assert elapsed >= 0.09
+
+
+def test_async_breaker_opens_after_threshold():
+    import asyncio
+    import pytest
+    from fx25.clients.async_shopify_client import AsyncShopifyClient
+
+    async def run():
+        c = AsyncShopifyClient(dry=True, refill_rate=100.0, breaker_fail_threshold=2)
+        c.force_fail_next(2)
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await c.create_product({"product": {"title": "x"}})
+        with pytest.raises(RuntimeError, match="OPEN"):
+            await c.create_product({"product": {"title": "x"}})
+        return c.circuit_state
+
+    assert asyncio.run(run()) == "OPEN"
+
+
+def test_async_dry_uses_dry_log_and_per_family_breakers(capsys):
+    import asyncio
+    import pytest
+    from fx25.clients.async_shopify_client import AsyncShopifyClient
+
+    def client():
+        return AsyncShopifyClient(dry=True, refill_rate=1000.0, bucket_capacity=100.0, dry_verbosity=0,
+                                  breaker_fail_threshold=2, breaker_open_seconds=0.05)
+
+    async def run():
+        c = client()
+        await asyncio.gather(*(c.update_price(str(i), 105.0, old_price=100.0) for i in range(20)))
+        await c.get_inventory("SKU-1")
+        assert c.dry_log.counts == {"UPDATE_PRICE": 20, "INVENTORY": 1}
+
+        # Ventana por tasa de fallas: 2 fallas sobre 20 éxitos no abren...
+        c.force_fail_next(2)
+        for _ in range(2):
+            with pytest.raises(RuntimeError, match="Simulated"):
+                await c.create_product({"product": {"title": "x"}})
+        assert c.circuit_state == "CLOSED"
+        # ...2 de 2 sí
+        c = client()
+        c.force_fail_next(2)
+        for _ in range(2):
+            with pytest.raises(RuntimeError, match="Simulated"):
+                await c.create_product({"product": {"title": "x"}})
+        assert c.breaker_snapshot()["products"]["state"] == "OPEN"
+        await c.get_inventory("SKU-1")  # otra familia: sigue CLOSED
+        assert c.breaker_snapshot()["inventory_levels"]["state"] == "CLOSED"
+
+        # HALF_OPEN: una sola sonda pasa; el resto falla rápido hasta que reporta
+        await asyncio.sleep(0.06)
+        probe = c.breakers.get("/products.json")
+        probe.check()
+        with pytest.raises(RuntimeError, match="probe in flight"):
+            await c.create_product({"product": {"title": "y"}})
+        probe.record_success()
+        assert (await c.create_product({"product": {"title": "y"}}))["ok"]
+        return c.circuit_state
+
+    assert asyncio.run(run()) == "CLOSED"
+    assert capsys.readouterr().out == ""
+
+
+def test_update_prices_bulk_batches_reads_and_writes():
+    c = ShopifyClient(dry=True, bucket_capacity=100.0, refill_rate=100.0)
+    items = [("1", 110.0), ("2", 50.0), ("3", 95.0, 90.0), {"product_id": "1", "new_price": 105.0}]
+    results = list(c.update_prices_bulk(items, write_batch_size=10))
+
+    assert [r["product_id"] for r in results] == ["1", "2", "3", "1"]
+    assert results[0]["error"] == "superseded"
+    assert results[1]["ok"] is False and "price_guardrail" in results[1]["error"]
+    assert results[2]["ok"] is True and results[2]["old_price"] == 90.0
+    assert results[3]["ok"] is True and results[3]["old_price"] == 100.0
+    # 1 GET batched + 1 write agrupado
+    assert c.api_call_count == 2
+
+
+def test_bulk_iter_results_streams_jsonl(tmp_path):
+    from fx25.clients.shopify_bulk import ShopifyBulkOperations
+
+    f = tmp_path / "bulk.jsonl"
+    f.write_text('{"id": "gid://shopify/Product/1"}\n\n{"id": "v1", "__parentId": "gid://shopify/Product/1"}\n')
+    rows = list(ShopifyBulkOperations.iter_results(f.as_uri()))
+    assert [r["id"] for r in rows] == ["gid://shopify/Product/1", "v1"]
+    assert rows[1]["__parentId"] == "gid://shopify/Product/1"
+
+
+def test_bulk_dry_export_goes_through_limiter():
+    c = ShopifyClient(dry=True, bucket_capacity=10.0, refill_rate=100.0)
+    assert list(c.bulk.iter_query()) == []
+    # run_query + 1 poll
+    assert c.api_call_count == 2
+
+
+def test_sku_index_upsert_lookup_and_levels(tmp_path):
+    from fx25.clients.shopify_sku_index import ShopifySkuIndex
+
+    c = ShopifyClient("shop-a.myshopify.com", dry=True)
+    idx = ShopifySkuIndex(c, db_path=tmp_path / "idx.db")
+    n = idx.upsert_products([
+        {"id": 1, "updated_at": "2024-01-02T00:00:00Z", "variants": [
+            {"id": 11, "sku": "A-1", "inventory_item_id": 111},
+            {"id": 12, "sku": "", "inventory_item_id": 112},
+        ]},
+        {"id": 2, "updated_at": "2024-01-01T00:00:00Z", "variants": [
+            {"id": 21, "sku": "B-1", "inventory_item_id": 211},
+        ]},
+    ])
+    assert n == 2 and len(idx) == 2
+    assert idx.last_sync is None  # sólo refresh() completo avanza el watermark
+
+    idx.record_levels([{"inventory_item_id": 111, "location_id": 9}, {"inventory_item_id": 111, "location_id": 7}])
+    hit = idx.lookup_many(["A-1", "B-1", "missing"])
+    assert set(hit) == {"A-1", "B-1"}
+    assert hit["A-1"]["variant_id"] == "11"
+    assert hit["A-1"]["location_ids"] == ["7", "9"]
+
+
+def test_next_page_params_parses_link_header():
+    from fx25.clients.shopify_client import _next_page_params
+
+    link = ('<https://s.myshopify.com/admin/api/2023-10/products.json?limit=250&page_info=abc>; rel="previous", '
+            '<https://s.myshopify.com/admin/api/2023-10/products.json?limit=250&page_info=xyz>; rel="next"')
+    assert _next_page_params({"Link": link}) == {"limit": "250", "page_info": "xyz"}
+    assert _next_page_params({}) is None
+
+
+def test_price_cache_read_through_and_write_update():
+    c = ShopifyClient(dry=True, bucket_capacity=10.0, refill_rate=100.0)
+    c.update_price("p1", 110.0)            # miss → 100 simulado, PUT → cache=110
+    c.update_price("p1", 130.0)            # hit: 110→130 está dentro de ±20%
+    assert c.price_cache_misses == 1
+    assert c.price_cache_hits == 1
+    assert c._get_current_price("p1", dry=True) == 130.0
+    c._forget_price("p1")
+    assert c._get_current_price("p1", dry=True) == 100.0
+
+
+def test_iter_products_follows_cursors_with_prefetch():
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    seen = []
+
+    class Pages(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            q = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+            seen.append(q)
+            page = int(q.get("page_info", "0"))
+            body = json.dumps({"products": [{"id": page * 2 + i} for i in range(2)]}).encode()
+            self.send_response(200)
+            if page < 2:
+                nxt = f"http://x/admin/api/2023-10/products.json?limit=2&page_info={page + 1}"
+                self.send_header("Link", f'<{nxt}>; rel="next"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Pages)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        c = ShopifyClient(f"127.0.0.1:{server.server_address[1]}", "t", dry=False, scheme="http",
+                          bucket_capacity=100.0, refill_rate=100.0)
+        ids = [p["id"] for p in c.iter_products(fields=("id", "title"), page_size=2, status="active")]
+        assert ids == [0, 1, 2, 3, 4, 5]
+        assert seen[0]["status"] == "active"
+        assert all(q["fields"] == "id,title" for q in seen)
+        assert "status" not in seen[1]
+        c.close()
+    finally:
+        server.shutdown()
+
+
+def test_breakers_are_isolated_per_endpoint_family():
+    import pytest
+
+    c = ShopifyClient(dry=True, bucket_capacity=10.0, refill_rate=100.0, breaker_fail_threshold=2)
+    c.force_fail_next(2)
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            c._request("GET", "/inventory_levels.json")
+    with pytest.raises(RuntimeError, match="OPEN"):
+        c._request("GET", "/inventory_levels.json")
+    assert c.create_product({"product": {"title": "ok"}})["ok"] is True
+    snap = c.breaker_snapshot()
+    assert snap["inventory_levels"]["state"] == "OPEN"
+    assert snap["products"]["state"] == "CLOSED"
+    assert c.circuit_state == "OPEN"
+
+
+def test_half_open_admits_single_probe():
+    import time
+    import pytest
+    from fx25.clients.circuit_breaker import CircuitBreaker
+
+    b = CircuitBreaker("products", fail_threshold=1, open_seconds=0.05)
+    b.record_failure()
+    assert b.state == "OPEN"
+    time.sleep(0.06)
+    b.check()                       # sonda
+    with pytest.raises(RuntimeError, match="probe in flight"):
+        b.check()
+    b.record_success()
+    assert b.state == "CLOSED"
+    b.check()
+
+
+def test_breaker_trips_on_failure_rate_not_raw_count():
+    from fx25.clients.circuit_breaker import CircuitBreaker
+
+    b = CircuitBreaker(fail_threshold=3, failure_rate=0.5, window_seconds=60)
+    for _ in range(10):
+        b.record_success()
+    for _ in range(4):
+        b.record_failure()
+    assert b.state == "CLOSED"      # 4/14 < 50%
+    for _ in range(8):
+        b.record_failure()
+    assert b.state == "OPEN"
+
+
+def test_dry_log_silent_ring_buffer_and_batched_sink(tmp_path, capsys):
+    import json
+
+    sink = tmp_path / "dry.jsonl"
+    c = ShopifyClient(dry=True, bucket_capacity=100.0, refill_rate=1e6,
+                      dry_verbosity=0, dry_log_size=3, dry_sink_path=str(sink))
+    c.dry_log.batch_size = 2
+    for i in range(5):
+        c.update_price(str(i), 105.0, old_price=100.0)
+    c.get_inventory("SKU-1")
+
+    assert capsys.readouterr().out == ""
+    assert len(c.dry_log.entries) == 3
+    assert c.dry_log.counts == {"UPDATE_PRICE": 5, "INVENTORY": 1}
+    assert len(sink.read_text().splitlines()) == 6
+    c.close()
+    rows = [json.loads(x) for x in sink.read_text().splitlines()]
+    assert rows[-1]["event"] == "INVENTORY"
+
+
+def test_standin_end_to_end_bulk_prices_and_inventory(tmp_path):
+    from fx25.clients.shopify_sku_index import ShopifySkuIndex
+    from fx25.clients.shopify_standin import ShopifyStandIn
+
+    with ShopifyStandIn(n_products=5, enforce_bucket=False) as srv:
+        c = ShopifyClient(srv.store, "t", dry=False, scheme="http", dry_verbosity=0,
+                          bucket_capacity=100.0, refill_rate=1000.0)
+        results = list(c.update_prices_bulk([("1", 110.0), ("2", 300.0), ("3", 90.0)]))
+        assert [r["ok"] for r in results] == [True, False, True]
+        assert srv.products[1]["variants"][0]["price"] == "110.0"
+        assert srv.products[2]["variants"][0]["price"] == "100.00"
+
+        c._sku_index = ShopifySkuIndex(c, db_path=tmp_path / "idx.db")
+        inv = c.get_inventory_many(["SKU-1-0", "SKU-4-0", "nope"])
+        assert inv["SKU-1-0"]["qty"] == 10
+        assert inv["SKU-4-0"]["levels"] == [{"location_id": "1", "available": 10}]
+        assert inv["nope"]["ok"] is False
+        c.close()
+
+
+def test_standin_throttles_with_retry_after():
+    from fx25.clients.shopify_standin import ShopifyStandIn
+
+    with ShopifyStandIn(n_products=1, bucket_size=2, leak_rate=20.0, retry_after=0.05) as srv:
+        c = ShopifyClient(srv.store, "t", dry=False, scheme="http", price_cache_size=0,
+                          bucket_capacity=100.0, refill_rate=1000.0)
+        for _ in range(4):
+            assert c._get_current_price("1", dry=False) == 100.0
+        assert srv.stats["throttled"] >= 1
+        assert c.api_call_count == 4 + srv.stats["throttled"]
+        c.close()
+
+
+def test_outbox_priority_coalescing_and_idempotency(tmp_path):
+    from fx25.clients.shopify_outbox import ShopifyOutbox
+    from fx25.clients.shopify_standin import ShopifyStandIn
+
+    with ShopifyStandIn(n_products=2, enforce_bucket=False) as srv:
+        c = ShopifyClient(srv.store, "t", dry=False, scheme="http", dry_verbosity=0,
+                          bucket_capacity=100.0, refill_rate=1000.0)
+        q = ShopifyOutbox(c, db_path=tmp_path / "outbox.db")
+        new = q.enqueue_create_product({"product": {"title": "Nuevo"}}, idempotency_key="c1")
+        assert q.enqueue_create_product({"product": {"title": "Nuevo"}}, idempotency_key="c1") == new
+        k1 = q.enqueue_price_update("1", 105.0, old_price=100.0)
+        k2 = q.enqueue_price_update("1", 110.0, old_price=100.0)
+        assert k1 == k2 and q.status(k1)["coalesced"] == 1
+        bad = q.enqueue_price_update("2", 500.0, old_price=100.0)
+        assert q.stats()["pending"] == 3
+
+        order = []
+        orig = q._execute
+        q._execute = lambda key, kind, payload, attempts: order.append(kind) or orig(key, kind, payload, attempts)
+        assert q.drain(timeout=5)
+        assert order == ["update_price", "update_price", "create_product"]
+        assert srv.products[1]["variants"][0]["price"] == "110.0"
+        assert q.status(bad)["status"] == "failed"
+        assert q.status(new)["status"] == "done"
+        assert srv.products[3]["tags"] == "idem-c1"
+
+        q3 = q.enqueue_price_update("1", 115.0, old_price=110.0)
+        assert q3 != k1
+        q.start(n_workers=2)
+        assert q.drain(timeout=5)
+        assert srv.products[1]["variants"][0]["price"] == "115.0"
+        q.close()
+        c.close()
+
+
+def test_outbox_recovers_inflight_jobs(tmp_path):
+    from fx25.clients.shopify_outbox import ShopifyOutbox
+
+    c = ShopifyClient("s", "t", dry=True, dry_verbosity=0)
+    q = ShopifyOutbox(c, db_path=tmp_path / "outbox.db")
+    key = q.enqueue_price_update("1", 101.0, old_price=100.0)
+    assert q._claim() is not None
+    assert q.status(key)["status"] == "inflight"
+    q.close()
+
+    q = ShopifyOutbox(c, db_path=tmp_path / "outbox.db")
+    assert q.status(key)["status"] == "pending"
+    assert q.drain(timeout=5)
+    assert q.status(key)["status"] == "done"
+    q.close()
+
+
+def test_outbox_replay_of_coalesced_key_is_a_noop(tmp_path):
+    from fx25.clients.shopify_outbox import ShopifyOutbox
+
+    c = ShopifyClient("s", "t", dry=True, dry_verbosity=0)
+    q = ShopifyOutbox(c, db_path=tmp_path / "outbox.db")
+    a = q.enqueue_price_update("1", 101.0, old_price=100.0, idempotency_key="A")
+    assert q.enqueue_price_update("1", 102.0, old_price=100.0, idempotency_key="B") == a
+    assert q.status("B")["idempotency_key"] == "A" and q.status("B")["coalesced"] == 1
+    assert q.drain(timeout=5)
+    q.enqueue_price_update("1", 103.0, old_price=102.0, idempotency_key="C")
+    assert q.drain(timeout=5)
+
+    # Replay de "B" después de aplicar "C": no debe volver a 102.0
+    assert q.enqueue_price_update("1", 102.0, old_price=100.0, idempotency_key="B") == "A"
+    assert q.status("B")["status"] == "done" and q.stats()["pending"] == 0
+    q.close()
+
+
+def test_outbox_failed_older_price_job_never_overwrites_newer(tmp_path):
+    from fx25.clients.shopify_outbox import ShopifyOutbox
+
+    c = ShopifyClient("s", "t", dry=True, dry_verbosity=0)
+    q = ShopifyOutbox(c, db_path=tmp_path / "outbox.db", retry_base_seconds=0.0)
+    applied = []
+    old = q.enqueue_price_update("1", 101.0, old_price=100.0)
+
+    def flaky_update(product_id, new_price, *, old_price=None):
+        if not applied and new_price == 101.0:
+            # Llega un precio más nuevo mientras el viejo está inflight...
+            newer_key[0] = q.enqueue_price_update("1", 105.0, old_price=100.0)
+            assert q._claim() is None  # ...y no se toma en paralelo
+            applied.append(None)
+            raise RuntimeError("timeout")
+        applied.append(new_price)
+        return {"ok": True}
+
+    newer_key = [None]
+    c.update_price = flaky_update
+    assert q.drain(timeout=5)
+    assert applied == [None, 105.0]
+    assert q.status(old)["status"] == "superseded" and q.status(newer_key[0])["status"] == "done"
+
+    # Un job en backoff absorbe el precio nuevo: el reintento aplica el último valor
+    c.update_price = lambda *a, **k: (_ for _ in ()).throw(RuntimeError("boom"))
+    q.retry_base_seconds = 60.0
+    stale = q.enqueue_price_update("1", 106.0, old_price=105.0)
+    assert q.run_once() and q.status(stale)["status"] == "pending"
+    assert q.enqueue_price_update("1", 107.0, old_price=105.0) == stale
+    c.update_price = flaky_update
+    q._conn.execute("UPDATE outbox SET next_attempt_at = 0")
+    assert q.drain(timeout=5)
+    assert applied[-1] == 107.0 and q.stats() == {
+        "pending": 0, "inflight": 0, "done": 2, "failed": 0, "superseded": 1}
+    q.close()
+
+
+def test_outbox_drain_sleeps_through_backoff(tmp_path):
+    import time
+
+    from fx25.clients.shopify_outbox import ShopifyOutbox
+
+    c = ShopifyClient("s", "t", dry=True, dry_verbosity=0)
+    q = ShopifyOutbox(c, db_path=tmp_path / "outbox.db", retry_base_seconds=0.3)
+    calls = []
+    c.update_price = lambda *a, **k: calls.append(1) or (
+        {"ok": True} if len(calls) > 1 else (_ for _ in ()).throw(RuntimeError("503")))
+    key = q.enqueue_price_update("1", 101.0, old_price=100.0)
+    claims = []
+    orig = q._claim
+    q._claim = lambda: claims.append(1) or orig()
+
+    assert q.drain(timeout=0.1) is False  # sigue en backoff al vencer el timeout
+    assert len(claims) <= 3
+    t0 = time.monotonic()
+    assert q.drain(timeout=5) and q.status(key)["status"] == "done"
+    assert time.monotonic() - t0 >= 0.1 and len(claims) <= 6 and len(calls) == 2
+    q.close()
+
+
+def test_iter_json_array_handles_split_chunks():
+    import io
+    import json
+
+    from fx25.clients.json_stream import iter_json_array
+
+    doc = {"meta": {"n": [1, 2]}, "products": [{"id": 1, "t": "ñandú"}, 12345, "x", None], "tail": 1}
+    raw = json.dumps(doc, ensure_ascii=False).encode("utf-8")
+    for chunk in (1, 3, 7, 1 << 16):
+        assert list(iter_json_array(io.BytesIO(raw), "products", chunk_size=chunk)) == doc["products"]
+    assert list(iter_json_array(io.BytesIO(b'{"other": []}'), "products")) == []
+    assert list(iter_json_array(io.BytesIO(b'{"products": []}'), "products")) == []
+
+
+def test_iter_products_stream_and_get_product_projection():
+    from fx25.clients.shopify_standin import ShopifyStandIn
+
+    with ShopifyStandIn(n_products=7, enforce_bucket=False) as srv:
+        for pool_size in (2, 0):
+            c = ShopifyClient(srv.store, "t", dry=False, scheme="http", pool_size=pool_size,
+                              bucket_capacity=100.0, refill_rate=1000.0)
+            items = list(c.iter_products(fields=("id", "variants"), page_size=3, stream=True))
+            assert [p["id"] for p in items] == list(range(1, 8))
+            assert set(items[0]) == {"id", "variants"}
+            assert c.api_call_count == 3
+            assert set(c.get_product("2", fields="id,title")["json"]["product"]) == {"id", "title"}
+            c.close()
+
+
+def test_call_metrics_split_limiter_wait_and_network(tmp_path, monkeypatch):
+    from fx25.clients import call_metrics
+    from fx25.clients.shopify_standin import ShopifyStandIn
+    from fx25.modules import metrics as metrics_csv
+
+    assert call_metrics.path_template("/products/123.json?fields=id") == "/products/{id}.json"
+
+    with ShopifyStandIn(n_products=2, enforce_bucket=False, latency_ms=5) as srv:
+        c = ShopifyClient(srv.store, "t", dry=False, scheme="http", price_cache_size=0,
+                          bucket_capacity=1.0, refill_rate=20.0)
+        seen = []
+        c.metrics.add_hook(seen.append)
+        for pid in ("1", "2", "1"):
+            c.get_product(pid, fields="id")
+        c.close()
+
+    snap = c.metrics.snapshot()["GET /products/{id}.json"]
+    assert snap["count"] == 3 and snap["status"] == {"200": 3}
+    assert snap["breaker"] == {"CLOSED": 3}
+    assert snap["network"]["p50_ms"] >= 4.0
+    assert snap["limiter_wait"]["sum_s"] > 0.05
+    assert [r.attempt for r in seen] == [0, 0, 0]
+
+    monkeypatch.setattr(metrics_csv, "METRICS_PATH", str(tmp_path / "metrics.csv"))
+    assert c.metrics.flush_to_metrics() == 1
+    assert "shopify_call" in (tmp_path / "metrics.csv").read_text()
+    assert c.metrics.snapshot() == {}
+
+
+def test_call_metrics_fold_shards_of_finished_threads():
+    import threading
+
+    from fx25.clients.call_metrics import CallMetrics
+
+    m = CallMetrics()
+    for _ in range(50):
+        th = threading.Thread(target=lambda: m.record("GET", "/products/1.json", 200, network_s=0.001))
+        th.start()
+        th.join()
+    m.record("GET", "/products/2.json", 429, attempt=1)
+    snap = m.snapshot()["GET /products/{id}.json"]
+    assert snap["count"] == 51 and snap["retries"] == 1 and snap["status"] == {"200": 50, "429": 1}
+    assert len(m._shards) == 1  # sólo el del thread vivo
+    m.reset()
+    assert m.snapshot() == {}
+
+
+def test_fair_scheduler_weights_grants_across_stores():
+    import threading
+    import time
+
+    from fx25.clients.fair_scheduler import FairScheduler
+
+    sched = FairScheduler(max_concurrency=1)
+    sched.set_weight("big", 1.0)
+    sched.set_weight("small", 3.0)
+    order, lock = [], threading.Lock()
+
+    def job(key):
+        with sched.slot(key):
+            with lock:
+                order.append(key)
+
+    sched.acquire("big")
+    threads = [threading.Thread(target=job, args=("big",)) for _ in range(12)]
+    threads += [threading.Thread(target=job, args=("small",)) for _ in range(6)]
+    for th in threads:
+        th.start()
+    while sum(sched.stats["waiting"].values()) < 18:
+        time.sleep(0.005)
+    sched.release()
+    for th in threads:
+        th.join()
+
+    assert order[:8].count("small") == 6
+    assert sched.stats["in_flight"] == 0
+
+
+def test_registry_isolates_store_buckets_and_shares_global_cap():
+    from fx25.clients.shopify_registry import ShopifyClientRegistry
+    from fx25.clients.shopify_standin import ShopifyStandIn
+
+    with ShopifyStandIn(n_products=2, enforce_bucket=False) as a, \
+            ShopifyStandIn(n_products=2, enforce_bucket=False) as b:
+        with ShopifyClientRegistry(max_concurrency=2, scheme="http", dry=False, dry_verbosity=0,
+                                   price_cache_size=0, bucket_capacity=50.0, refill_rate=500.0) as reg:
+            ca = reg.register(a.store, "ta", weight=2.0)
+            cb = reg.register(b.store, "tb", breaker_fail_threshold=1)
+            assert reg.get(a.store) is ca and a.store in reg and len(reg) == 2
+
+            ca.update_price("1", 110.0)
+            cb._record_failure("/products/1.json")
+            assert cb.circuit_state == "OPEN" and ca.circuit_state == "CLOSED"
+            ca.get_product("2")
+
+            snap = reg.snapshot()
+            assert snap["scheduler"]["served"] == {a.store: 3}
+            assert snap["stores"][a.store]["weight"] == 2.0
+            assert snap["pools"][a.store]["size"] == 4
+        assert a.products[1]["variants"][0]["price"] == "110.0"
+
+
+def test_bulk_prices_resolve_variants_and_check_each_alias():
+    from fx25.clients.shopify_standin import ShopifyStandIn
+
+    with ShopifyStandIn(n_products=300, enforce_bucket=False) as srv:
+        c = ShopifyClient(srv.store, "t", dry=False, scheme="http", dry_verbosity=0,
+                          bucket_capacity=1000.0, refill_rate=1000.0)
+        # old_price del caller: igual hay que resolver el variant para escribir
+        (r,) = c.update_prices_bulk([("1", 105.0, 100.0)])
+        assert r["ok"] is True and srv.products[1]["variants"][0]["price"] == "105.0"
+
+        # Más de 250 ids en un lote: la lectura se parte en requests de ≤250
+        results = list(c.update_prices_bulk([(str(i), 101.0) for i in range(2, 301)], batch_size=400))
+        assert all(r["ok"] for r in results) and srv.products[300]["variants"][0]["price"] == "101.0"
+
+        (r,) = c.update_prices_bulk([("9999", 101.0, 100.0)])
+        assert r["ok"] is False and r["error"] == "variant_not_found"
+
+        # update_price con old_price y caché frío no deja una entrada sin variant
+        c._forget_price("1")
+        c.update_price("1", 110.0, old_price=105.0)
+        assert c._cached_price("1") is None
+        c._remember_price("2", None, 101.0)  # p.ej. escrita en DRY
+        results = list(c.update_prices_bulk([("1", 111.0), ("2", 102.0)]))
+        assert all(r["ok"] for r in results), results
+        assert srv.products[2]["variants"][0]["price"] == "102.0"
+        c.close()
+
+
+def test_bulk_prices_graphql_errors_and_missing_aliases_are_failures():
+    c = ShopifyClient("x.myshopify.com", "t", dry=False, price_cache_size=100)
+    c._remember_price("1", "11", 100.0)
+    c._remember_price("2", "22", 100.0)
+    replies = iter([
+        {"json": {"errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}]}},
+        {"json": {"data": {"u0": {"userErrors": []}}}},
+    ])
+    c._request = lambda *a, **k: next(replies)
+    first = list(c.update_prices_bulk([("1", 101.0), ("2", 102.0)]))
+    assert [r["ok"] for r in first] == [False, False] and "Throttled" in first[0]["error"]
+    c._remember_price("1", "11", 100.0)  # el fallo invalidó el caché
+    c._remember_price("2", "22", 100.0)
+    second = list(c.update_prices_bulk([("1", 101.0, 100.0), ("2", 102.0, 100.0)]))
+    assert [r["ok"] for r in second] == [True, False] and second[1]["error"] == "write_missing_result"
+
+
+def test_sku_index_watermark_only_advances_after_full_crawl(tmp_path):
+    import pytest
+    from fx25.clients.shopify_sku_index import ShopifySkuIndex
+
+    c = ShopifyClient("shop-a.myshopify.com", dry=True)
+    idx = ShopifySkuIndex(c, db_path=tmp_path / "idx.db")
+    pages = [
+        {"products": [{"id": 1, "updated_at": "2024-03-01T00:00:00Z", "variants": [{"id": 11, "sku": "A"}]}]},
+        {"products": [{"id": 2, "updated_at": "2024-01-01T00:00:00Z", "variants": [{"id": 21, "sku": "B"}]}]},
+    ]
+    seen_params = []
+
+    def interrupted(path, params):
+        seen_params.append(dict(params))
+        yield pages[0]
+        raise RuntimeError("connection reset")
+
+    c._iter_pages = interrupted
+    with pytest.raises(RuntimeError):
+        idx.refresh()
+    assert idx.last_sync is None and len(idx) == 1
+
+    def complete(path, params):
+        seen_params.append(dict(params))
+        yield from pages
+
+    c._iter_pages = complete
+    assert idx.refresh() == 2 and len(idx) == 2
+    assert "updated_at_min" not in seen_params[1]
+    assert idx.last_sync > "2024-03-01T00:00:00Z"
+    idx.close()